@@ -5,4 +5,9 @@ from django.contrib.auth.models import AbstractUser
 class CustomUser(AbstractUser):
     # 追加のフィールドが必要な場合はここに定義
     # これから追加予定
-    pass
\ No newline at end of file
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # 管理画面: 登録日での絞り込み（直近30日の新規ユーザー）・新しい順の一覧
+            models.Index(fields=['-date_joined'], name='user_date_joined_idx'),
+        ]
\ No newline at end of file
@@ -0,0 +1,106 @@
+"""
+API の JSON 出力
+
+orjson がインストールされていれば orjson で直接バイト列に変換し、無ければ標準の json
+（DRF の JSONRenderer と同じ処理）を使う。出力は DRF の JSONRenderer と同じ
+（区切りの空白なし・日本語はエスケープしない・日時の形式も同じ）。
+
+    pip install orjson   # 任意（入っていなくても動く）
+
+件数の多い一覧は streaming_json_response で1件ずつ変換しながら返せる
+（変換後の全体をメモリに持たない）。
+"""
+import json
+
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson は任意
+    orjson = None
+
+
+# 日時などは DRF と同じ形式にするため、orjson では変換せず DRF のエンコーダーに任せる
+_ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME if orjson else 0
+_encoder = encoders.JSONEncoder()
+
+
+def _escape_line_separators(content: bytes) -> bytes:
+    # DRF と同じく U+2028 / U+2029 はエスケープする（JavaScript の文字列に埋め込めるように）
+    if b"\xe2\x80\xa8" in content or b"\xe2\x80\xa9" in content:
+        content = content.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+    return content
+
+
+def _stdlib_dumps(data) -> bytes:
+    content = json.dumps(
+        data, cls=encoders.JSONEncoder, ensure_ascii=False, allow_nan=not api_settings.STRICT_JSON,
+        separators=(",", ":"),
+    )
+    return _escape_line_separators(content.encode("utf-8"))
+
+
+def dumps(data) -> bytes:
+    """data を JSON のバイト列にする（DRF の JSONRenderer の既定の出力と同じ）"""
+    if orjson is not None:
+        try:
+            return _escape_line_separators(orjson.dumps(data, default=_encoder.default, option=_ORJSON_OPTIONS))
+        except (orjson.JSONEncodeError, TypeError):
+            # 64ビットを超える整数など orjson で扱えないもの
+            pass
+    return _stdlib_dumps(data)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer の高速版（settings.REST_FRAMEWORK の DEFAULT_RENDERER_CLASSES で指定する）
+    インデント指定（Accept: application/json; indent=4）や UNICODE_JSON / COMPACT_JSON を
+    変えている場合は DRF の処理をそのまま使う
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        renderer_context = renderer_context or {}
+        if self.get_indent(accepted_media_type, renderer_context) or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
+
+
+# ---- ストリーミング ----
+def iter_json(data, chunk_size: int = 100):
+    """
+    data を JSON に変換しながら少しずつ返す
+    dict の値にイテレータ（ジェネレータなど）があれば、その配列を chunk_size 件ずつ変換する
+    """
+    if isinstance(data, dict):
+        yield b"{"
+        for i, (key, value) in enumerate(data.items()):
+            yield (b"," if i else b"") + dumps(str(key)) + b":"
+            yield from iter_json(value, chunk_size)
+        yield b"}"
+    elif hasattr(data, "__next__"):
+        yield b"["
+        chunk = []
+        first = True
+        for item in data:
+            chunk.append(item)
+            if len(chunk) >= chunk_size:
+                yield (b"" if first else b",") + dumps(chunk)[1:-1]
+                first = False
+                chunk = []
+        if chunk:
+            yield (b"" if first else b",") + dumps(chunk)[1:-1]
+        yield b"]"
+    else:
+        yield dumps(data)
+
+
+def streaming_json_response(data, status=200, chunk_size: int = 100):
+    """iter_json で変換しながら返すレスポンス（件数の多い一覧用）"""
+    return StreamingHttpResponse(
+        iter_json(data, chunk_size), status=status, content_type="application/json"
+    )
@@ -0,0 +1,122 @@
+"""
+読み取り専用のリクエストをレプリカDBに振り分ける
+
+settings.DATABASES に REPLICA_DATABASE（既定 "replica"）の接続があるとき、
+GET / HEAD / OPTIONS のリクエスト中の読み込みだけをレプリカで行い、書き込みはすべてプライマリ
+（"default"）で行う。次の場合はプライマリから読む:
+
+- リクエストの外（管理コマンド・バックグラウンドのスレッドなど）
+- プライマリでトランザクション中（select_for_update や書き込み直後の読み込み）
+- 同じリクエストですでに書き込んだ後
+- 直前に書き込んだクライアント（read-your-writes）:
+  書き込んだリクエスト（POST などを含む）のレスポンスで Cookie を付け、
+  REPLICA_PIN_SECONDS 秒（レプリカの遅延より長くする）はプライマリから読む
+
+プライマリから読んだインスタンスの関連（関連の取得・prefetch_related）もプライマリから読む。
+
+運動メニューカタログもレプリカから読む。カタログのバージョンと紐づけるキャッシュ・メモリ上のインデックスは、
+読み込みの前にバージョンを読み、作り直す分だけプライマリから読む（menu_cache / recommendation /
+tag_filter）。遅れているレプリカから読んだ一覧は複製が追いつくまで古いことがある（結果整合）が、
+古い内容が新しいバージョンのキャッシュに残ることはない。
+
+ReplicaRoutingMiddleware をセッション・認証より前に置く（セッションの読み込みも振り分ける）。
+"""
+import contextvars
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+PIN_COOKIE = "primary_pin"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+class _RequestState:
+    def __init__(self, use_replica: bool):
+        self.use_replica = use_replica
+        self.wrote = False
+
+
+_state = contextvars.ContextVar("replica_routing_state", default=None)
+
+
+def replica_alias():
+    """レプリカの接続名（settings.DATABASES に無ければ None）"""
+    alias = getattr(settings, "REPLICA_DATABASE", "replica")
+    return alias if alias in settings.DATABASES else None
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        instance = hints.get("instance")
+        if instance is not None and instance._state.db == DEFAULT_DB_ALIAS:
+            return DEFAULT_DB_ALIAS
+        state = _state.get()
+        alias = replica_alias()
+        if (
+            state is None or not state.use_replica or state.wrote or alias is None
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        return alias
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            # 以降の読み込みはプライマリから（書き込んだ内容がまだレプリカに無い）
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # レプリカはプライマリの複製なので、どちらから読んだインスタンスも関連付けられる
+        aliases = {DEFAULT_DB_ALIAS, replica_alias()}
+        return obj1._state.db in aliases and obj2._state.db in aliases
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # マイグレーションはプライマリのみ（レプリカには複製される）
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaRoutingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def _start(self, request):
+        use_replica = request.method in SAFE_METHODS and PIN_COOKIE not in request.COOKIES
+        return _state.set(_RequestState(use_replica))
+
+    def _finish(self, request, response, token):
+        state = _state.get()
+        _state.reset(token)
+        if replica_alias() is not None and (state.wrote or request.method not in SAFE_METHODS):
+            response.set_cookie(
+                PIN_COOKIE, "1",
+                max_age=getattr(settings, "REPLICA_PIN_SECONDS", 5),
+                httponly=True, samesite="Lax",
+            )
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = self._start(request)
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            _state.reset(token)
+            raise
+        return self._finish(request, response, token)
+
+    async def __acall__(self, request):
+        token = self._start(request)
+        try:
+            response = await self.get_response(request)
+        except BaseException:
+            _state.reset(token)
+            raise
+        return self._finish(request, response, token)
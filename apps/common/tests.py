@@ -0,0 +1,408 @@
+import json
+from datetime import date, datetime, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
+from uuid import UUID
+
+from django.test import SimpleTestCase
+
+
+SAMPLE = {
+    'id': 1,
+    'name': '肩こり解消ストレッチ',
+    'description': '行の区切り 段落の区切り 終わり',
+    'tags': [{'id': 1, 'name': '肩'}, {'id': 2, 'name': 'ストレッチ'}],
+    'updated_at': datetime(2026, 2, 1, 10, 30, 15, 123456, tzinfo=dt_timezone.utc),
+    'log_date': date(2026, 2, 1),
+    'score': Decimal('1.50'),
+    'uuid': UUID('12345678-1234-5678-1234-567812345678'),
+    'big': 2 ** 70,
+    'empty': None,
+}
+
+
+class FastJSONRendererTest(SimpleTestCase):
+    def test_same_bytes_as_drf_renderer(self):
+        from rest_framework.renderers import JSONRenderer
+        from .api.renderers import FastJSONRenderer
+
+        expected = JSONRenderer().render(SAMPLE)
+        self.assertEqual(FastJSONRenderer().render(SAMPLE), expected)
+        self.assertIn(b'\\u2028', expected)
+
+    def test_stdlib_fallback_is_identical(self):
+        from rest_framework.renderers import JSONRenderer
+        from .api import renderers
+
+        with mock.patch.object(renderers, 'orjson', None):
+            self.assertEqual(renderers.FastJSONRenderer().render(SAMPLE), JSONRenderer().render(SAMPLE))
+
+    def test_indent_uses_drf_renderer(self):
+        from rest_framework.renderers import JSONRenderer
+        from .api.renderers import FastJSONRenderer
+
+        media_type = 'application/json; indent=4'
+        self.assertEqual(
+            FastJSONRenderer().render(SAMPLE, media_type),
+            JSONRenderer().render(SAMPLE, media_type),
+        )
+
+    def test_none_renders_empty(self):
+        from .api.renderers import FastJSONRenderer
+
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+    def test_unsupported_type_raises(self):
+        from .api.renderers import dumps
+
+        with self.assertRaises(TypeError):
+            dumps({'value': object()})
+
+
+class StreamingJSONTest(SimpleTestCase):
+    def test_iter_json_matches_dumps(self):
+        from .api.renderers import dumps, iter_json
+
+        rows = [dict(SAMPLE, id=i) for i in range(25)]
+        for chunk_size in (1, 7, 25, 100):
+            streamed = b''.join(iter_json({'next_cursor': 'abc', 'results': iter(rows)}, chunk_size))
+            self.assertEqual(streamed, dumps({'next_cursor': 'abc', 'results': rows}))
+
+    def test_empty_iterator(self):
+        from .api.renderers import iter_json
+
+        self.assertEqual(b''.join(iter_json({'results': iter([])})), b'{"results":[]}')
+
+    def test_streaming_response(self):
+        from .api.renderers import streaming_json_response
+
+        response = streaming_json_response({'results': (i for i in range(3))})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(json.loads(b''.join(response.streaming_content)), {'results': [0, 1, 2]})
+
+
+class PrimaryReplicaRouterTest(SimpleTestCase):
+    def setUp(self):
+        from .db_router import PrimaryReplicaRouter
+        from . import db_router
+
+        self.router = PrimaryReplicaRouter()
+        patcher = mock.patch.object(db_router, 'replica_alias', return_value='replica')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _in_request(self, use_replica):
+        from .db_router import _RequestState, _state
+
+        token = _state.set(_RequestState(use_replica))
+        self.addCleanup(_state.reset, token)
+
+    def test_outside_request_reads_primary(self):
+        self.assertEqual(self.router.db_for_read(None), 'default')
+
+    def test_read_only_request_reads_replica_until_it_writes(self):
+        self._in_request(use_replica=True)
+        self.assertEqual(self.router.db_for_read(None), 'replica')
+        self.assertEqual(self.router.db_for_write(None), 'default')
+        self.assertEqual(self.router.db_for_read(None), 'default')
+
+    def test_related_reads_follow_primary_instances(self):
+        from apps.condition_manager.models import ExerciseMenu, Tag
+
+        self._in_request(use_replica=True)
+        self.assertEqual(self.router.db_for_read(Tag), 'replica')
+        primary = ExerciseMenu(pk=1)
+        primary._state.db = 'default'
+        self.assertEqual(self.router.db_for_read(Tag, instance=primary), 'default')
+        replicated = ExerciseMenu(pk=1)
+        replicated._state.db = 'replica'
+        self.assertEqual(self.router.db_for_read(Tag, instance=replicated), 'replica')
+
+    def test_pinned_request_reads_primary(self):
+        self._in_request(use_replica=False)
+        self.assertEqual(self.router.db_for_read(None), 'default')
+
+    def test_migrations_only_on_primary(self):
+        self.assertTrue(self.router.allow_migrate('default', 'condition_manager'))
+        self.assertFalse(self.router.allow_migrate('replica', 'condition_manager'))
+
+
+# プライマリとレプリカを2つの SQLite ファイルで用意し、レプリカへのコピーを「複製」とみなす
+REPLICA_SETTINGS = '''
+from config.settings.local import *  # noqa
+
+DATABASES = {{
+    "default": {{"ENGINE": "django.db.backends.sqlite3", "NAME": {primary!r}}},
+    "replica": {{"ENGINE": "django.db.backends.sqlite3", "NAME": {replica!r}}},
+}}
+'''
+
+REPLICA_SCRIPT = '''
+import json, shutil, sys
+import django
+django.setup()
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client
+
+from apps.common.db_router import PIN_COOKIE
+
+primary, replica = settings.DATABASES["default"]["NAME"], settings.DATABASES["replica"]["NAME"]
+call_command("migrate", verbosity=0)
+client = Client()
+client.force_login(get_user_model().objects.create_user(username="replicated", password="pass"))
+shutil.copy(primary, replica)  # 複製が追いついた状態
+
+def history_count():
+    return client.get("/api/history/").json()["count"]
+
+result = {"before": history_count()}
+resp = client.post("/api/recommend/", {"fatigue_level": 3, "mood_level": 3}, content_type="application/json")
+result["pinned_cookie"] = PIN_COOKIE in resp.cookies
+result["pinned"] = history_count()  # 書き込んだ直後はプライマリから読む
+del client.cookies[PIN_COOKIE]
+result["replica"] = history_count()  # Cookie が無ければレプリカ（まだ複製されていない）
+shutil.copy(primary, replica)
+result["replicated"] = history_count()
+json.dump(result, sys.stdout)
+'''
+
+
+# レプリカがカタログの変更に追いついていない間の読み込み（キャッシュ・インデックスに古い内容を残さない）
+REPLICA_CATALOG_SCRIPT = '''
+import json, shutil, sys
+import django
+django.setup()
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client
+
+from apps.condition_manager.models import ExerciseMenu, Routine, Tag
+
+primary, replica = settings.DATABASES["default"]["NAME"], settings.DATABASES["replica"]["NAME"]
+call_command("migrate", verbosity=0)
+user = get_user_model().objects.create_user(username="catalog", password="pass")
+tag = Tag.objects.create(name="肩")
+menu = ExerciseMenu.objects.create(name="旧メニュー", description="説明")
+menu.tags.add(tag)
+Routine.objects.create(user=user, exercise=menu)
+client = Client()
+client.force_login(user)
+shutil.copy(primary, replica)
+
+def names(path):
+    data = client.get(path).json()
+    return sorted(row["exercise"]["name"] if "exercise" in row else row["name"] for row in data["results"])
+
+client.get("/api/exercises/")  # キャッシュ・インデックスを作る
+# カタログを変更する（レプリカにはまだ複製されていない）
+menu.name = "新メニュー"
+menu.save()
+ExerciseMenu.objects.create(name="追加メニュー", description="説明").tags.add(tag)
+
+result = {"lagging": {}, "replicated": {}}
+for key in ("lagging", "replicated"):
+    for path in ("/api/routines/", "/api/exercises/", "/api/exercises/?tags=肩"):
+        result[key][path] = names(path)
+    shutil.copy(primary, replica)
+json.dump(result, sys.stdout)
+'''
+
+
+class ReplicaRoutingIntegrationTest(SimpleTestCase):
+    def _run(self, script):
+        import os
+        import subprocess
+        import sys
+        import tempfile
+        from pathlib import Path
+
+        from django.conf import settings
+
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            (tmp / 'replica_settings.py').write_text(REPLICA_SETTINGS.format(
+                primary=str(tmp / 'primary.sqlite3'), replica=str(tmp / 'replica.sqlite3'),
+            ))
+            env = dict(
+                os.environ, DJANGO_SETTINGS_MODULE='replica_settings',
+                PYTHONPATH=os.pathsep.join([str(tmp), str(settings.BASE_DIR)]),
+            )
+            proc = subprocess.run(
+                [sys.executable, '-c', script], cwd=settings.BASE_DIR, env=env,
+                capture_output=True, text=True, timeout=120,
+            )
+        self.assertEqual(proc.returncode, 0, proc.stderr)
+        return json.loads(proc.stdout)
+
+    def test_read_your_writes_with_two_sqlite_files(self):
+        self.assertEqual(self._run(REPLICA_SCRIPT), {
+            'before': 0, 'pinned_cookie': True, 'pinned': 1, 'replica': 0, 'replicated': 1,
+        })
+
+    def test_catalog_is_not_cached_from_lagging_replica(self):
+        result = self._run(REPLICA_CATALOG_SCRIPT)
+        expected = {
+            '/api/exercises/': ['新メニュー', '追加メニュー'],
+            '/api/exercises/?tags=肩': ['新メニュー', '追加メニュー'],
+            '/api/routines/': ['新メニュー'],
+        }
+        # 一覧はレプリカから読むので、複製が追いつくまで追加したメニューは出ない
+        # （内容はプライマリから読み直すので古い名前は返さず、キャッシュにも残らない）
+        self.assertEqual(result['lagging'], dict(expected, **{'/api/exercises/': ['新メニュー']}))
+        self.assertEqual(result['replicated'], expected)
+
+
+class DatabaseProfileTest(SimpleTestCase):
+    def test_sqlite_profile(self):
+        from config.settings.databases import sqlite_database
+
+        database = sqlite_database('/tmp/db.sqlite3')
+        self.assertGreater(database['CONN_MAX_AGE'], 0)
+        self.assertTrue(database['CONN_HEALTH_CHECKS'])
+        self.assertIn('PRAGMA journal_mode=WAL', database['OPTIONS']['init_command'])
+
+    def test_postgres_pool_switch(self):
+        from config.settings.databases import postgres_database
+
+        pgbouncer = postgres_database({'POSTGRES_HOST': 'db'})
+        self.assertEqual(pgbouncer['HOST'], 'db')
+        self.assertTrue(pgbouncer['DISABLE_SERVER_SIDE_CURSORS'])
+
+        psycopg = postgres_database({'DJANGO_DB_POOL': 'psycopg', 'DJANGO_DB_POOL_MAX_SIZE': '20'})
+        self.assertEqual(psycopg['CONN_MAX_AGE'], 0)
+        self.assertEqual(psycopg['OPTIONS']['pool']['max_size'], 20)
+
+        with self.assertRaises(ValueError):
+            postgres_database({'DJANGO_DB_POOL': 'unknown'})
+
+    def test_shared_cache_switch(self):
+        from config.settings.caches import shared_cache
+
+        self.assertEqual(shared_cache({})['BACKEND'], 'django.core.cache.backends.db.DatabaseCache')
+        redis = shared_cache({'DJANGO_CACHE_BACKEND': 'redis', 'REDIS_URL': 'redis://cache:6379/1'})
+        self.assertEqual(redis['LOCATION'], 'redis://cache:6379/1')
+        self.assertNotIn('LocMem', shared_cache({'DJANGO_CACHE_BACKEND': 'memcached'})['BACKEND'])
+
+        with self.assertRaises(ValueError):
+            shared_cache({'DJANGO_CACHE_BACKEND': 'locmem'})
+
+
+PROFILE_SETTINGS = '''
+from config.settings.local import *  # noqa
+from config.settings.databases import sqlite_database
+
+DATABASES = {{"default": sqlite_database({path!r})}}
+'''
+
+CONCURRENCY_SCRIPT = '''
+import json, sys, threading, time
+import django
+django.setup()
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import Client
+
+from apps.condition_manager.models import ConditionLog
+
+call_command("migrate", verbosity=0)
+with connection.cursor() as cursor:
+    pragmas = {}
+    for name in ("journal_mode", "synchronous", "busy_timeout"):
+        cursor.execute(f"PRAGMA {name}")
+        pragmas[name] = cursor.fetchone()[0]
+
+users = [get_user_model().objects.create_user(username=f"user{i}", password="pass") for i in range(4)]
+clients = []
+for user in users:
+    client = Client()
+    client.force_login(user)
+    clients.append(client)
+connection.close()
+
+locked, release = threading.Event(), threading.Event()
+
+def slow_write():
+    # 書き込みのトランザクションを開いたままにする（時間のかかる大量の書き込み）
+    # キャッシュを小さくして変更をファイルに書き出させる（WAL でなければ排他ロックになり読み込みも待つ）
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA cache_size=10")
+    with transaction.atomic():
+        ConditionLog.objects.bulk_create(
+            [ConditionLog(user=users[0], fatigue_level=3, mood_level=3, body_concern="x" * 200) for _ in range(2000)]
+        )
+        locked.set()
+        release.wait(30)
+    connection.close()
+
+write_statuses = []
+
+def recommend(client):
+    for _ in range(5):
+        resp = client.post(
+            "/api/recommend/", {"fatigue_level": 3, "mood_level": 3}, content_type="application/json"
+        )
+        write_statuses.append(resp.status_code)
+    connection.close()
+
+writer = threading.Thread(target=slow_write)
+writer.start()
+locked.wait(30)
+
+posters = [threading.Thread(target=recommend, args=(client,)) for client in clients[1:]]
+for poster in posters:
+    poster.start()
+
+# 書き込み中（ロックを持ったまま）に読み込む。ブロックされると release されないまま待ち続ける
+start = time.perf_counter()
+read_statuses = [clients[1].get("/api/history/").status_code for _ in range(10)]
+read_seconds = time.perf_counter() - start
+release.set()
+
+writer.join()
+for poster in posters:
+    poster.join()
+json.dump({
+    "pragmas": pragmas, "read_statuses": read_statuses, "read_seconds": read_seconds,
+    "write_statuses": write_statuses, "logs": ConditionLog.objects.count(),
+}, sys.stdout)
+'''
+
+
+class SQLiteConcurrencyTest(SimpleTestCase):
+    def test_reads_are_not_blocked_by_recommend_writes(self):
+        import os
+        import subprocess
+        import sys
+        import tempfile
+        from pathlib import Path
+
+        from django.conf import settings
+
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            (tmp / 'profile_settings.py').write_text(PROFILE_SETTINGS.format(path=str(tmp / 'db.sqlite3')))
+            env = dict(
+                os.environ, DJANGO_SETTINGS_MODULE='profile_settings',
+                PYTHONPATH=os.pathsep.join([str(tmp), str(settings.BASE_DIR)]),
+            )
+            proc = subprocess.run(
+                [sys.executable, '-c', CONCURRENCY_SCRIPT], cwd=settings.BASE_DIR, env=env,
+                capture_output=True, text=True, timeout=180,
+            )
+        self.assertEqual(proc.returncode, 0, proc.stderr)
+        result = json.loads(proc.stdout)
+        self.assertEqual(result['pragmas'], {'journal_mode': 'wal', 'synchronous': 1, 'busy_timeout': 20000})
+        # 読み込みは書き込みのロックを待たない
+        self.assertEqual(result['read_statuses'], [200] * 10)
+        self.assertLess(result['read_seconds'], 5)
+        # 書き込みはロック待ちの後にすべて成功する
+        self.assertEqual(result['write_statuses'], [200] * 15)
+        self.assertEqual(result['logs'], 2015)
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class ConditionManagerConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.condition_manager'
+
+    def ready(self):
+        # シグナルの登録
+        from . import signals  # noqa: F401
+        # システムチェックの登録（共有キャッシュ）
+        from . import checks  # noqa: F401
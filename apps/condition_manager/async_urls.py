@@ -0,0 +1,15 @@
+from django.urls import path
+from . import async_views
+
+# urls.py と同じURL・名前で非同期版のビューを使う（settings.ASYNC_API = True のとき）
+urlpatterns = [
+    path('recommend/', async_views.recommend_exercise_view, name='recommend_exercise'),
+    path('recommend/batch/', async_views.recommend_batch_view, name='recommend_batch'),
+    path('routines/<int:exercise_id>/', async_views.routine_manage_view, name='manage_routine'),
+    path('routines/bulk/', async_views.routine_bulk_view, name='bulk_routine'),
+    path('history/', async_views.history_list_view, name='history_list'),
+    path('trends/', async_views.condition_trends_view, name='condition_trends'),
+    path('routines/', async_views.routine_list_view, name='routine_list'),
+    path('exercises/', async_views.exercise_list_view, name='exercise-list'),
+    path('exercises/<int:pk>/', async_views.exercise_detail_view, name='exercise-detail'),
+]
@@ -0,0 +1,374 @@
+"""
+condition_manager API の非同期版（ASGI 用）
+
+views.py の DRF のビューと同じURL・同じレスポンス（JSON）を返す。
+DBアクセスは Django の非同期ORM（aget / acreate / async for など）で行うので、
+ASGI サーバー（uvicorn など）ではリクエストごとにスレッドを使わない。
+settings.ASYNC_API = True のとき config/urls.py がこちらのURLを使う。
+
+認証はセッション（request.auser()）のみ。CSRF は DRF の SessionAuthentication と同じく
+ログイン中のユーザーだけ確認し、失敗したら JSON の 403 を返す（CsrfViewMiddleware の HTML の 403 は使わない）。
+全文検索（生SQL）と提案結果の作成（キャッシュ・メモリ上のインデックス）は
+同期処理なので sync_to_async で呼ぶ。
+"""
+import json
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.core.paginator import Paginator
+from django.http import HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.exceptions import MethodNotAllowed, NotAuthenticated, ParseError, PermissionDenied
+
+from apps.common.api.renderers import dumps
+
+from .catalog import get_catalog_version
+from .http_cache import (
+    add_cache_headers, catalog_etag, last_modified_timestamp, menu_etag, not_modified_response,
+)
+from .log_buffer import asave_condition_log, save_condition_logs
+from .models import ConditionLog, ExerciseMenu, Routine
+from .pagination import InvalidCursor, apaginate_by_cursor
+from .recommendation import get_recommendation_payload, get_recommendation_payloads
+from .summaries import parse_trend_params, summarize_trends
+from .view_counter import arecord_routine_view, merge_pending_views
+from .menu_cache import get_menu_payloads, serialize_menus
+from .views import (
+    HISTORY_ORDERING,
+    REST_SUGGESTION,
+    ROUTINE_ORDERING,
+    apply_routine_changes,
+    batch_results,
+    build_exercise_queryset,
+    cursor_page_size,
+    exercise_facets,
+    history_queryset,
+    parse_batch_input,
+    parse_condition_input,
+    parse_routine_bulk_input,
+    require_object,
+    resolve_exercise_ids,
+    routine_queryset,
+    serialize_logs,
+    serialize_routines,
+    tag_conditions,
+    trend_summaries_queryset,
+    wants_facets,
+)
+
+
+# ---- 共通 ----
+def json_response(data, status=status.HTTP_200_OK):
+    # DRF の JSONRenderer と同じ出力（orjson があれば orjson で変換する）
+    return HttpResponse(dumps(data), status=status, content_type="application/json")
+
+
+def _exception_response(exc, status_code=None):
+    return json_response({"detail": str(exc.detail)}, status=status_code or exc.status_code)
+
+
+def async_api_view(methods):
+    """
+    @api_view + @permission_classes([IsAuthenticated]) の非同期版
+    許可していないメソッドは 405、未ログイン・CSRF の確認に失敗したときは 403（DRF と同じ内容）を返す
+    """
+    def decorator(view):
+        # CSRF はここで確認する（CsrfViewMiddleware では確認しない）
+        @csrf_exempt
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                return _exception_response(MethodNotAllowed(request.method))
+            user = await request.auser()
+            if not user.is_authenticated:
+                # セッション認証なので DRF と同じく 401 ではなく 403
+                return _exception_response(NotAuthenticated(), status.HTTP_403_FORBIDDEN)
+            request.user = user
+            try:
+                SessionAuthentication().enforce_csrf(request)
+            except PermissionDenied as exc:
+                return _exception_response(exc)
+            return await view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def request_data(request):
+    """request.data 相当（JSON のオブジェクトかフォーム、それ以外は ParseError）"""
+    if request.content_type == "application/json":
+        try:
+            data = json.loads(request.body or b"{}")
+        except ValueError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
+        return require_object(data)
+    return request.POST
+
+
+async def apaginate(object_list, page_number, per_page=6):
+    """
+    Paginator.get_page の非同期版
+    戻り値: (総件数, 総ページ数, 現在のページ番号, そのページの行のリスト)
+    """
+    if isinstance(object_list, list):
+        count = len(object_list)
+    else:
+        count = await object_list.acount()
+
+    # ページ番号の扱い（範囲外なら最後のページなど）は Paginator に任せる
+    paginator = Paginator(range(count), per_page)
+    page = paginator.get_page(page_number)
+    bottom = (page.number - 1) * per_page
+    items = object_list[bottom:bottom + per_page]
+    if not isinstance(items, list):
+        items = [item async for item in items]
+    return paginator.count, paginator.num_pages, page.number, items
+
+
+def page_response(count, num_pages, number, data, **extra):
+    return json_response({
+        "count": count,  # 総件数
+        "total_pages": num_pages,  # 総ページ数
+        "current_page": number,  # 現在のページ番号
+        "results": data,  # データ
+        **extra,
+    })
+
+
+async def cursor_page_response(request, queryset, ordering, serialize):
+    """serialize: そのページの行のリストをシリアライズする同期関数（views と共通）"""
+    try:
+        items, next_cursor = await apaginate_by_cursor(
+            queryset, ordering, request.GET.get("cursor"), cursor_page_size(request)
+        )
+    except InvalidCursor:
+        return json_response(
+            {"error": "cursor の指定が正しくありません。"}, status=status.HTTP_400_BAD_REQUEST
+        )
+    return json_response({
+        "next_cursor": next_cursor,
+        "results": await sync_to_async(serialize)(items),
+    })
+
+
+# ---- API ----
+@async_api_view(["POST"])
+async def recommend_exercise_view(request):
+    """体調ログを保存し、運動メニューを最大3件提案するAPI"""
+    try:
+        data = request_data(request)
+    except ParseError as exc:
+        return _exception_response(exc)
+
+    values, error = parse_condition_input(data)
+    if error:
+        return json_response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+    fatigue, mood, concern = values
+
+    await asave_condition_log(ConditionLog(
+        user=request.user,
+        fatigue_level=fatigue,
+        mood_level=mood,
+        body_concern=concern,
+    ))
+
+    recommended = await sync_to_async(get_recommendation_payload)(fatigue, mood, concern, limit=3)
+    if not recommended:
+        return json_response(REST_SUGGESTION)
+    return json_response(recommended)
+
+
+@async_api_view(["POST"])
+async def recommend_batch_view(request):
+    """体調の入力をまとめて保存し、入力ごとに運動メニューを提案するAPI"""
+    try:
+        data = request_data(request)
+    except ParseError as exc:
+        return _exception_response(exc)
+
+    values, error = parse_batch_input(data)
+    if error:
+        return json_response(error, status=status.HTTP_400_BAD_REQUEST)
+
+    await sync_to_async(save_condition_logs)([
+        ConditionLog(
+            user=request.user,
+            fatigue_level=fatigue,
+            mood_level=mood,
+            body_concern=concern,
+            log_date=log_date,
+        )
+        for fatigue, mood, concern, log_date in values
+    ])
+
+    payloads = await sync_to_async(get_recommendation_payloads)([value[:3] for value in values], limit=3)
+    return json_response({"results": batch_results(values, payloads)})
+
+
+@async_api_view(["POST", "DELETE"])
+async def routine_manage_view(request, exercise_id: int):
+    """特定の運動メニューをルーティンに追加・削除するAPI"""
+    try:
+        exercise = await ExerciseMenu.objects.aget(pk=exercise_id)
+    except ExerciseMenu.DoesNotExist:
+        return json_response(
+            {"error": f"運動メニューID: {exercise_id} が見つかりません。"},
+            status=status.HTTP_404_NOT_FOUND,
+        )
+
+    if request.method == "POST":
+        routine, created = await Routine.objects.aget_or_create(user=request.user, exercise=exercise)
+        routine.exercise = exercise  # 登録済みの場合もメニューを読み直さない
+        data = (await sync_to_async(serialize_routines)([routine]))[0]
+        if created:
+            return json_response(
+                {"message": "ルーティンに追加しました", "routine": data},
+                status=status.HTTP_201_CREATED,
+            )
+        return json_response({
+            "message": "この運動メニューは既にルーティンに登録されています。",
+            "routine": data,
+        })
+
+    deleted_count, _ = await Routine.objects.filter(user=request.user, exercise=exercise).adelete()
+    if deleted_count == 0:
+        return json_response(
+            {"error": f"ルーティンに運動メニューID: {exercise_id} が登録されていないため削除できません。"},
+            status=status.HTTP_404_NOT_FOUND,
+        )
+    return HttpResponse(status=status.HTTP_204_NO_CONTENT)
+
+
+@async_api_view(["POST"])
+async def routine_bulk_view(request):
+    """ルーティンに運動メニューをまとめて追加・削除し、更新後のルーティン一覧のページを返すAPI"""
+    try:
+        data = request_data(request)
+    except ParseError as exc:
+        return _exception_response(exc)
+
+    values, error = parse_routine_bulk_input(data)
+    if error:
+        return json_response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+    add, remove = values
+
+    removed, missing = await sync_to_async(apply_routine_changes)(request.user, add, remove)
+    if missing:
+        return json_response(
+            {"error": "運動メニューが見つかりません。", "missing": missing},
+            status=status.HTTP_404_NOT_FOUND,
+        )
+
+    routines = routine_queryset(request.user)
+    return await routine_page_response(request, routines, removed=removed)
+
+
+@async_api_view(["GET"])
+async def history_list_view(request):
+    """ログインユーザーの体調ログ履歴（新しい順、最大20件・6件ごと、cursor 指定でカーソル方式）"""
+    logs = history_queryset(request.user)
+
+    if "cursor" in request.GET:
+        return await cursor_page_response(request, logs, HISTORY_ORDERING, serialize_logs)
+
+    # 最大20件なのでまとめて取得してからページに分ける（COUNT を発行しない）
+    logs = [log async for log in logs[:20]]
+    count, num_pages, number, items = await apaginate(logs, request.GET.get("page", 1))
+    return page_response(count, num_pages, number, serialize_logs(items))
+
+
+@async_api_view(["GET"])
+async def condition_trends_view(request):
+    """ログインユーザーの体調の推移（日別集計のみを読む。start / end / period を指定できる）"""
+    params, error = parse_trend_params(request.GET)
+    if error:
+        return json_response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+    start, end, period = params
+
+    summaries = [summary async for summary in trend_summaries_queryset(request.user, start, end)]
+    return json_response({
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "period": period,
+        "results": summarize_trends(summaries, period),
+    })
+
+
+@async_api_view(["GET"])
+async def routine_list_view(request):
+    """ログインユーザーのルーティン一覧（閲覧数順、最大20件・6件ごと、cursor 指定でカーソル方式）"""
+    routines = routine_queryset(request.user)
+
+    if "cursor" in request.GET:
+        version = await sync_to_async(get_catalog_version)()
+        return await cursor_page_response(
+            request, routines, ROUTINE_ORDERING, lambda rows: serialize_routines(rows, version)
+        )
+    return await routine_page_response(request, routines)
+
+
+async def routine_page_response(request, routines, **extra):
+    # メニューのシリアライズ結果をキャッシュするときのバージョン（ルーティンを読む前に読む）
+    version = await sync_to_async(get_catalog_version)()
+    # 未反映の閲覧数を足して並べ直す
+    top_routines = [routine async for routine in routines[:20]]
+    top_routines = await sync_to_async(merge_pending_views)(top_routines, routines, request.user.pk, 20)
+    count, num_pages, number, items = await apaginate(top_routines, request.GET.get("page", 1))
+    # メニューのシリアライズ結果はキャッシュ（同期）から組み立てる
+    return page_response(count, num_pages, number, await sync_to_async(serialize_routines)(items, version), **extra)
+
+
+@async_api_view(["GET"])
+async def exercise_list_view(request):
+    """運動メニュー一覧・検索API（パラメータ・並び順は views.exercise_list_view と同じ）"""
+    version = await sync_to_async(get_catalog_version)()
+    etag = catalog_etag(version, request.GET)
+    not_modified = not_modified_response(request, etag)
+    if not_modified is not None:
+        return not_modified
+
+    keyword = request.GET.get("q", "").strip()
+    clauses = tag_conditions(request.GET)
+
+    # 全文検索（生SQL）とタグのインデックスの構築は同期処理
+    ranked_ids = await sync_to_async(resolve_exercise_ids)(keyword, clauses)
+    exercises = build_exercise_queryset(keyword, ranked_ids)
+
+    count, num_pages, number, items = await apaginate(
+        exercises if ranked_ids is None else ranked_ids, request.GET.get("page", 1)
+    )
+    if ranked_ids is None:
+        results = await sync_to_async(serialize_menus)(items, version)
+    else:
+        results = await sync_to_async(get_menu_payloads)(items)
+
+    extra = {}
+    if wants_facets(request):
+        extra["facets"] = await sync_to_async(exercise_facets)(keyword, clauses, ranked_ids, exercises)
+    response = page_response(count, num_pages, number, results, **extra)
+    return add_cache_headers(response, etag)
+
+
+@async_api_view(["GET"])
+async def exercise_detail_view(request, pk: int):
+    """特定の運動メニューの詳細情報を返すAPI"""
+    # シリアライズ結果をキャッシュするときのバージョン（メニューを読む前に読む）
+    version = await sync_to_async(get_catalog_version)()
+    try:
+        exercise = await ExerciseMenu.objects.aget(pk=pk)
+    except ExerciseMenu.DoesNotExist:
+        return json_response(
+            {"error": f"運動メニューID: {pk} が見つかりません。"},
+            status=status.HTTP_404_NOT_FOUND,
+        )
+    await arecord_routine_view(request.user.pk, exercise.pk)
+
+    etag = menu_etag(exercise.pk, exercise.updated_at)
+    last_modified = last_modified_timestamp(exercise.updated_at)
+    not_modified = not_modified_response(request, etag, last_modified)
+    if not_modified is not None:
+        return not_modified
+
+    data = (await sync_to_async(serialize_menus)([exercise], version))[0]
+    return add_cache_headers(json_response(data), etag, last_modified)
@@ -0,0 +1,49 @@
+"""
+運動メニューカタログのバージョン管理
+
+メニュー・タグが変更されるたびにバージョンを上げる。
+キャッシュのキーやメモリ上のインデックスはこのバージョンと紐づけ、古い内容を使わないようにする。
+バージョンは default のキャッシュに置くので、ワーカープロセスが複数あるときは共有キャッシュが必要
+（本番の設定は config/settings/caches.py、LocMemCache のままならシステムチェックでエラーになる: checks.py）
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+CATALOG_VERSION_KEY = "condition_manager:catalog_version"
+
+
+def _initial_version() -> int:
+    # キャッシュから追い出されて作り直した場合でも、過去の値に戻らないよう時刻を使う
+    return int(time.time() * 1000)
+
+
+def get_catalog_version() -> int:
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOG_VERSION_KEY, _initial_version(), timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def bump_catalog_version() -> int:
+    try:
+        return cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        # キーが無い場合
+        version = _initial_version()
+        cache.set(CATALOG_VERSION_KEY, version, timeout=None)
+        return version
+
+
+def catalog_changed():
+    """
+    メニュー・タグを変更したときに呼ぶ（signals.py）
+    すぐにバージョンを上げ（変更したトランザクション内の読み込みで古いキャッシュを使わない）、
+    コミット時にもう一度上げる（コミット前に他のリクエストが古い内容を新しいバージョンで
+    キャッシュしていても、コミット後は使われない）
+    """
+    bump_catalog_version()
+    transaction.on_commit(bump_catalog_version)
@@ -0,0 +1,29 @@
+"""
+システムチェック（python manage.py check / runserver / migrate のときに実行される）
+"""
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+
+LOCMEM_BACKEND = "django.core.cache.backends.locmem.LocMemCache"
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    カタログのバージョン（catalog.py）はキャッシュで全プロセスと共有するので、
+    ワーカーが複数あるときにプロセスごとの LocMemCache を使っていたらエラーにする
+    """
+    backend = settings.CACHES["default"]["BACKEND"]
+    if settings.WEB_CONCURRENCY > 1 and backend == LOCMEM_BACKEND:
+        return [
+            Error(
+                "ワーカープロセスが複数あるのに、キャッシュがプロセスごとの LocMemCache です",
+                hint=(
+                    "メニュー・タグの変更が他のワーカーに伝わりません。"
+                    "DJANGO_CACHE_BACKEND で共有キャッシュ（database / redis / memcached）を使ってください"
+                ),
+                id="condition_manager.E001",
+            )
+        ]
+    return []
@@ -0,0 +1,91 @@
+"""
+体の悩み（自由記述）とタグ・対象部位の照合
+
+タグ名と target_area からキーワードを作り、Aho-Corasick 法のオートマトンで
+悩みの文章を1回走査するだけで、含まれるキーワードをすべて見つける。
+"""
+import re
+from collections import deque
+
+from .scoring import normalize_concern, normalize_tag
+
+
+# タグ名から取り除く語尾（「肩こり解消」→「肩こり」でも照合できるようにする）
+KEYWORD_SUFFIXES = ("解消", "改善", "軽減", "予防", "対策", "向け")
+
+# target_area の区切り文字（例: 「肩、背中」「首・肩」）
+AREA_SEPARATORS = re.compile(r"[、,，・/／\s]+")
+
+
+def tag_keywords(name: str) -> set:
+    keyword = normalize_tag(name or "")
+    if not keyword:
+        return set()
+
+    keywords = {keyword}
+    for suffix in KEYWORD_SUFFIXES:
+        if keyword.endswith(suffix) and len(keyword) > len(suffix):
+            keywords.add(keyword[: -len(suffix)])
+    return keywords
+
+
+def area_keywords(target_area: str) -> set:
+    return {area for area in AREA_SEPARATORS.split((target_area or "").lower()) if area}
+
+
+def menu_keywords(tag_names, target_area: str) -> set:
+    """メニュー1件分のキーワード（悩みの文章にどれかが含まれていれば一致）"""
+    keywords = area_keywords(target_area)
+    for name in tag_names:
+        keywords |= tag_keywords(name)
+    return keywords
+
+
+class ConcernMatcher:
+    """
+    キーワード -> 照合結果として返す値（タグIDなど）の対応からオートマトンを作る
+    match() は悩みの文章に含まれるキーワードに対応する値をまとめて返す
+    """
+
+    def __init__(self, keywords: dict):
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [set()]
+
+        # ---- キーワードの木（トライ）を作る ----
+        for keyword, values in keywords.items():
+            node = 0
+            for ch in keyword:
+                child = self._goto[node].get(ch)
+                if child is None:
+                    child = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append(set())
+                    self._goto[node][ch] = child
+                node = child
+            self._output[node] |= set(values)
+
+        # ---- 失敗時の遷移先を幅優先で設定する ----
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(ch, 0)
+                # 遷移先で見つかるキーワード（接尾辞）も出力に含める
+                self._output[child] |= self._output[self._fail[child]]
+                queue.append(child)
+
+    def match(self, concern: str) -> frozenset:
+        found = set()
+        node = 0
+        for ch in normalize_concern(concern):
+            while node and ch not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(ch, 0)
+            if self._output[node]:
+                found |= self._output[node]
+        return frozenset(found)
@@ -0,0 +1,49 @@
+"""
+運動メニューAPIの HTTP キャッシュ（条件付き GET）
+
+- 詳細API: メニューの updated_at から ETag / Last-Modified を作る
+- 一覧API: カタログのバージョンとクエリパラメータから ETag を作る
+If-None-Match / If-Modified-Since が一致すれば 304 を返し、シリアライズを行わない。
+Cache-Control でブラウザにも一定時間キャッシュさせる
+（ログインが必要なAPIなので private にして共有キャッシュには保存させず、Vary: Cookie でユーザーごとに分ける）。
+"""
+import hashlib
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+
+def menu_etag(pk: int, updated_at, variant: str = "json") -> str:
+    # variant: レスポンスの形式（DRF のブラウザ表示用の HTML と JSON を区別する）
+    return quote_etag(f"menu-{pk}-{updated_at.timestamp():.6f}-{variant}")
+
+
+def catalog_etag(version: int, params, variant: str = "json") -> str:
+    """一覧API用。params は request.GET（パラメータの順序に関係なく同じ値になる）"""
+    query = urlencode(sorted(params.lists()), doseq=True)
+    digest = hashlib.md5(f"{version}\0{query}\0{variant}".encode("utf-8")).hexdigest()
+    return quote_etag(f"catalog-{digest}")
+
+
+def last_modified_timestamp(updated_at) -> int:
+    # HTTP の日時は秒単位
+    return int(updated_at.timestamp())
+
+
+def not_modified_response(request, etag: str, last_modified: int = None):
+    """クライアントのキャッシュが最新なら 304 のレスポンス、そうでなければ None"""
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        add_cache_headers(response, etag, last_modified)
+    return response
+
+
+def add_cache_headers(response, etag: str, last_modified: int = None):
+    response.headers["ETag"] = etag
+    if last_modified is not None:
+        response.headers["Last-Modified"] = http_date(last_modified)
+    patch_cache_control(response, private=True, max_age=getattr(settings, "CATALOG_CACHE_MAX_AGE", 60))
+    patch_vary_headers(response, ["Accept", "Cookie"])
+    return response
@@ -0,0 +1,309 @@
+"""
+体調ログの書き込みバッファ（ライトビハインド）
+
+settings.CONDITION_LOG_WRITE_BEHIND = True のとき、推薦APIは ConditionLog をその場で保存せず
+プロセス内のバッファに積んでレスポンスを返す。バッファはバックグラウンドのスレッドが
+件数（CONDITION_LOG_BUFFER_SIZE）か時間（CONDITION_LOG_FLUSH_INTERVAL 秒）のしきい値で
+bulk_create でまとめて保存する。
+
+プロセス終了時には残りを保存する。まとめて保存できなかった場合は1件ずつ保存し直し、
+- 内容の問題で保存できないログ（IntegrityError など。削除されたユーザーのログなど）は
+  隔離ファイル（CONDITION_LOG_QUARANTINE_PATH）に書き出す（他のログの保存を妨げない）
+- DBに接続できないなどで保存できなかった分は退避ファイル（CONDITION_LOG_SPOOL_PATH）に
+  書き出し、次回の保存時に取り込む（ログを失わない）
+  退避ファイルは別名（*.{PID}.reading）にしてから読み、保存が終わってから消す。途中でプロセスが
+  落ちて残ったファイルは、次の保存時（スレッドの起動時を含む）に、PID のプロセスが
+  もう無ければ取り込む（まれに同じログを2回保存することはあるが、失いはしない）
+※ created_at は保存した時刻になる（auto_now_add のため）
+保存時に condition_logs_recorded シグナルを送り、日別集計も同じトランザクションで更新する。
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+import uuid
+from datetime import date
+from pathlib import Path
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, DataError, IntegrityError, connection, transaction
+
+from .models import ConditionLog
+from .signals import condition_logs_recorded
+
+
+logger = logging.getLogger(__name__)
+
+
+def _to_record(log: ConditionLog) -> dict:
+    # log_date の初期値は timezone.now（datetime）なので日付に揃える
+    log_date = ConditionLog._meta.get_field("log_date").to_python(log.log_date)
+    return {
+        "user_id": log.user_id,
+        "log_date": log_date.isoformat(),
+        "fatigue_level": log.fatigue_level,
+        "mood_level": log.mood_level,
+        "body_concern": log.body_concern,
+    }
+
+
+def _from_record(record: dict) -> ConditionLog:
+    return ConditionLog(**dict(record, log_date=date.fromisoformat(record["log_date"])))
+
+
+class ConditionLogBuffer:
+    def __init__(self, max_size=100, interval=1.0, spool_path=None, quarantine_path=None, autostart=True):
+        self.max_size = max_size
+        self.interval = interval
+        self.spool_path = Path(spool_path) if spool_path else None
+        self.quarantine_path = Path(quarantine_path) if quarantine_path else None
+        self.autostart = autostart
+
+        self._pending = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, log: ConditionLog):
+        with self._lock:
+            self._pending.append(log)
+            full = len(self._pending) >= self.max_size
+
+        if not self.autostart:
+            # スレッドを使わない場合（テストなど）はその場で保存する
+            if full:
+                self.flush()
+            return
+
+        self._ensure_thread()
+        if full:
+            self._wakeup.set()
+
+    def flush(self) -> int:
+        """溜まっているログ（と前回保存できなかった分）を保存し、保存した件数を返す"""
+        with self._flush_lock:
+            with self._lock:
+                logs, self._pending = self._pending, []
+            spooled, spool_files = self._read_spool()
+            logs = spooled + logs
+            if not logs:
+                saved = 0
+            else:
+                try:
+                    save_condition_logs(logs)
+                    saved = len(logs)
+                except DatabaseError:
+                    logger.warning("体調ログ %d 件をまとめて保存できなかったため1件ずつ保存します", len(logs), exc_info=True)
+                    saved = self._save_each(logs)
+            # 保存した（保存できなかった分は退避・隔離し直した）ので、読み込んだ退避ファイルを消す
+            for path in spool_files:
+                path.unlink(missing_ok=True)
+            return saved
+
+    def _save_each(self, logs) -> int:
+        saved = 0
+        rejected = []
+        for i, log in enumerate(logs):
+            # 失敗したまとめての保存で付いた主キーを外す
+            log.pk = None
+            log._state.adding = True
+            try:
+                save_condition_logs([log])
+            except (IntegrityError, DataError):
+                rejected.append(log)
+            except DatabaseError:
+                # DBに接続できないなど（残りもすべて保存できない）
+                logger.exception("体調ログ %d 件を保存できなかったためファイルに退避します", len(logs) - i)
+                self._write_spool(logs[i:])
+                break
+            else:
+                saved += 1
+        if rejected:
+            logger.error("保存できない体調ログ %d 件を隔離しました", len(rejected))
+            self._write_records(self.quarantine_path, [_to_record(log) for log in rejected], "隔離")
+        return saved
+
+    def close(self):
+        """スレッドを止めて残りを保存する（プロセス終了時に呼ばれる）"""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=max(self.interval, 1.0) * 5)
+        self.flush()
+
+    # ---- バックグラウンドスレッド ----
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="condition-log-writer", daemon=True
+                )
+                # 起動したらすぐに1回保存する（前回のプロセスが残した退避ファイルを取り込む）
+                self._wakeup.set()
+                self._thread.start()
+
+    def _run(self):
+        try:
+            while not self._stopped.is_set():
+                self._wakeup.wait(self.interval)
+                self._wakeup.clear()
+                try:
+                    self.flush()
+                except Exception:
+                    # 想定外のエラーでもスレッドを止めない（残りは次回保存する）
+                    logger.exception("体調ログの保存中にエラーが発生しました")
+        finally:
+            # このスレッド用のDB接続を閉じる
+            connection.close()
+
+    # ---- 退避ファイル ----
+    def _write_spool(self, logs):
+        self._write_records(self.spool_path, [_to_record(log) for log in logs], "退避")
+
+    def _write_records(self, path, records, label):
+        if path is None:
+            logger.error("%s先が設定されていないため体調ログ %d 件を破棄しました", label, len(records))
+            return
+        with open(path, "a", encoding="utf-8") as f:
+            for record in records:
+                f.write((record if isinstance(record, str) else json.dumps(record, ensure_ascii=False)) + "\n")
+
+    def _reading_path(self, suffix: str = "") -> Path:
+        return self.spool_path.with_name(f"{self.spool_path.name}.{os.getpid()}{suffix}.reading")
+
+    def _claim_leftovers(self) -> list:
+        """
+        読み込み中のまま残った退避ファイル（PID のプロセスがもう無いもの、またはこのプロセスで
+        前回の保存が途中で失敗したもの）を、このプロセスの名前に変えて返す
+        """
+        prefix = self.spool_path.name + "."
+        claimed = []
+        for path in sorted(self.spool_path.parent.glob(prefix + "*.reading")):
+            try:
+                pid = int(path.name[len(prefix):-len(".reading")].split(".")[0])
+            except ValueError:
+                continue
+            if pid != os.getpid() and _pid_alive(pid):
+                continue
+            target = self._reading_path(f".{uuid.uuid4().hex[:8]}")
+            try:
+                # 同時に他のプロセスが取り込んだ場合は、どちらか一方だけが名前を変えられる
+                os.replace(path, target)
+            except FileNotFoundError:
+                continue
+            claimed.append(target)
+        if claimed:
+            logger.warning("読み込み中のまま残った退避ファイル %d 件を取り込みます", len(claimed))
+        return claimed
+
+    def _read_spool(self):
+        """
+        退避ファイルを読む。戻り値は (ログ, 読み込んだファイル)
+        ファイルは保存が終わってから消す（flush）
+        """
+        if self.spool_path is None:
+            return [], []
+        paths = self._claim_leftovers()
+        # 別名にしてから読む（読み込み中に追記されても取りこぼさない）
+        reading = self._reading_path()
+        try:
+            os.replace(self.spool_path, reading)
+            paths.append(reading)
+        except FileNotFoundError:
+            pass
+
+        logs, broken = [], []
+        for path in paths:
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        logs.append(_from_record(json.loads(line)))
+                    except (ValueError, TypeError, KeyError):
+                        broken.append(line.rstrip("\n"))
+        if broken:
+            # 読めない行は隔離する（毎回の保存を妨げない）
+            logger.error("退避ファイルの読めない行 %d 件を隔離しました", len(broken))
+            self._write_records(self.quarantine_path, broken, "隔離")
+        return logs, paths
+
+
+def _pid_alive(pid: int) -> bool:
+    if os.name != "posix":
+        # シグナル 0 でプロセスの有無を確かめられないので、残っているとみなす（取り込まない）
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # 別のユーザーのプロセス
+        return True
+    return True
+
+
+# ---- プロセス内で共有するバッファ ----
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_log_buffer() -> ConditionLogBuffer:
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = ConditionLogBuffer(
+                    max_size=getattr(settings, "CONDITION_LOG_BUFFER_SIZE", 100),
+                    interval=getattr(settings, "CONDITION_LOG_FLUSH_INTERVAL", 1.0),
+                    spool_path=getattr(settings, "CONDITION_LOG_SPOOL_PATH", None),
+                    quarantine_path=getattr(settings, "CONDITION_LOG_QUARANTINE_PATH", None),
+                )
+                atexit.register(_buffer.close)
+    return _buffer
+
+
+def save_condition_log(log: ConditionLog):
+    """
+    体調ログを保存する
+    ライトビハインドが有効ならバッファに積むだけで、保存はバックグラウンドで行う
+    """
+    if getattr(settings, "CONDITION_LOG_WRITE_BEHIND", False):
+        get_log_buffer().add(log)
+    else:
+        _save_log(log)
+
+
+def _save_log(log: ConditionLog):
+    # 日別集計の更新（post_save）もログの保存と同じトランザクションで行う
+    with transaction.atomic():
+        log.save()
+
+
+def save_condition_logs(logs):
+    """
+    体調ログをまとめて保存する（bulk_create、ライトビハインドの設定に関係なくその場で保存する）
+    日別集計などの更新（condition_logs_recorded）も同じトランザクションで行う
+    """
+    logs = list(logs)
+    with transaction.atomic():
+        ConditionLog.objects.bulk_create(logs, batch_size=500)
+        condition_logs_recorded.send(sender=ConditionLog, logs=logs)
+    return logs
+
+
+async def asave_condition_log(log: ConditionLog):
+    """save_condition_log の非同期版（バッファに積む処理はブロックしないのでそのまま呼ぶ）"""
+    if getattr(settings, "CONDITION_LOG_WRITE_BEHIND", False):
+        get_log_buffer().add(log)
+    else:
+        await sync_to_async(_save_log)(log)
@@ -0,0 +1,267 @@
+"""
+/api/ の各エンドポイントのベンチマーク
+
+使い方:
+    python manage.py bench_api --users 20 --logs 200 --menus 1000 --tags 40
+    python manage.py bench_api --save-baseline bench_baseline.json
+    python manage.py bench_api --baseline bench_baseline.json --tolerance 0.2
+
+テスト用のDBを作ってデータを投入し、テストクライアント経由で各APIを呼び出す。
+エンドポイントごとに p50/p95 のレイテンシ、クエリ数、ピークメモリを表示し、
+--baseline を指定した場合は基準値を超えたものがあればエラー終了する。
+"""
+import json
+import random
+import time
+import tracemalloc
+from datetime import timedelta
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.condition_manager import search
+from apps.condition_manager.catalog import bump_catalog_version
+from apps.condition_manager.models import ConditionLog, ExerciseMenu, Routine, Tag
+
+
+TAG_NAMES = [
+    "ストレッチ", "筋トレ", "有酸素", "リラックス", "呼吸法", "初心者向け", "短時間",
+    "座ったまま", "肩こり解消", "腰痛改善", "気分転換", "高強度", "瞑想", "達成感",
+]
+AREAS = ["肩", "腰", "首", "背中", "脚", "全身", "肩、背中", "首・肩"]
+CONCERNS = ["", "肩こり", "腰が痛い", "首がつらい", "脚がむくむ", "なんとなくだるい"]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    k = (len(ordered) - 1) * pct / 100
+    lower = int(k)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (k - lower)
+
+
+class Command(BaseCommand):
+    help = "/api/ の各エンドポイントのレイテンシ・クエリ数・メモリを計測する"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=10, help="ユーザー数")
+        parser.add_argument("--logs", type=int, default=100, help="ユーザーあたりの体調ログ数")
+        parser.add_argument("--menus", type=int, default=200, help="運動メニュー数")
+        parser.add_argument("--tags", type=int, default=30, help="タグ数")
+        parser.add_argument("--routines", type=int, default=10, help="ユーザーあたりのルーティン数")
+        parser.add_argument("--repeat", type=int, default=30, help="エンドポイントごとの計測回数")
+        parser.add_argument("--seed", type=int, default=0, help="乱数シード")
+        parser.add_argument("--baseline", help="比較する基準値のJSONファイル")
+        parser.add_argument("--save-baseline", help="計測結果を基準値として保存するJSONファイル")
+        parser.add_argument(
+            "--tolerance", type=float, default=0.2,
+            help="レイテンシ・メモリの許容増加率（0.2 なら基準値の 1.2 倍まで）",
+        )
+        parser.add_argument(
+            "--current-db", action="store_true",
+            help="テスト用DBを作らず、現在のDBにそのままデータを投入する（テストコードから使う）",
+        )
+
+    def handle(self, *args, **options):
+        if options["current_db"]:
+            results = self.run(options)
+        else:
+            setup_test_environment()
+            old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+            try:
+                results = self.run(options)
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+                teardown_test_environment()
+
+        self.report(results)
+
+        if options["save_baseline"]:
+            Path(options["save_baseline"]).write_text(
+                json.dumps(results, indent=2, ensure_ascii=False), encoding="utf-8"
+            )
+            self.stdout.write(f"基準値を保存しました: {options['save_baseline']}")
+
+        if options["baseline"]:
+            self.compare(results, options["baseline"], options["tolerance"])
+
+    # ---- データ投入 ----
+    def seed(self, options, rng):
+        User = get_user_model()
+        prefix = f"bench{rng.randrange(10 ** 6)}"
+
+        tag_names = [
+            TAG_NAMES[i] if i < len(TAG_NAMES) else f"{prefix}タグ{i}"
+            for i in range(options["tags"])
+        ]
+        existing = set(Tag.objects.filter(name__in=tag_names).values_list("name", flat=True))
+        Tag.objects.bulk_create([Tag(name=n) for n in tag_names if n not in existing])
+        tags = list(Tag.objects.filter(name__in=tag_names))
+
+        menus = ExerciseMenu.objects.bulk_create([
+            ExerciseMenu(
+                name=f"{prefix}メニュー{i}",
+                description=f"{rng.choice(AREAS)}をほぐす運動 {i}",
+                category=rng.choice(["stretch", "strength", "cardio", "other"]),
+                target_area=rng.choice(AREAS),
+            )
+            for i in range(options["menus"])
+        ])
+        Through = ExerciseMenu.tags.through
+        Through.objects.bulk_create([
+            Through(exercisemenu_id=menu.pk, tag_id=tag.pk)
+            for menu in menus
+            for tag in rng.sample(tags, min(len(tags), rng.randint(1, 4)))
+        ])
+        # bulk_create ではシグナルが飛ばないので、検索インデックスとカタログのバージョンを明示的に更新する
+        search.index_menus([m.pk for m in menus])
+        bump_catalog_version()
+
+        password = make_password("bench")
+        users = User.objects.bulk_create([
+            User(username=f"{prefix}user{i}", password=password) for i in range(options["users"])
+        ])
+
+        today = timezone.localdate()
+        ConditionLog.objects.bulk_create([
+            ConditionLog(
+                user=user,
+                log_date=today - timedelta(days=rng.randrange(365)),
+                fatigue_level=rng.randint(1, 5),
+                mood_level=rng.randint(1, 5),
+                body_concern=rng.choice(CONCERNS),
+            )
+            for user in users
+            for _ in range(options["logs"])
+        ])
+        Routine.objects.bulk_create([
+            Routine(user=user, exercise=menu, view_count=rng.randrange(50))
+            for user in users
+            for menu in rng.sample(menus, min(len(menus), options["routines"]))
+        ])
+        return users, menus, tags
+
+    # ---- 計測 ----
+    def endpoints(self, menus, tags, rng):
+        tag_name = tags[0].name if tags else ""
+        detail_ids = [m.pk for m in rng.sample(menus, min(len(menus), 5))] or [0]
+        menu_ids = [m.pk for m in menus]
+        today = timezone.localdate()
+
+        def condition():
+            return {
+                "fatigue_level": rng.randint(1, 5),
+                "mood_level": rng.randint(1, 5),
+                "body_concern": rng.choice(CONCERNS),
+            }
+
+        def routine_changes():
+            # 追加と削除に分ける（同じIDを両方に入れるとエラーになる）
+            ids = rng.sample(menu_ids, min(len(menu_ids), 10))
+            return {"add": ids[::2], "remove": ids[1::2]}
+
+        return {
+            "recommend": lambda: ("post", reverse("recommend_exercise"), condition()),
+            "recommend_batch": lambda: ("post", reverse("recommend_batch"), {"entries": [
+                dict(condition(), log_date=(today - timedelta(days=i)).isoformat()) for i in range(5)
+            ]}),
+            "exercise_list": lambda: ("get", reverse("exercise-list"), {"page": rng.randint(1, 3)}),
+            "exercise_search": lambda: ("get", reverse("exercise-list"), {"q": rng.choice(AREAS)}),
+            "exercise_tags": lambda: ("get", reverse("exercise-list"), {"tags": tag_name}),
+            "exercise_detail": lambda: (
+                "get", reverse("exercise-detail", args=[rng.choice(detail_ids)]), {}
+            ),
+            "history": lambda: ("get", reverse("history_list"), {"page": rng.randint(1, 3)}),
+            "routines": lambda: ("get", reverse("routine_list"), {}),
+            "routines_bulk": lambda: ("post", reverse("bulk_routine"), routine_changes()),
+            "trends": lambda: (
+                "get", reverse("condition_trends"), {"period": rng.choice(["day", "week"])}
+            ),
+        }
+
+    def call(self, client, method, path, data):
+        if method == "post":
+            response = client.post(path, data, content_type="application/json")
+        else:
+            response = client.get(path, data)
+        if response.status_code >= 500:
+            raise CommandError(f"{method.upper()} {path} が {response.status_code} を返しました")
+        return response
+
+    def run(self, options):
+        rng = random.Random(options["seed"])
+        users, menus, tags = self.seed(options, rng)
+
+        client = Client()
+        if users:
+            client.force_login(users[0])
+
+        results = {}
+        for name, make_request in self.endpoints(menus, tags, rng).items():
+            # ウォームアップ（インデックス構築など初回のみの処理を除く）
+            self.call(client, *make_request())
+
+            timings = []
+            for _ in range(options["repeat"]):
+                request = make_request()
+                start = time.perf_counter()
+                self.call(client, *request)
+                timings.append((time.perf_counter() - start) * 1000)
+
+            # クエリ数とメモリは別に1回だけ計測する（計測自体のオーバーヘッドを時間に含めない）
+            request = make_request()
+            tracemalloc.start()
+            try:
+                with CaptureQueriesContext(connection) as queries:
+                    self.call(client, *request)
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+
+            results[name] = {
+                "p50_ms": round(percentile(timings, 50), 3),
+                "p95_ms": round(percentile(timings, 95), 3),
+                "queries": len(queries),
+                "peak_kb": round(peak / 1024, 1),
+            }
+        return results
+
+    # ---- 出力・比較 ----
+    def report(self, results):
+        self.stdout.write(f"{'endpoint':<18}{'p50(ms)':>10}{'p95(ms)':>10}{'queries':>9}{'peak(KB)':>11}")
+        for name, r in results.items():
+            self.stdout.write(
+                f"{name:<18}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['queries']:>9}{r['peak_kb']:>11.1f}"
+            )
+
+    def compare(self, results, baseline_path, tolerance):
+        try:
+            baseline = json.loads(Path(baseline_path).read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            raise CommandError(f"基準値ファイルを読み込めません: {e}")
+
+        failures = []
+        for name, r in results.items():
+            base = baseline.get(name)
+            if base is None:
+                continue
+            # クエリ数は増えたら即NG、時間とメモリは許容率まで
+            if r["queries"] > base["queries"]:
+                failures.append(f"{name}: queries {r['queries']} > {base['queries']}")
+            for key in ("p95_ms", "peak_kb"):
+                limit = base[key] * (1 + tolerance)
+                if r[key] > limit:
+                    failures.append(f"{name}: {key} {r[key]} > {limit:.2f}")
+
+        if failures:
+            raise CommandError("基準値を超えました:\n" + "\n".join(failures))
+        self.stdout.write(self.style.SUCCESS("基準値の範囲内です"))
@@ -0,0 +1,55 @@
+"""
+JSON 出力のマイクロベンチマーク（DRF の JSONRenderer と FastJSONRenderer の比較）
+
+使い方:
+    python manage.py bench_renderers --rows 1000 --repeat 20
+
+bench_serializers と同じくテスト用のDBにデータを投入し、提案API（3件）と一覧API（6件・全件）の
+レスポンスと同じ形のデータを JSON に変換する時間だけを計測する。
+両者のバイト列が一致しない場合はエラー終了する。orjson が無い環境では標準の json 同士の比較になる。
+"""
+from django.core.management.base import CommandError
+from rest_framework.renderers import JSONRenderer
+
+from apps.common.api import renderers
+from apps.common.api.renderers import FastJSONRenderer
+from apps.condition_manager.models import ExerciseMenu
+from apps.condition_manager.serializers import current_timezone, menu_to_dict
+
+from .bench_serializers import Command as SerializerBenchCommand
+
+
+class Command(SerializerBenchCommand):
+    help = "DRF の JSONRenderer と FastJSONRenderer の処理時間を比較する"
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"orjson: {'あり' if renderers.orjson else 'なし（標準の json）'}")
+        super().handle(*args, **options)
+
+    def run(self, options):
+        _, menu_ids = self.seed(options["rows"], options["tags"])
+        tz = current_timezone()
+        menus = [
+            menu_to_dict(menu, tz)
+            for menu in ExerciseMenu.objects.filter(pk__in=menu_ids).order_by("id").prefetch_related("tags")
+        ]
+
+        def page(results):
+            return {"count": len(menus), "num_pages": 1, "current_page": 1, "results": results}
+
+        payloads = {
+            "recommend": menus[:3],
+            "list": page(menus[:6]),
+            "list(all)": page(menus),
+        }
+
+        drf, fast = JSONRenderer(), FastJSONRenderer()
+        results = {}
+        for name, data in payloads.items():
+            if drf.render(data) != fast.render(data):
+                raise CommandError(f"{name}: FastJSONRenderer の出力が JSONRenderer と一致しません")
+            results[name] = (
+                self.measure(lambda: drf.render(data), options["repeat"]),
+                self.measure(lambda: fast.render(data), options["repeat"]),
+            )
+        return results
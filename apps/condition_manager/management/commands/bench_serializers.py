@@ -0,0 +1,124 @@
+"""
+シリアライズのマイクロベンチマーク（DRF の ModelSerializer と serializers.py の高速版の比較）
+
+使い方:
+    python manage.py bench_serializers --rows 1000 --repeat 20
+
+テスト用のDBを作ってデータを投入し、取得済みのインスタンスをシリアライズする時間だけを計測する。
+両者の JSON が一致しない場合はエラー終了する。
+"""
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from rest_framework.renderers import JSONRenderer
+
+from apps.condition_manager.models import ConditionLog, ExerciseMenu, Routine, Tag
+from apps.condition_manager.serializers import (
+    ConditionLogSerializer,
+    ExerciseMenuSerializer,
+    RoutineSerializer,
+    current_timezone,
+    log_to_dict,
+    menu_to_dict,
+    routine_to_dict,
+)
+
+
+class Command(BaseCommand):
+    help = "ModelSerializer と高速版シリアライズの処理時間を比較する"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=500, help="種類ごとの件数")
+        parser.add_argument("--tags", type=int, default=3, help="メニューあたりのタグ数")
+        parser.add_argument("--repeat", type=int, default=10, help="計測回数（最小値を使う）")
+        parser.add_argument(
+            "--current-db", action="store_true",
+            help="テスト用DBを作らず、現在のDBにそのままデータを投入する（テストコードから使う）",
+        )
+
+    def handle(self, *args, **options):
+        if options["current_db"]:
+            results = self.run(options)
+        else:
+            setup_test_environment()
+            old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+            try:
+                results = self.run(options)
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+                teardown_test_environment()
+
+        self.stdout.write(f"{'':<10} {'DRF(ms)':>10} {'高速版(ms)':>12} {'倍率':>8}")
+        for name, (drf_ms, fast_ms) in results.items():
+            ratio = drf_ms / fast_ms if fast_ms else float("inf")
+            self.stdout.write(f"{name:<10} {drf_ms:>10.2f} {fast_ms:>12.2f} {ratio:>7.1f}x")
+
+    # ---- データ投入 ----
+    def seed(self, rows, tags_per_menu):
+        user = get_user_model().objects.create_user(username=f"bench-serializer-{time.time_ns()}")
+        prefix = f"ser{time.time_ns()}"
+        tags = Tag.objects.bulk_create([Tag(name=f"{prefix}タグ{i}") for i in range(10)])
+        menus = ExerciseMenu.objects.bulk_create([
+            ExerciseMenu(name=f"{prefix}メニュー{i}", description="説明" * 20, target_area="肩")
+            for i in range(rows)
+        ])
+        ExerciseMenu.tags.through.objects.bulk_create([
+            ExerciseMenu.tags.through(exercisemenu_id=menu.pk, tag_id=tags[(i + j) % len(tags)].pk)
+            for i, menu in enumerate(menus)
+            for j in range(tags_per_menu)
+        ])
+        ConditionLog.objects.bulk_create([
+            ConditionLog(user=user, fatigue_level=i % 5 + 1, mood_level=i % 5 + 1, body_concern="肩こり")
+            for i in range(rows)
+        ])
+        Routine.objects.bulk_create([Routine(user=user, exercise=menu) for menu in menus])
+        return user, [menu.pk for menu in menus]
+
+    # ---- 計測 ----
+    def measure(self, func, repeat):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            elapsed = (time.perf_counter() - start) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    def run(self, options):
+        user, menu_ids = self.seed(options["rows"], options["tags"])
+        menus = list(ExerciseMenu.objects.filter(pk__in=menu_ids).prefetch_related("tags"))
+        logs = list(ConditionLog.objects.filter(user=user))
+        routines = list(
+            Routine.objects.filter(user=user).select_related("exercise").prefetch_related("exercise__tags")
+        )
+
+        # タイムゾーンは呼び出し側で一度だけ取得する（views・menu_cache と同じ使い方）
+        tz = current_timezone()
+        cases = {
+            "menus": (
+                lambda: ExerciseMenuSerializer(menus, many=True).data,
+                lambda: [menu_to_dict(m, tz) for m in menus],
+            ),
+            "logs": (
+                lambda: ConditionLogSerializer(logs, many=True).data,
+                lambda: [log_to_dict(log, tz) for log in logs],
+            ),
+            "routines": (
+                lambda: RoutineSerializer(routines, many=True).data,
+                lambda: [routine_to_dict(r, tz=tz) for r in routines],
+            ),
+        }
+
+        renderer = JSONRenderer()
+        results = {}
+        for name, (drf, fast) in cases.items():
+            if renderer.render(drf()) != renderer.render(fast()):
+                raise CommandError(f"{name}: 高速版の JSON が ModelSerializer と一致しません")
+            results[name] = (
+                self.measure(drf, options["repeat"]),
+                self.measure(fast, options["repeat"]),
+            )
+        return results
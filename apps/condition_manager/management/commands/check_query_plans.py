@@ -0,0 +1,107 @@
+"""
+各画面・APIのクエリの実行計画を確認する
+
+    python manage.py check_query_plans
+    python manage.py check_query_plans --verbose   # 実行計画をすべて表示
+
+EXPLAIN の結果からインデックスを使わない全件走査や、並び替えのための一時ソートを見つけたら
+エラー終了する。データが少ないとDBがインデックスを使わないことがあるので、
+Postgres では本番に近いデータ量で実行すること。
+"""
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from apps.condition_manager.models import ExerciseMenu
+from apps.condition_manager.pagination import after_keys
+from apps.condition_manager.views import (
+    HISTORY_ORDERING,
+    ROUTINE_ORDERING,
+    build_exercise_queryset,
+    history_queryset,
+    routine_queryset,
+    trend_summaries_queryset,
+)
+from apps.management.views import UserListView, dashboard_recent_logs, user_recent_logs
+
+
+def plan_checks():
+    """
+    (名前, クエリセット, 全件走査を許すか) のリスト
+    クエリセットはビューと同じ関数で組み立てる。ユーザーIDなどの値は実行計画を見るためだけのダミー
+    """
+    user_id = 1
+    now = timezone.now()
+    today = date.today()
+    return [
+        # ---- API ----
+        ("history", history_queryset(user_id)[:20], False),
+        (
+            "history (cursor)",
+            after_keys(history_queryset(user_id), HISTORY_ORDERING, [today, now, 1])[:7],
+            False,
+        ),
+        ("trends", trend_summaries_queryset(user_id, today, today), False),
+        ("routines", routine_queryset(user_id)[:20], False),
+        (
+            "routines (cursor)",
+            after_keys(routine_queryset(user_id), ROUTINE_ORDERING, [0, now, 1])[:7],
+            False,
+        ),
+        # 主キー順に先頭から読むだけ（LIMIT 付き）なので全件走査にはならない
+        ("exercise list", build_exercise_queryset("", None)[:6], True),
+        ("exercise detail", ExerciseMenu.objects.filter(pk=1), False),
+        # ---- 管理画面 ----
+        # 新規ユーザー数などの件数は集計テーブル（MetricCounter / DailyMetric）から読むので確認しない
+        ("dashboard recent logs", dashboard_recent_logs(), False),
+        (
+            "user list",
+            UserListView.model.objects.order_by(*UserListView.ordering)[:UserListView.paginate_by],
+            False,
+        ),
+        ("user detail logs", user_recent_logs(user_id), False),
+    ]
+
+
+def find_problems(plan: str, allow_scan: bool) -> list:
+    problems = []
+    for line in plan.splitlines():
+        if connection.vendor == "sqlite":
+            if "USE TEMP B-TREE" in line:
+                problems.append(f"一時ソート: {line.strip()}")
+            elif " SCAN " in f" {line} " and "USING" not in line and not allow_scan:
+                problems.append(f"全件走査: {line.strip()}")
+        elif connection.vendor == "postgresql":
+            if "Seq Scan" in line and not allow_scan:
+                problems.append(f"全件走査: {line.strip()}")
+            elif line.strip().startswith(("Sort ", "->  Sort ")):
+                problems.append(f"一時ソート: {line.strip()}")
+    return problems
+
+
+class Command(BaseCommand):
+    help = "各画面・APIのクエリの実行計画を確認し、全件走査やソートがあれば報告する"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--verbose", action="store_true", help="実行計画をすべて表示する")
+
+    def handle(self, *args, **options):
+        failed = []
+        for name, queryset, allow_scan in plan_checks():
+            plan = queryset.explain()
+            problems = find_problems(plan, allow_scan)
+
+            status = self.style.ERROR("NG") if problems else self.style.SUCCESS("OK")
+            self.stdout.write(f"[{status}] {name}")
+            if options["verbose"]:
+                for line in plan.splitlines():
+                    self.stdout.write(f"      {line}")
+            for problem in problems:
+                self.stdout.write(f"      {problem}")
+            if problems:
+                failed.append(name)
+
+        if failed:
+            raise CommandError("インデックスを使わないクエリがあります: " + ", ".join(failed))
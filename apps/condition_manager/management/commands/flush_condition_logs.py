@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.condition_manager.log_buffer import ConditionLogBuffer
+
+
+class Command(BaseCommand):
+    help = "ライトビハインドで保存できず退避ファイルに残った体調ログを保存する"
+
+    def handle(self, *args, **options):
+        buffer = ConditionLogBuffer(
+            spool_path=getattr(settings, "CONDITION_LOG_SPOOL_PATH", None),
+            quarantine_path=getattr(settings, "CONDITION_LOG_QUARANTINE_PATH", None),
+            autostart=False,
+        )
+        saved = buffer.flush()
+        self.stdout.write(f"{saved} 件の体調ログを保存しました")
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from apps.condition_manager.summaries import rebuild_summaries
+
+
+class Command(BaseCommand):
+    help = "体調ログから日別集計（DailyConditionSummary）を作り直す（導入時のバックフィル・不整合の修正用）"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", type=int, action="append", dest="user_ids", help="対象のユーザーID（複数指定可）")
+
+    def handle(self, *args, **options):
+        created = rebuild_summaries(options["user_ids"])
+        self.stdout.write(self.style.SUCCESS(f"{created} 件の日別集計を作り直しました"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from apps.condition_manager import search
+
+
+class Command(BaseCommand):
+    help = "運動メニューの全文検索インデックスを作り直す"
+
+    def handle(self, *args, **options):
+        if not search.is_supported():
+            self.stdout.write("このDBでは全文検索インデックスを使いません（SQLite・PostgreSQL のみ対応）")
+            return
+        search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS("全文検索インデックスを作り直しました"))
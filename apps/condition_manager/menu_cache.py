@@ -0,0 +1,94 @@
+"""
+運動メニューのシリアライズ結果のキャッシュ
+
+ExerciseMenuSerializer と同じ内容の dict（タグを含む）をメニューごとに Django のキャッシュへ保存し、
+一覧・詳細・ルーティン・提案のレスポンスはキャッシュ済みの dict を組み合わせて作る。
+シリアライズ（とタグの取得）はキャッシュに無いメニューの分だけ行う。
+
+キーはカタログのバージョンとメニューIDで、メニュー・タグが変わるとすべて使われなくなる
+（古いキーは MENU_PAYLOAD_CACHE_TIMEOUT かキャッシュの MAX_ENTRIES で消える）。
+キャッシュする内容は、バージョンを読んだ後にプライマリから読んだものだけ
+（レプリカの古い内容や、バージョンが上がる前に読んだ内容を新しいバージョンで保存しない）。
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import prefetch_related_objects
+
+from .catalog import get_catalog_version
+from .models import ExerciseMenu
+from .serializers import current_timezone, menu_to_dict
+
+
+def menu_payload_key(version: int, pk: int) -> str:
+    return f"condition_manager:menu:{version}:{pk}"
+
+
+def _timeout():
+    return getattr(settings, "MENU_PAYLOAD_CACHE_TIMEOUT", 60 * 60)
+
+
+def _serialize_and_store(menus, keys, store=True) -> dict:
+    # タグを取得していないメニューの分だけまとめて取得する
+    prefetch_related_objects(menus, "tags")
+    tz = current_timezone()
+    payloads = {keys[menu.pk]: menu_to_dict(menu, tz) for menu in menus}
+    if store:
+        cache.set_many(payloads, timeout=_timeout())
+    return payloads
+
+
+def serialize_menus(menus, version: int = None) -> list:
+    """
+    メニュー（インスタンス）のリストをシリアライズする（順序はそのまま）
+    ExerciseMenuSerializer(menus, many=True).data と同じ内容
+
+    version: menus を読む前に読んだカタログのバージョン
+    指定したときは、プライマリから読んだメニューをそのままキャッシュする。
+    それ以外（レプリカから読んだもの・version を指定しないとき）は、キャッシュに無いメニューを
+    プライマリから読み直してからキャッシュする（プライマリで削除済みのものはキャッシュせずにそのまま返す）
+    """
+    menus = list(menus)
+    if not menus:
+        return []
+
+    fresh_version = version is not None
+    if version is None:
+        version = get_catalog_version()
+    keys = {menu.pk: menu_payload_key(version, menu.pk) for menu in menus}
+    payloads = cache.get_many(list(keys.values()))
+
+    missing = list({menu.pk: menu for menu in menus if keys[menu.pk] not in payloads}.values())
+    stale = [
+        menu.pk for menu in missing
+        if not fresh_version or menu._state.db != DEFAULT_DB_ALIAS
+    ]
+    if stale:
+        fresh = ExerciseMenu.objects.using(DEFAULT_DB_ALIAS).in_bulk(stale)
+        gone = [menu for menu in missing if menu.pk in stale and menu.pk not in fresh]
+        if gone:
+            payloads.update(_serialize_and_store(gone, keys, store=False))
+        missing = [fresh.get(menu.pk, menu) for menu in missing if menu not in gone]
+    if missing:
+        payloads.update(_serialize_and_store(missing, keys))
+    return [payloads[keys[menu.pk]] for menu in menus]
+
+
+def get_menu_payloads(menu_ids) -> list:
+    """
+    メニューIDのリストからシリアライズ結果を返す（順序はそのまま、存在しないIDは除く）
+    すべてキャッシュにあればDBを読まない
+    """
+    menu_ids = list(menu_ids)
+    if not menu_ids:
+        return []
+
+    version = get_catalog_version()
+    keys = {pk: menu_payload_key(version, pk) for pk in menu_ids}
+    payloads = cache.get_many(list(keys.values()))
+
+    missing = [pk for pk in keys if keys[pk] not in payloads]
+    if missing:
+        menus = list(ExerciseMenu.objects.using(DEFAULT_DB_ALIAS).filter(pk__in=missing).order_by("id"))
+        payloads.update(_serialize_and_store(menus, keys))
+    return [payloads[keys[pk]] for pk in menu_ids if keys[pk] in payloads]
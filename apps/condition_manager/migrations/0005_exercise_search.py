@@ -0,0 +1,72 @@
+# 運動メニューの全文検索インデックス（SQLite FTS5）
+
+import re
+import unicodedata
+
+from django.db import migrations
+
+
+# 作成時点の search.py の内容（search.py が変わってもこのマイグレーションは変わらないようにコピーしている）
+SEARCH_TABLE = "condition_manager_exercise_search"
+
+INSERT_SQL = (
+    f"INSERT INTO {SEARCH_TABLE} (rowid, name, description, target_area, tags) "
+    "VALUES (%s, %s, %s, %s, %s)"
+)
+
+_RUNS = re.compile(r"([0-9a-z]+)|([^\W0-9a-z_]+)")
+
+
+def document_tokens(text):
+    # 英数字は単語単位、それ以外は1文字と2文字の n-gram
+    tokens = []
+    for m in _RUNS.finditer(unicodedata.normalize("NFKC", text or "").lower()):
+        run = m.group()
+        if m.group(1) is not None:
+            tokens.append(run)
+            continue
+        tokens.extend(run)
+        tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def document_row(menu):
+    return (
+        menu.pk,
+        " ".join(document_tokens(menu.name)),
+        " ".join(document_tokens(menu.description)),
+        " ".join(document_tokens(menu.target_area)),
+        " ".join(token for t in menu.tags.all() for token in document_tokens(t.name)),
+    )
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+
+    ExerciseMenu = apps.get_model('condition_manager', 'ExerciseMenu')
+    rows = [document_row(menu) for menu in ExerciseMenu.objects.prefetch_related('tags')]
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE {SEARCH_TABLE} "
+            "USING fts5(name, description, target_area, tags, tokenize='unicode61 remove_diacritics 0')"
+        )
+        cursor.executemany(INSERT_SQL, rows)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('condition_manager', '0004_routine_view_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
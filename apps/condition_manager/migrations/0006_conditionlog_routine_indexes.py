@@ -0,0 +1,31 @@
+# Generated by Django 6.0.1 on 2026-10-18 11:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('condition_manager', '0005_exercise_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='conditionlog',
+            index=models.Index(fields=['user', '-log_date', '-created_at', '-id'], name='conditionlog_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='conditionlog',
+            index=models.Index(fields=['-created_at'], name='conditionlog_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='conditionlog',
+            index=models.Index(fields=['user', '-created_at'], name='conditionlog_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='routine',
+            index=models.Index(fields=['user', '-view_count', '-added_at', '-id'], name='routine_user_popular_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-18 11:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('condition_manager', '0006_conditionlog_routine_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exercisemenu',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 6.0.1 on 2026-10-18 11:34
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('condition_manager', '0007_exercisemenu_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyConditionSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('log_count', models.PositiveIntegerField(default=0)),
+                ('fatigue_total', models.PositiveIntegerField(default=0)),
+                ('mood_total', models.PositiveIntegerField(default=0)),
+                ('concern_counts', models.JSONField(blank=True, default=dict, help_text='体の悩みごとの件数')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,72 @@
+# 運動メニューの全文検索インデックス（PostgreSQL: tsvector + GIN。SQLite は 0005 の FTS5）
+
+import re
+import unicodedata
+
+from django.db import migrations
+
+
+# 作成時点の search.py の内容（search.py が変わってもこのマイグレーションは変わらないようにコピーしている）
+SEARCH_TABLE = "condition_manager_exercise_search"
+
+INSERT_SQL = (
+    f"INSERT INTO {SEARCH_TABLE} (rowid, document) VALUES (%s, "
+    "setweight(to_tsvector('simple', %s), 'A') || setweight(to_tsvector('simple', %s), 'D') || "
+    "setweight(to_tsvector('simple', %s), 'B') || setweight(to_tsvector('simple', %s), 'B'))"
+)
+
+_RUNS = re.compile(r"([0-9a-z]+)|([^\W0-9a-z_]+)")
+
+
+def document_tokens(text):
+    # 英数字は単語単位、それ以外は1文字と2文字の n-gram
+    tokens = []
+    for m in _RUNS.finditer(unicodedata.normalize("NFKC", text or "").lower()):
+        run = m.group()
+        if m.group(1) is not None:
+            tokens.append(run)
+            continue
+        tokens.extend(run)
+        tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def document_row(menu):
+    return (
+        menu.pk,
+        " ".join(document_tokens(menu.name)),
+        " ".join(document_tokens(menu.description)),
+        " ".join(document_tokens(menu.target_area)),
+        " ".join(token for t in menu.tags.all() for token in document_tokens(t.name)),
+    )
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    ExerciseMenu = apps.get_model('condition_manager', 'ExerciseMenu')
+    rows = [document_row(menu) for menu in ExerciseMenu.objects.prefetch_related('tags')]
+    with schema_editor.connection.cursor() as cursor:
+        # rowid はメニューID（SQLite の FTS テーブルと同じ列名）
+        cursor.execute(f"CREATE TABLE {SEARCH_TABLE} (rowid bigint PRIMARY KEY, document tsvector NOT NULL)")
+        cursor.execute(f"CREATE INDEX {SEARCH_TABLE}_document ON {SEARCH_TABLE} USING gin (document)")
+        cursor.executemany(INSERT_SQL, rows)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('condition_manager', '0008_dailyconditionsummary'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -29,6 +29,18 @@ class ConditionLog(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # 履歴API: ユーザーで絞り込み、新しい順に並べる（並び順と同じ向きにする）
+            models.Index(
+                fields=['user', '-log_date', '-created_at', '-id'],
+                name='conditionlog_user_date_idx',
+            ),
+            # 管理画面: 作成日時での絞り込み・新しい順の表示（全体・ユーザー別）
+            models.Index(fields=['-created_at'], name='conditionlog_created_idx'),
+            models.Index(fields=['user', '-created_at'], name='conditionlog_user_created_idx'),
+        ]
+
     def __str__(self):
         return f"{self.user.username} - {self.log_date} - Fatigue: {self.fatigue_level}, Mood: {self.mood_level}"
 
@@ -57,6 +69,9 @@ class ExerciseMenu(models.Model):
         blank=True,
         help_text="この運動メニューに関連するタグ"
     )
+    # 内容（タグを含む）が変わった日時。HTTP キャッシュ（ETag / Last-Modified）に使う
+    # タグの変更時は signals.py で更新する
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
@@ -71,6 +86,41 @@ class Routine(models.Model):
     class Meta:
         # 同じユーザーが同じ運動をルーティンに複数回追加できないようにする
         unique_together = ('user', 'exercise')
+        indexes = [
+            # ルーティン一覧API: ユーザーで絞り込み、閲覧数順に並べる
+            models.Index(
+                fields=['user', '-view_count', '-added_at', '-id'],
+                name='routine_user_popular_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username}'s routine: {self.exercise.name}"
+
+# DailyConditionSummary モデルの定義
+class DailyConditionSummary(models.Model):
+    """
+    ユーザー・日付ごとの体調ログの集計（体調の推移APIで使う）
+    ログの保存時に summaries.py で差分だけ更新する（作り直しは rebuild_condition_summaries コマンド）
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    date = models.DateField()
+    log_count = models.PositiveIntegerField(default=0)
+    # 平均は合計 / 件数で求める（合計を持っておくと差分で更新できる）
+    fatigue_total = models.PositiveIntegerField(default=0)
+    mood_total = models.PositiveIntegerField(default=0)
+    concern_counts = models.JSONField(default=dict, blank=True, help_text="体の悩みごとの件数")
+
+    class Meta:
+        unique_together = ('user', 'date')
+
+    @property
+    def avg_fatigue(self):
+        return self.fatigue_total / self.log_count if self.log_count else None
+
+    @property
+    def avg_mood(self):
+        return self.mood_total / self.log_count if self.log_count else None
 
     def __str__(self):
-        return f"{self.user.username}'s routine: {self.exercise.name}"
\ No newline at end of file
+        return f"{self.user.username} - {self.date} - {self.log_count} logs"
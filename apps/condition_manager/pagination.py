@@ -0,0 +1,101 @@
+"""
+カーソル（キーセット）方式のページング
+
+「前のページの最後の行の並び替えキーより後ろ」を WHERE で指定して取得するので、
+OFFSET や件数の COUNT を使わず、どれだけ後ろのページでも同じコストで取得できる。
+カーソルは並び替えキーの値を JSON にして base64 でエンコードした文字列（クライアントからは中身を意識しない）。
+"""
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(values) -> str:
+    raw = json.dumps(values, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> list:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw.decode("utf-8"))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursor(cursor)
+    if not isinstance(values, list):
+        raise InvalidCursor(cursor)
+    return values
+
+
+def _dump(value):
+    # date / datetime は ISO 形式の文字列にする
+    return value.isoformat() if hasattr(value, "isoformat") else value
+
+
+def after_keys(queryset, ordering, values):
+    """並び順 ordering で、キーが values の行より後ろにある行に絞り込む"""
+    fields = [f.lstrip("-") for f in ordering]
+    # (a, b, c) より後ろ = a が後ろ OR (a が同じ AND b が後ろ) OR ...
+    condition = Q()
+    for i, order in enumerate(ordering):
+        lookup = "lt" if order.startswith("-") else "gt"
+        same = {fields[j]: values[j] for j in range(i)}
+        condition |= Q(**same, **{f"{fields[i]}__{lookup}": values[i]})
+    return queryset.filter(condition)
+
+
+def _cursor_queryset(queryset, ordering, cursor):
+    fields = [f.lstrip("-") for f in ordering]
+    queryset = queryset.order_by(*ordering)
+
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != len(fields):
+            raise InvalidCursor(cursor)
+        # 改ざんされたカーソル（null・配列・オブジェクトなど）は 400 にする
+        if any(isinstance(value, bool) or not isinstance(value, (str, int, float)) for value in values):
+            raise InvalidCursor(cursor)
+        try:
+            values = [
+                queryset.model._meta.get_field(name).to_python(value)
+                for name, value in zip(fields, values)
+            ]
+        except (TypeError, ValueError, OverflowError, ValidationError):
+            raise InvalidCursor(cursor)
+        if any(value is None for value in values):
+            raise InvalidCursor(cursor)
+        queryset = after_keys(queryset, ordering, values)
+    return queryset
+
+
+def _cursor_page(items, ordering, page_size):
+    # 1件多く取得して次のページがあるかを判定する（COUNT は使わない）
+    if len(items) <= page_size:
+        return items, None
+
+    items = items[:page_size]
+    last = items[-1]
+    return items, encode_cursor([_dump(getattr(last, f.lstrip("-"))) for f in ordering])
+
+
+def paginate_by_cursor(queryset, ordering, cursor=None, page_size=6):
+    """
+    ordering: 並び替えのフィールド（例: ('-log_date', '-created_at', '-id')）
+              最後は一意なフィールドにすること（同じ値の行を取りこぼさないため）
+    戻り値: (そのページの行のリスト, 次のページのカーソル or None)
+    """
+    queryset = _cursor_queryset(queryset, ordering, cursor)
+    return _cursor_page(list(queryset[:page_size + 1]), ordering, page_size)
+
+
+async def apaginate_by_cursor(queryset, ordering, cursor=None, page_size=6):
+    """paginate_by_cursor の非同期版（async_views から使う）"""
+    queryset = _cursor_queryset(queryset, ordering, cursor)
+    items = [item async for item in queryset[:page_size + 1]]
+    return _cursor_page(items, ordering, page_size)
@@ -0,0 +1,166 @@
+"""
+運動メニュー提案用のインメモリインデックス
+
+メニューごとのタグを事前に正規化し、スコアリングに必要な特徴をビットフラグで保持する。
+リクエストごとのスコアリングはDBを読まずにメモリ上だけで完結する。
+提案結果（シリアライズ済み）は Django のキャッシュに保存し、同じ入力なら再計算しない。
+"""
+import hashlib
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Prefetch
+
+from .catalog import get_catalog_version
+from .concern_matcher import ConcernMatcher, area_keywords, tag_keywords
+from .menu_cache import serialize_menus
+from .models import ExerciseMenu, Tag
+from .scoring import ScoringEngine, normalize_concern, normalize_tag, tag_features
+
+
+class RecommendationIndex:
+    """
+    全メニューのスコアリング用特徴を保持するプロセス内インデックス
+    menus は ID 順で、タグはプリフェッチ済み（シリアライズ時にDBを読まない）
+    """
+
+    def __init__(self, menus, version=None):
+        self.version = version
+        self.menus = list(menus)
+        self.flags = []
+        # 悩みとの照合に使う値: タグは ("tag", タグID)、対象部位は ("area", 部位名)
+        self.terms = []
+        keywords = {}
+        for menu in self.menus:
+            tags = [t for t in menu.tags.all() if t.name]
+            self.flags.append(tag_features({normalize_tag(t.name) for t in tags}))
+
+            menu_terms = set()
+            for tag in tags:
+                for keyword in tag_keywords(tag.name):
+                    keywords.setdefault(keyword, set()).add(("tag", tag.pk))
+                    menu_terms.add(("tag", tag.pk))
+            for area in area_keywords(menu.target_area):
+                keywords.setdefault(area, set()).add(("area", area))
+                menu_terms.add(("area", area))
+            self.terms.append(frozenset(menu_terms))
+
+        self.matcher = ConcernMatcher(keywords)
+        self.engine = ScoringEngine(self.flags, self.terms)
+
+    @classmethod
+    def build(cls, version=None):
+        # レプリカは遅れていることがあるので、プライマリから読む（version は読み込みの前に読んだもの）
+        menus = ExerciseMenu.objects.using(DEFAULT_DB_ALIAS).order_by("id").prefetch_related(
+            Prefetch("tags", queryset=Tag.objects.using(DEFAULT_DB_ALIAS))
+        )
+        return cls(menus, version)
+
+    def __len__(self):
+        return len(self.menus)
+
+    def match(self, concern: str) -> frozenset:
+        """悩みの文章から見つかったタグ・対象部位"""
+        return self.matcher.match(concern)
+
+    def scores(self, fatigue: int, mood: int, concern: str) -> list:
+        return self.engine.score(fatigue, mood, self.match(concern)).tolist()
+
+    def recommend(self, fatigue: int, mood: int, concern: str, limit: int = 3) -> list:
+        """スコア上位のメニューを返す（同点は ID 順）"""
+        return self.recommend_many([(fatigue, mood, concern)], limit=limit)[0]
+
+    def recommend_many(self, queries, limit: int = 3) -> list:
+        """
+        複数の (fatigue, mood, concern) をまとめてスコアリングする
+        戻り値は queries と同じ順のメニューリスト
+        """
+        matched = [(f, m, self.match(c)) for f, m, c in queries]
+        return [
+            [self.menus[i] for i in positions]
+            for positions in self.engine.top_k(matched, limit)
+        ]
+
+
+# ---- プロセス内キャッシュ ----
+_lock = threading.Lock()
+_index = None
+
+
+def get_recommendation_index() -> RecommendationIndex:
+    """
+    インデックスを返す
+    カタログのバージョンが変わっていれば作り直す（共有キャッシュのバージョンを見るので、他のワーカーでの変更も検知できる）
+    """
+    global _index
+    # 構築前にバージョンを読むので、構築中に変更があっても次回アクセスで作り直される
+    version = get_catalog_version()
+    index = _index
+    if index is not None and index.version == version:
+        return index
+
+    with _lock:
+        if _index is not None and _index.version == version:
+            return _index
+        index = RecommendationIndex.build(version)
+        _index = index
+    return index
+
+
+# ---- 提案結果のキャッシュ ----
+def recommendation_cache_key(version: int, fatigue: int, mood: int, concern: str, limit: int) -> str:
+    digest = hashlib.md5(normalize_concern(concern).encode("utf-8")).hexdigest()
+    return f"condition_manager:recommend:{version}:{limit}:{fatigue}:{mood}:{digest}"
+
+
+def get_recommendation_payload(fatigue: int, mood: int, concern: str, limit: int = 3) -> list:
+    """
+    上位メニューをシリアライズした結果を返す（提案なしなら空リスト）
+    (fatigue, mood, 正規化した悩み, limit) ごとにキャッシュし、カタログが変わったら使わない
+    """
+    key = recommendation_cache_key(get_catalog_version(), fatigue, mood, concern, limit)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached["data"]
+
+    index = get_recommendation_index()
+    menus = index.recommend(fatigue, mood, concern, limit=limit)
+    data = serialize_menus(menus, index.version)
+    cache.set(
+        key,
+        {"ids": [m.pk for m in menus], "data": data},
+        timeout=getattr(settings, "RECOMMEND_CACHE_TIMEOUT", 600),
+    )
+    return data
+
+
+def get_recommendation_payloads(queries, limit: int = 3) -> list:
+    """
+    複数の (fatigue, mood, concern) の提案結果をまとめて返す（queries と同じ順）
+    キャッシュはまとめて読み書きし、キャッシュに無いものだけを1回でスコアリング・シリアライズする
+    """
+    queries = list(queries)
+    version = get_catalog_version()
+    keys = [recommendation_cache_key(version, f, m, c, limit) for f, m, c in queries]
+    cached = cache.get_many(set(keys))
+
+    # キャッシュに無い入力（同じ入力は1回だけ計算する）
+    missing = {}
+    for key, query in zip(keys, queries):
+        if key not in cached:
+            missing.setdefault(key, query)
+    if missing:
+        index = get_recommendation_index()
+        results = index.recommend_many(missing.values(), limit=limit)
+        # 複数の入力で同じメニューが選ばれてもシリアライズは1回
+        menus = {menu.pk: menu for menu_list in results for menu in menu_list}
+        payloads = dict(zip(menus, serialize_menus(menus.values(), index.version)))
+        entries = {
+            key: {"ids": [m.pk for m in menu_list], "data": [payloads[m.pk] for m in menu_list]}
+            for key, menu_list in zip(missing, results)
+        }
+        cache.set_many(entries, timeout=getattr(settings, "RECOMMEND_CACHE_TIMEOUT", 600))
+        cached.update(entries)
+    return [cached[key]["data"] for key in keys]
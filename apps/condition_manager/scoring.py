@@ -0,0 +1,193 @@
+"""
+運動メニュー提案のスコアリングルールと、NumPy によるまとめてスコアリングするエンジン
+
+ルールはタグから導く特徴フラグに対して線形なので、
+「メニュー×特徴」の行列と (fatigue, mood) ごとの重みベクトルの積で全メニューを一度に採点できる。
+悩みとの一致は、悩みの文章から見つかったタグ・対象部位（concern_matcher を参照）を
+「メニュー×タグ・部位」の行列で引くことで求める。
+"""
+import numpy as np
+
+
+# ベース点（0件を減らすために少し入れる）
+BASE_SCORE = 5
+
+# ---- タグから導く特徴フラグ ----
+LIGHT = 1 << 0        # 高疲労でも取り組みやすい
+HARD = 1 << 1         # 高強度（高疲労時は減点）
+ACTIVE = 1 << 2       # 低疲労時に向く
+MODERATE = 1 << 3     # 中間の疲労度に向く
+REFRESH = 1 << 4      # 気分転換・リフレッシュ系
+ACHIEVEMENT = 1 << 5  # 達成感が得られる
+EASY = 1 << 6         # 継続しやすい
+
+FEATURE_TAGS = {
+    LIGHT: ("高疲労向け", "ストレッチ", "リラックス", "呼吸法", "軽め", "座ったまま"),
+    HARD: ("筋トレ", "高強度", "追い込み"),
+    ACTIVE: ("筋トレ", "有酸素", "アクティブ"),
+    MODERATE: ("ストレッチ", "筋トレ"),
+    REFRESH: ("リフレッシュ", "気分転換", "呼吸法", "瞑想", "リラックス"),
+    ACHIEVEMENT: ("達成感", "筋トレ", "有酸素"),
+    EASY: ("初心者向け", "短時間", "座ったまま"),
+}
+
+# 正規化済みタグ名 -> そのタグが立てるフラグ
+_FLAGS_BY_TAG = {}
+for _flag, _names in FEATURE_TAGS.items():
+    for _name in _names:
+        _FLAGS_BY_TAG[_name.lower()] = _FLAGS_BY_TAG.get(_name.lower(), 0) | _flag
+
+
+def normalize_tag(name: str) -> str:
+    return name.lower().lstrip("#")
+
+
+def normalize_concern(concern) -> str:
+    return (concern or "").strip().lower()
+
+
+def tag_features(tags_lower) -> int:
+    """正規化済みタグ名の集合から特徴フラグを求める"""
+    flags = 0
+    for tag in tags_lower:
+        flags |= _FLAGS_BY_TAG.get(tag, 0)
+    return flags
+
+
+def raw_score(flags: int, concern_hit: bool, fatigue: int, mood: int) -> int:
+    """
+    下限処理前のスコア
+    各ルールは1つのフラグだけを見て加減点するため、フラグに対して線形になる
+    （ScoringEngine はこの性質を使って重みベクトルを作る）
+    """
+    score = BASE_SCORE
+
+    # 1) 悩み（タグによるキーワード検索）
+    if concern_hit:
+        score += 60
+
+    # 2) 疲れレベル
+    if fatigue >= 4:
+        # 高疲労 → 軽め優遇、筋トレ/高強度は減点
+        if flags & LIGHT:
+            score += 30
+        if flags & HARD:
+            score -= 25
+    elif fatigue <= 2:
+        # 低疲労 → 筋トレ/有酸素もOK
+        if flags & ACTIVE:
+            score += 20
+    else:
+        # 3 あたりは中間
+        if flags & MODERATE:
+            score += 10
+
+    # 3) 気分レベル
+    if mood <= 2:
+        # 気分低い → 気分転換/リフレッシュ系優遇
+        if flags & REFRESH:
+            score += 25
+    elif mood >= 4:
+        # 気分高い → 達成感/筋トレも少し優遇
+        if flags & ACHIEVEMENT:
+            score += 10
+
+    # 4) 継続性（やりやすいメニューを少し上げる）
+    if flags & EASY:
+        score += 10
+
+    return score
+
+
+def score_features(flags: int, concern_hit: bool, fatigue: int, mood: int) -> int:
+    return max(raw_score(flags, concern_hit, fatigue, mood), 0)
+
+
+# ---- 行列化 ----
+# 特徴行列の列の並び
+FEATURE_COLUMNS = (LIGHT, HARD, ACTIVE, MODERATE, REFRESH, ACHIEVEMENT, EASY)
+
+
+def weight_vector(fatigue: int, mood: int) -> np.ndarray:
+    """(fatigue, mood) に対応する特徴ごとの加減点"""
+    base = raw_score(0, False, fatigue, mood)
+    return np.array(
+        [raw_score(flag, False, fatigue, mood) - base for flag in FEATURE_COLUMNS],
+        dtype=np.int64,
+    )
+
+
+# (fatigue, mood) は 1〜5 の 25 通りしかないので事前に計算しておく
+_WEIGHTS = {
+    (fatigue, mood): weight_vector(fatigue, mood)
+    for fatigue in range(1, 6)
+    for mood in range(1, 6)
+}
+CONCERN_WEIGHT = raw_score(0, True, 3, 3) - raw_score(0, False, 3, 3)
+
+
+class ScoringEngine:
+    """
+    メニューの特徴フラグと、悩みと照合するタグ・部位から行列を作り、NumPy でまとめてスコアリングする
+    行の順番はコンストラクタに渡したメニューの順番
+    """
+
+    def __init__(self, flags, terms):
+        self.size = len(flags)
+        # メニュー×特徴（0/1）
+        self.features = np.array(
+            [[1 if f & col else 0 for col in FEATURE_COLUMNS] for f in flags],
+            dtype=np.int64,
+        ).reshape(self.size, len(FEATURE_COLUMNS))
+
+        # メニュー×タグ・部位（そのメニューが持つなら 1）
+        vocabulary = sorted(set().union(*terms), key=repr) if terms else []
+        self.term_columns = {term: i for i, term in enumerate(vocabulary)}
+        self.terms = np.zeros((self.size, len(vocabulary)), dtype=np.int64)
+        for row, menu_terms in enumerate(terms):
+            for term in menu_terms:
+                self.terms[row, self.term_columns[term]] = 1
+
+    def _match_matrix(self, matches) -> np.ndarray:
+        """タグ・部位×リクエスト（悩みの文章から見つかったなら 1）"""
+        matrix = np.zeros((len(self.term_columns), len(matches)), dtype=np.int64)
+        for col, matched in enumerate(matches):
+            for term in matched:
+                row = self.term_columns.get(term)
+                if row is not None:
+                    matrix[row, col] = 1
+        return matrix
+
+    def score_many(self, queries) -> np.ndarray:
+        """
+        queries: (fatigue, mood, 悩みから見つかったタグ・部位) のリスト
+        戻り値: メニュー×リクエストのスコア行列
+        """
+        if not queries:
+            return np.zeros((self.size, 0), dtype=np.int64)
+
+        weights = np.stack([_WEIGHTS[(f, m)] for f, m, _ in queries], axis=1)
+        hits = (self.terms @ self._match_matrix([matched for _, _, matched in queries])) > 0
+
+        scores = BASE_SCORE + self.features @ weights + CONCERN_WEIGHT * hits
+        return np.maximum(scores, 0)
+
+    def score(self, fatigue: int, mood: int, matched) -> np.ndarray:
+        return self.score_many([(fatigue, mood, matched)])[:, 0]
+
+    def top_k(self, queries, k: int = 3) -> list:
+        """
+        リクエストごとに、スコアが正のメニューを上位 k 件まで行番号で返す
+        同点は行番号の小さい順（全件を安定ソートした結果と一致する）
+        """
+        scores = self.score_many(queries)
+        results = []
+        for column in scores.T:
+            candidates = np.flatnonzero(column > 0)
+            if len(candidates) > k:
+                # k 番目のスコア以上（同点を含む）だけに絞ってから並べる
+                threshold = np.partition(column[candidates], len(candidates) - k)[len(candidates) - k]
+                candidates = candidates[column[candidates] >= threshold]
+            order = np.argsort(-column[candidates], kind="stable")[:k]
+            results.append(candidates[order].tolist())
+        return results
@@ -0,0 +1,200 @@
+"""
+運動メニューの全文検索インデックス（SQLite FTS5 / PostgreSQL tsvector）
+
+日本語は単語の区切りが無いので、文字単位（1文字・2文字）に分割したトークンを
+インデックスのテーブルに保存し、関連度順に並べたメニューIDを返す。
+- SQLite: FTS5 の仮想テーブル（BM25 で並べる）
+- PostgreSQL: tsvector の列と GIN インデックス（'simple' 設定でトークンをそのまま使い、
+  列ごとの重みを setweight で付けて ts_rank で並べる）
+インデックスはシグナル（signals.py）でメニュー・タグの変更に合わせて更新する。
+
+それ以外のDBではインデックスを使わず、search_menu_ids は None を返す
+（呼び出し側は従来の icontains 検索にフォールバックする）。
+"""
+import re
+import unicodedata
+
+from django.db import connection
+
+from .models import ExerciseMenu
+
+
+SEARCH_TABLE = "condition_manager_exercise_search"
+
+# BM25 の列ごとの重み（name, description, target_area, tags の順）
+COLUMN_WEIGHTS = (10.0, 1.0, 5.0, 5.0)
+
+# PostgreSQL: 列ごとの重みのラベル（name, description, target_area, tags の順）と、
+# ts_rank に渡すラベルごとの重み（D, C, B, A の順。COLUMN_WEIGHTS を 1/10 にしたもの）
+TSVECTOR_LABELS = ("A", "D", "B", "B")
+TSVECTOR_WEIGHTS = "{0.1, 0.0, 0.5, 1.0}"
+
+SUPPORTED_VENDORS = ("sqlite", "postgresql")
+
+# 英数字は単語単位、それ以外の文字（ひらがな・カタカナ・漢字など）は文字単位で扱う
+_RUNS = re.compile(r"([0-9a-z]+)|([^\W0-9a-z_]+)")
+
+
+def is_supported() -> bool:
+    return connection.vendor in SUPPORTED_VENDORS
+
+
+def _normalize(text: str) -> str:
+    return unicodedata.normalize("NFKC", text or "").lower()
+
+
+def _runs(text: str):
+    """(英数字の単語か, 文字列) を出現順に返す"""
+    for m in _RUNS.finditer(_normalize(text)):
+        yield m.group(1) is not None, m.group()
+
+
+def document_tokens(text: str) -> list:
+    """インデックスに保存するトークン（1文字と2文字の n-gram）"""
+    tokens = []
+    for is_word, run in _runs(text):
+        if is_word:
+            tokens.append(run)
+            continue
+        tokens.extend(run)
+        tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def query_tokens(text: str) -> list:
+    """
+    検索語のトークン
+    2文字以上なら 2-gram（すべて含むものを探す）、1文字ならその文字
+    """
+    tokens = []
+    for is_word, run in _runs(text):
+        if is_word:
+            tokens.append((run, True))
+        elif len(run) == 1:
+            tokens.append((run, False))
+        else:
+            tokens.extend((run[i:i + 2], False) for i in range(len(run) - 1))
+    return tokens
+
+
+def _match_expression(keyword: str) -> str:
+    """SQLite FTS5 の MATCH に渡す式"""
+    parts = []
+    for token, is_word in dict.fromkeys(query_tokens(keyword)):
+        quoted = '"' + token.replace('"', '""') + '"'
+        # 英数字は前方一致（「yog」で「yoga」も探せるように）
+        parts.append(quoted + "*" if is_word else quoted)
+    return " AND ".join(parts)
+
+
+def _tsquery_expression(keyword: str) -> str:
+    """PostgreSQL の to_tsquery に渡す式（_match_expression と同じ条件）"""
+    parts = []
+    for token, is_word in dict.fromkeys(query_tokens(keyword)):
+        quoted = "'" + token.replace("'", "''") + "'"
+        parts.append(quoted + ":*" if is_word else quoted)
+    return " & ".join(parts)
+
+
+def document_row(menu) -> tuple:
+    """FTS テーブルに挿入する1行（rowid はメニューID）"""
+    return (
+        menu.pk,
+        " ".join(document_tokens(menu.name)),
+        " ".join(document_tokens(menu.description)),
+        " ".join(document_tokens(menu.target_area)),
+        # タグ名は1つずつ分割する（タグをまたいだ 2-gram を作らない）
+        " ".join(token for t in menu.tags.all() for token in document_tokens(t.name)),
+    )
+
+
+# ---- インデックスの作成・更新 ----
+# PostgreSQL のテーブルも、メニューIDの列名は SQLite の FTS テーブルと同じ rowid
+INSERT_SQL = (
+    f"INSERT INTO {SEARCH_TABLE} (rowid, name, description, target_area, tags) "
+    "VALUES (%s, %s, %s, %s, %s)"
+)
+POSTGRES_INSERT_SQL = (
+    f"INSERT INTO {SEARCH_TABLE} (rowid, document) VALUES (%s, "
+    + " || ".join(f"setweight(to_tsvector('simple', %s), '{label}')" for label in TSVECTOR_LABELS)
+    + ")"
+)
+
+
+# 一度に処理するメニュー数（SQLite のパラメータ数上限に収める）
+BATCH_SIZE = 500
+
+
+def _batches(menu_ids):
+    menu_ids = list(menu_ids)
+    for start in range(0, len(menu_ids), BATCH_SIZE):
+        yield menu_ids[start:start + BATCH_SIZE]
+
+
+def _insert(menu_ids):
+    rows = [
+        document_row(menu)
+        for menu in ExerciseMenu.objects.filter(pk__in=menu_ids).prefetch_related("tags")
+    ]
+    sql = POSTGRES_INSERT_SQL if connection.vendor == "postgresql" else INSERT_SQL
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+
+
+def remove_menus(menu_ids):
+    if not is_supported():
+        return
+    for batch in _batches(menu_ids):
+        placeholders = ", ".join(["%s"] * len(batch))
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({placeholders})", batch)
+
+
+def index_menus(menu_ids):
+    """指定メニューのインデックスを作り直す（存在しないIDは削除だけ行う）"""
+    if not is_supported():
+        return
+    for batch in _batches(menu_ids):
+        remove_menus(batch)
+        _insert(batch)
+
+
+def rebuild_index():
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+    for batch in _batches(ExerciseMenu.objects.order_by("pk").values_list("pk", flat=True)):
+        _insert(batch)
+
+
+# ---- 検索 ----
+def search_menu_ids(keyword: str):
+    """
+    キーワードに一致するメニューIDを関連度順（SQLite は BM25、PostgreSQL は ts_rank）で返す
+    インデックスが使えないDBでは None
+    """
+    if not is_supported():
+        return None
+
+    if connection.vendor == "postgresql":
+        expression = _tsquery_expression(keyword)
+        sql = (
+            f"SELECT rowid FROM {SEARCH_TABLE} WHERE document @@ to_tsquery('simple', %s) "
+            f"ORDER BY ts_rank('{TSVECTOR_WEIGHTS}', document, to_tsquery('simple', %s)) DESC, rowid"
+        )
+        params = [expression, expression]
+    else:
+        expression = _match_expression(keyword)
+        weights = ", ".join(str(w) for w in COLUMN_WEIGHTS)
+        sql = (
+            f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s "
+            f"ORDER BY bm25({SEARCH_TABLE}, {weights}), rowid"
+        )
+        params = [expression]
+    if not expression:
+        return []
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
@@ -1,3 +1,5 @@
+from django.conf import settings
+from django.utils import timezone
 from rest_framework import serializers
 
 
@@ -16,7 +18,8 @@ class ExerciseMenuSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = ExerciseMenu
-        fields = "__all__"
+        # updated_at は HTTP キャッシュの検証（ETag / Last-Modified）だけに使い、APIには含めない
+        exclude = ("updated_at",)
 
 
 class ConditionLogSerializer(serializers.ModelSerializer):
@@ -33,3 +36,84 @@ class RoutineSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
+# ---- 読み取り専用の高速シリアライズ ----
+# 一覧APIなど件数の多いレスポンス用。上の ModelSerializer と同じ内容・同じキーの順序の dict を
+# フィールドの解析なしで作る（モデルにフィールドを追加したらここにも追加すること。
+# 同じ内容になることは tests_fast_serializers.py で確認している）
+_UNSET = object()
+
+
+def current_timezone():
+    """
+    シリアライズに使うタイムゾーン（USE_TZ = False なら None）
+    取得に時間がかかるので、まとめてシリアライズするときは一度だけ取得して tz に渡す
+    """
+    return timezone.get_current_timezone() if settings.USE_TZ else None
+
+
+def _datetime(value, tz):
+    # DRF の DateTimeField と同じ（現在のタイムゾーンに変換した ISO 8601、UTC は Z）
+    if value is None:
+        return None
+    if tz is not None:
+        value = value.astimezone(tz) if timezone.is_aware(value) else timezone.make_aware(value, tz)
+    value = value.isoformat()
+    if value.endswith("+00:00"):
+        value = value[:-6] + "Z"
+    return value
+
+
+def _date(value):
+    return value.isoformat() if value else None
+
+
+def _prefetched_tags(menu):
+    # menu.tags は参照するたびにマネージャーを作り直すので、プリフェッチ済みならその結果を直接使う
+    tags = getattr(menu, "_prefetched_objects_cache", {}).get("tags")
+    return tags if tags is not None else menu.tags.all()
+
+
+def menu_to_dict(menu: ExerciseMenu, tz=_UNSET) -> dict:
+    """ExerciseMenuSerializer(menu).data と同じ（タグはプリフェッチしておくこと）"""
+    if tz is _UNSET:
+        tz = current_timezone()
+    return {
+        "id": menu.pk,
+        "tags": [{"name": tag.name} for tag in _prefetched_tags(menu)],
+        "name": menu.name,
+        "description": menu.description,
+        "beginner_guide": menu.beginner_guide,
+        "category": menu.category,
+        "target_area": menu.target_area,
+    }
+
+
+def log_to_dict(log: ConditionLog, tz=_UNSET) -> dict:
+    """ConditionLogSerializer(log).data と同じ"""
+    if tz is _UNSET:
+        tz = current_timezone()
+    return {
+        "id": log.pk,
+        "log_date": _date(log.log_date),
+        "fatigue_level": log.fatigue_level,
+        "mood_level": log.mood_level,
+        "body_concern": log.body_concern,
+        "created_at": _datetime(log.created_at, tz),
+        "user": log.user_id,
+    }
+
+
+def routine_to_dict(routine: Routine, exercise: dict = None, tz=_UNSET) -> dict:
+    """
+    RoutineSerializer(routine).data と同じ
+    exercise: シリアライズ済みの運動メニュー（省略時は routine.exercise から作る）
+    """
+    if tz is _UNSET:
+        tz = current_timezone()
+    return {
+        "id": routine.pk,
+        "exercise": exercise if exercise is not None else menu_to_dict(routine.exercise, tz),
+        "added_at": _datetime(routine.added_at, tz),
+        "view_count": routine.view_count,
+        "user": routine.user_id,
+    }
@@ -0,0 +1,111 @@
+"""
+運動メニュー・タグの変更を検知して、
+- カタログのバージョンを上げる（変更時とコミット時）
+  （メモリ上のインデックスや提案結果のキャッシュはバージョンが変わると使われなくなる）
+- 全文検索インデックスを更新する
+- タグの変更で内容が変わったメニューの updated_at を更新する（HTTP キャッシュの検証に使う）
+体調ログの保存・変更・削除を検知して、日別集計（DailyConditionSummary）を更新する
+"""
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+
+from . import search, summaries
+from .models import ConditionLog, ExerciseMenu, Tag
+from .catalog import catalog_changed
+
+
+# bulk_create などで post_save が送られない体調ログの保存を知らせる（引数: logs）
+condition_logs_recorded = Signal()
+
+
+def _menu_tags_changed(menu_ids):
+    menu_ids = list(menu_ids)
+    search.index_menus(menu_ids)
+    if menu_ids:
+        # update() はシグナルを送らないので、ここから再帰しない
+        ExerciseMenu.objects.filter(pk__in=menu_ids).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=ExerciseMenu)
+def on_menu_saved(sender, instance, **kwargs):
+    search.index_menus([instance.pk])
+    catalog_changed()
+
+
+@receiver(post_delete, sender=ExerciseMenu)
+def on_menu_deleted(sender, instance, **kwargs):
+    search.remove_menus([instance.pk])
+    catalog_changed()
+
+
+@receiver(pre_delete, sender=Tag)
+def on_tag_deleting(sender, instance, **kwargs):
+    # 削除後は関連が消えているので、対象メニューを先に控えておく
+    instance._menu_ids = list(instance.exercisemenu_set.values_list("pk", flat=True))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def on_tag_changed(sender, instance, created=False, **kwargs):
+    if not created:
+        menu_ids = getattr(instance, "_menu_ids", None)
+        if menu_ids is None:
+            menu_ids = instance.exercisemenu_set.values_list("pk", flat=True)
+        _menu_tags_changed(menu_ids)
+    catalog_changed()
+
+
+@receiver(m2m_changed, sender=ExerciseMenu.tags.through)
+def on_menu_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == "pre_clear" and reverse:
+        # tag.exercisemenu_set.clear() の場合、クリア後は対象メニューが分からない
+        instance._menu_ids = list(instance.exercisemenu_set.values_list("pk", flat=True))
+        return
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+
+    if not reverse:
+        menu_ids = [instance.pk]
+    elif action == "post_clear":
+        menu_ids = getattr(instance, "_menu_ids", [])
+    else:
+        menu_ids = pk_set or []
+    _menu_tags_changed(menu_ids)
+    catalog_changed()
+
+
+# ---- 体調ログ ----
+@receiver(condition_logs_recorded)
+def on_condition_logs_recorded(sender, logs, **kwargs):
+    summaries.record_logs(logs)
+
+
+@receiver(pre_save, sender=ConditionLog)
+def on_condition_log_saving(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding:
+        return
+    # 日付・ユーザーが変わる場合に備えて、変更前の集計対象を控えておく
+    instance._summary_key = (
+        ConditionLog.objects.filter(pk=instance.pk).values_list("user_id", "log_date").first()
+    )
+
+
+@receiver(post_save, sender=ConditionLog)
+def on_condition_log_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        summaries.record_logs([instance])
+        return
+    keys = {(instance.user_id, summaries.log_day(instance))}
+    previous = getattr(instance, "_summary_key", None)
+    if previous is not None:
+        keys.add(previous)
+    summaries.rebuild_days(keys)
+
+
+@receiver(pre_delete, sender=ConditionLog)
+def on_condition_log_deleting(sender, instance, **kwargs):
+    # まとめて削除された場合も1回で数え直すよう、コミット時に行う
+    summaries.schedule_rebuild([(instance.user_id, summaries.log_day(instance))])
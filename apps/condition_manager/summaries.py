@@ -0,0 +1,229 @@
+"""
+体調ログの日別集計（DailyConditionSummary）
+
+体調ログが保存されるたびに、そのユーザー・日付の集計行に件数・疲れ/気分の合計・
+悩みごとの件数を足し込む（signals.py から呼ばれる。ライトビハインドの bulk_create の分は
+condition_logs_recorded シグナルで受け取る）。
+ログの変更時はその日の分だけ、削除時はコミット時にまとめて体調ログから数え直す。
+
+体調の推移APIは集計行だけを読むので、読む行数はログの件数ではなく日数に比例する。
+"""
+import threading
+from collections import Counter, defaultdict
+from datetime import date, timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from .models import ConditionLog, DailyConditionSummary
+from .scoring import normalize_concern
+
+
+# 推移APIで返す悩みの件数
+TOP_CONCERNS = 3
+
+# 推移APIで期間を省略した場合の日数（今日を含む）
+TREND_DEFAULT_DAYS = 30
+
+
+def log_day(log):
+    # log_date の初期値は timezone.now（datetime）なので日付に揃える
+    return ConditionLog._meta.get_field("log_date").to_python(log.log_date)
+
+
+class _Delta:
+    """1つの集計行に足し込む値"""
+
+    def __init__(self):
+        self.log_count = 0
+        self.fatigue_total = 0
+        self.mood_total = 0
+        self.concerns = Counter()
+
+    def add(self, count, fatigue_total, mood_total, concern):
+        self.log_count += count
+        self.fatigue_total += fatigue_total
+        self.mood_total += mood_total
+        concern = normalize_concern(concern)
+        if concern:
+            self.concerns[concern] += count
+
+    def apply_to(self, summary):
+        summary.log_count += self.log_count
+        summary.fatigue_total += self.fatigue_total
+        summary.mood_total += self.mood_total
+        concerns = Counter(summary.concern_counts)
+        concerns.update(self.concerns)
+        summary.concern_counts = dict(concerns)
+
+
+def _apply(user_id, day, delta: _Delta):
+    summaries = DailyConditionSummary.objects.select_for_update()
+    summary = summaries.filter(user_id=user_id, date=day).first()
+    if summary is None:
+        summary = DailyConditionSummary(user_id=user_id, date=day)
+        delta.apply_to(summary)
+        try:
+            with transaction.atomic():
+                summary.save(force_insert=True)
+            return
+        except IntegrityError:
+            # 同時に別のリクエストが作った場合はそちらに足し込む
+            summary = summaries.get(user_id=user_id, date=day)
+    delta.apply_to(summary)
+    summary.save(update_fields=["log_count", "fatigue_total", "mood_total", "concern_counts"])
+
+
+def record_logs(logs):
+    """保存された体調ログの分を日別集計に足し込む"""
+    deltas = defaultdict(_Delta)
+    for log in logs:
+        deltas[(log.user_id, log_day(log))].add(1, log.fatigue_level, log.mood_level, log.body_concern)
+    if not deltas:
+        return
+    # ログの保存と同じトランザクションで呼ばれることが多いので、セーブポイントは作らない
+    with transaction.atomic(savepoint=False):
+        for (user_id, day), delta in sorted(deltas.items()):
+            _apply(user_id, day, delta)
+
+
+# ---- 数え直し ----
+def _aggregate(logs):
+    """体調ログの QuerySet から (ユーザーID, 日付) ごとの _Delta を作る"""
+    rows = (
+        logs.values("user_id", "log_date", "body_concern")
+        .annotate(count=Count("id"), fatigue_total=Sum("fatigue_level"), mood_total=Sum("mood_level"))
+        .order_by()
+    )
+    deltas = defaultdict(_Delta)
+    for row in rows.iterator(chunk_size=2000):
+        deltas[(row["user_id"], row["log_date"])].add(
+            row["count"], row["fatigue_total"], row["mood_total"], row["body_concern"]
+        )
+    return deltas
+
+
+def _replace(deltas, batch_size=500):
+    summaries = []
+    for (user_id, day), delta in deltas.items():
+        summary = DailyConditionSummary(user_id=user_id, date=day)
+        delta.apply_to(summary)
+        summaries.append(summary)
+    DailyConditionSummary.objects.bulk_create(summaries, batch_size=batch_size)
+    return len(summaries)
+
+
+def rebuild_days(keys):
+    """指定した (ユーザーID, 日付) の集計を体調ログから数え直す（ログの変更・削除時、ユーザーごとにまとめて）"""
+    days = defaultdict(set)
+    for user_id, day in keys:
+        days[user_id].add(day)
+    if not days:
+        return
+    with transaction.atomic():
+        for user_id, user_days in sorted(days.items()):
+            DailyConditionSummary.objects.filter(user_id=user_id, date__in=user_days).delete()
+            _replace(_aggregate(ConditionLog.objects.filter(user_id=user_id, log_date__in=user_days)))
+
+
+# 削除されたログの (ユーザーID, 日付)（コミット時にまとめて数え直す）
+_deleted = threading.local()
+
+
+def _rebuild_deleted_days():
+    keys = getattr(_deleted, "keys", None)
+    _deleted.keys = set()
+    if keys:
+        rebuild_days(keys)
+
+
+def schedule_rebuild(keys):
+    """
+    ログの削除で変わった日をコミット時に数え直す
+    まとめて削除した場合も、コミット時に1回だけ（ユーザーごとにまとめて）数え直す
+    ロールバックされた分は次のコミット時に数え直す（内容は変わらない）
+    """
+    if not hasattr(_deleted, "keys"):
+        _deleted.keys = set()
+    _deleted.keys.update(keys)
+    # 最初のコールバックが溜まっている分をすべて数え直し、残りは何もしない
+    transaction.on_commit(_rebuild_deleted_days)
+
+
+def rebuild_summaries(user_ids=None, batch_size=500) -> int:
+    """
+    日別集計をすべて（user_ids を指定した場合はそのユーザーの分だけ）体調ログから作り直す
+    作った集計行の数を返す
+    """
+    logs = ConditionLog.objects.all()
+    summaries = DailyConditionSummary.objects.all()
+    if user_ids is not None:
+        logs = logs.filter(user_id__in=user_ids)
+        summaries = summaries.filter(user_id__in=user_ids)
+    with transaction.atomic():
+        summaries.delete()
+        return _replace(_aggregate(logs), batch_size)
+
+
+# ---- 推移 ----
+def parse_trend_params(params):
+    """
+    体調の推移API・管理画面のグラフ用APIのクエリパラメータ（start / end / period）を取り出して検証する
+    戻り値: ((start, end, period), None) または (None, エラーメッセージ)
+    """
+    period = params.get("period", "day")
+    if period not in ("day", "week"):
+        return None, "period は day または week で指定してください。"
+
+    try:
+        end = date.fromisoformat(params["end"]) if params.get("end") else timezone.localdate()
+        start = (
+            date.fromisoformat(params["start"]) if params.get("start")
+            else end - timedelta(days=TREND_DEFAULT_DAYS - 1)
+        )
+    except ValueError:
+        return None, "start と end は YYYY-MM-DD 形式で指定してください。"
+
+    if start > end:
+        return None, "start は end 以前の日付を指定してください。"
+    return (start, end, period), None
+
+
+def week_start(day):
+    """その週の月曜日"""
+    return day - timedelta(days=day.weekday())
+
+
+def summarize_trends(summaries, period: str = "day") -> list:
+    """
+    日別集計（日付の昇順）を推移APIのデータにする
+    period: "day"（日ごと）または "week"（月曜始まりの週ごと）
+    ログの無い日・週は含めない
+    """
+    buckets = {}
+    for summary in summaries:
+        key = week_start(summary.date) if period == "week" else summary.date
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = _Delta()
+        bucket.log_count += summary.log_count
+        bucket.fatigue_total += summary.fatigue_total
+        bucket.mood_total += summary.mood_total
+        bucket.concerns.update(summary.concern_counts)
+
+    return [
+        {
+            "date": key.isoformat(),
+            "log_count": bucket.log_count,
+            "avg_fatigue": round(bucket.fatigue_total / bucket.log_count, 2),
+            "avg_mood": round(bucket.mood_total / bucket.log_count, 2),
+            # 件数の多い順（同数なら悩みの文字列順）
+            "top_concerns": [
+                {"concern": concern, "count": count}
+                for concern, count in sorted(bucket.concerns.items(), key=lambda item: (-item[1], item[0]))[:TOP_CONCERNS]
+            ],
+        }
+        for key, bucket in sorted(buckets.items())
+        if bucket.log_count
+    ]
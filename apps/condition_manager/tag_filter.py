@@ -0,0 +1,201 @@
+"""
+タグ検索用のビットセットインデックス
+
+メニューをID順に並べた位置をビットに対応させ、タグごとに「そのタグを持つメニュー」の
+ビットセット（Python の int）を事前に作っておく。
+タグ条件はビット演算（AND: &、OR: |、NOT: ~）だけで解決し、一致したメニューIDを
+ID順のリストで返す（M2M テーブルの JOIN や DISTINCT を使わない）。
+
+タグ条件の書き方:
+- tags パラメータ: タグ名のカンマ区切り（AND）。| や - も含めてタグ名として扱う（従来どおり）
+- tag_query パラメータ: 条件式
+  - カンマ区切り: AND（例: 肩,ストレッチ）
+  - | 区切り: OR（例: 肩|首）
+  - 先頭に - : NOT（例: -筋トレ）
+どちらもタグ名は部分一致（大文字・小文字は区別しない）。両方を指定した場合は AND
+
+カテゴリ・対象部位ごとのビットセットも持ち、検索結果のビットセットとの AND の
+ビット数で絞り込み候補ごとの件数（ファセット）を一度に数える。
+
+インデックスはカタログのバージョンが変わると作り直す（recommendation と同じ）。
+"""
+import threading
+
+from django.db import DEFAULT_DB_ALIAS
+
+from .catalog import get_catalog_version
+from .models import ExerciseMenu, Tag
+
+
+def parse_tag_list(text: str) -> list:
+    """
+    tags パラメータ（タグ名のカンマ区切り）を解析する
+    戻り値は parse_tag_query と同じ形（各条件はタグ名1つ、否定なし）
+    """
+    return [[(False, name.strip())] for name in (text or "").split(",") if name.strip()]
+
+
+def parse_tag_query(text: str) -> list:
+    """
+    tag_query パラメータを解析する
+    戻り値: AND でつなぐ条件のリスト。各条件は OR でつなぐ (否定か, タグ名) のリスト
+    """
+    clauses = []
+    for clause in (text or "").split(","):
+        terms = []
+        for term in clause.split("|"):
+            term = term.strip()
+            negated = term.startswith("-")
+            term = term.lstrip("-").strip()
+            if term:
+                terms.append((negated, term))
+        if terms:
+            clauses.append(terms)
+    return clauses
+
+
+def _add_bit(bitsets, key, position):
+    bitsets[key] = bitsets.get(key, 0) | (1 << position)
+
+
+class TagFilterIndex:
+    """
+    menus: 全メニューの (ID, カテゴリ, 対象部位)（ID の昇順）
+    menu_tags: (メニューID, タグID) の組
+    tags: (タグID, タグ名) の組
+    """
+
+    def __init__(self, menus, menu_tags, tags, version=None):
+        self.version = version
+        self.menu_ids = []
+        self.category_bits = {}
+        self.area_bits = {}
+        for position, (pk, category, target_area) in enumerate(menus):
+            self.menu_ids.append(pk)
+            _add_bit(self.category_bits, category, position)
+            if target_area:
+                _add_bit(self.area_bits, target_area, position)
+        self.positions = {pk: i for i, pk in enumerate(self.menu_ids)}
+        self.all_bits = (1 << len(self.menu_ids)) - 1
+
+        self.tag_bits = {}
+        for menu_id, tag_id in menu_tags:
+            position = self.positions.get(menu_id)
+            if position is not None:
+                _add_bit(self.tag_bits, tag_id, position)
+        tags = [(tag_id, name) for tag_id, name in tags if name]
+        self.tag_names = [(tag_id, name.lower()) for tag_id, name in tags]
+        self.tag_labels = dict(tags)
+
+    @classmethod
+    def build(cls, version=None):
+        # モデルのインスタンスは作らず、IDの組だけを読む
+        # レプリカは遅れていることがあるので、プライマリから読む（version は読み込みの前に読んだもの）
+        return cls(
+            ExerciseMenu.objects.using(DEFAULT_DB_ALIAS).order_by("id").values_list("pk", "category", "target_area"),
+            ExerciseMenu.tags.through.objects.using(DEFAULT_DB_ALIAS).values_list("exercisemenu_id", "tag_id"),
+            Tag.objects.using(DEFAULT_DB_ALIAS).values_list("pk", "name"),
+            version,
+        )
+
+    def __len__(self):
+        return len(self.menu_ids)
+
+    def term_bits(self, term: str) -> int:
+        """名前に term を含むタグのいずれかを持つメニュー（icontains と同じ部分一致）"""
+        term = term.lower()
+        bits = 0
+        for tag_id, name in self.tag_names:
+            if term in name:
+                bits |= self.tag_bits.get(tag_id, 0)
+        return bits
+
+    def filter_bits(self, clauses) -> int:
+        """parse_tag_query の結果に一致するメニューのビットセット"""
+        bits = self.all_bits
+        for terms in clauses:
+            matched = 0
+            for negated, term in terms:
+                term_bits = self.term_bits(term)
+                matched |= (self.all_bits & ~term_bits) if negated else term_bits
+            bits &= matched
+        return bits
+
+    def ids(self, bits: int) -> list:
+        """ビットセットに含まれるメニューID（昇順）"""
+        menu_ids = self.menu_ids
+        # 2進数の文字列を下位ビットから見る（1ビットずつシフトするより速い）
+        return [menu_ids[i] for i, bit in enumerate(bin(bits)[:1:-1]) if bit == "1"]
+
+    def select(self, menu_ids, bits: int) -> list:
+        """menu_ids の並び順を保ったまま、ビットセットに含まれるものだけ残す"""
+        positions = self.positions
+        return [
+            pk for pk in menu_ids
+            if pk in positions and bits >> positions[pk] & 1
+        ]
+
+    def bits_of(self, menu_ids) -> int:
+        """メニューIDのリストをビットセットにする（インデックスに無いIDは無視）"""
+        if not self.menu_ids:
+            return 0
+        # 1ビットずつ OR すると件数の2乗に比例するので、2進数の文字列を作って一度に変換する
+        positions = self.positions
+        last = len(self.menu_ids) - 1
+        digits = bytearray(b"0" * (last + 1))
+        for pk in menu_ids:
+            position = positions.get(pk)
+            if position is not None:
+                digits[last - position] = ord("1")
+        return int(digits, 2)
+
+    def facets(self, bits: int) -> dict:
+        """
+        ビットセット（検索結果）に含まれるメニューの、タグ・カテゴリ・対象部位ごとの件数
+        件数が0のものは含めない。件数の多い順（同数なら名前順）
+        """
+        def counts(bitsets, name=str):
+            result = []
+            for key, key_bits in bitsets.items():
+                count = (bits & key_bits).bit_count()
+                if count:
+                    result.append((key, count))
+            return sorted(result, key=lambda item: (-item[1], name(item[0])))
+
+        labels = dict(ExerciseMenu._meta.get_field("category").choices)
+        return {
+            "tags": [
+                {"name": self.tag_labels[tag_id], "count": count}
+                for tag_id, count in counts(self.tag_bits, lambda tag_id: self.tag_labels.get(tag_id, ""))
+                if tag_id in self.tag_labels
+            ],
+            "category": [
+                {"value": value, "label": labels.get(value, value), "count": count}
+                for value, count in counts(self.category_bits)
+            ],
+            "target_area": [
+                {"value": value, "count": count}
+                for value, count in counts(self.area_bits)
+            ],
+        }
+
+
+# ---- プロセス内キャッシュ ----
+_lock = threading.Lock()
+_index = None
+
+
+def get_tag_filter_index() -> TagFilterIndex:
+    """インデックスを返す（カタログのバージョンが変わっていれば作り直す）"""
+    global _index
+    version = get_catalog_version()
+    index = _index
+    if index is not None and index.version == version:
+        return index
+
+    with _lock:
+        if _index is not None and _index.version == version:
+            return _index
+        index = TagFilterIndex.build(version)
+        _index = index
+    return index
@@ -0,0 +1,160 @@
+from django.contrib.auth import get_user_model
+from django.test import AsyncClient, TestCase, override_settings
+
+
+@override_settings(ROOT_URLCONF='apps.condition_manager.async_urls')
+class AsyncViewParityTest(TestCase):
+    """非同期版のAPIが同期版（DRF）と同じレスポンスを返すことを確認する"""
+
+    def setUp(self):
+        from .models import ConditionLog, ExerciseMenu, Routine, Tag
+
+        User = get_user_model()
+        self.user = User.objects.create_user(username='async', password='pass')
+        stretch = Tag.objects.create(name='ストレッチ')
+        light = Tag.objects.create(name='軽め')
+        self.menus = []
+        for i in range(8):
+            menu = ExerciseMenu.objects.create(
+                name=f'肩のストレッチ{i}', description='肩をほぐす', target_area='肩'
+            )
+            menu.tags.add(stretch, *([light] if i % 2 else []))
+            self.menus.append(menu)
+        for menu in self.menus[:3]:
+            Routine.objects.create(user=self.user, exercise=menu)
+        for _ in range(9):
+            ConditionLog.objects.create(user=self.user, fatigue_level=2, mood_level=4)
+
+        self.client.force_login(self.user)
+
+    def _sync(self, method, path, **kwargs):
+        # 同期版は config.urls の /api/ 配下
+        with override_settings(ROOT_URLCONF='config.urls'):
+            return getattr(self.client, method)('/api' + path, **kwargs)
+
+    async def _async(self, method, path, **kwargs):
+        client = AsyncClient()
+        await client.aforce_login(self.user)
+        return await getattr(client, method)(path, **kwargs)
+
+    async def _assert_same(self, method, path, **kwargs):
+        from asgiref.sync import sync_to_async
+
+        expected = await sync_to_async(self._sync)(method, path, **kwargs)
+        actual = await self._async(method, path, **kwargs)
+        self.assertEqual(actual.status_code, expected.status_code, path)
+        if expected.status_code != 204:
+            self.assertEqual(actual.json(), expected.json(), path)
+        return actual
+
+    async def test_list_endpoints(self):
+        for path in [
+            '/exercises/', '/exercises/?page=2', '/exercises/?q=ストレッチ',
+            '/exercises/?q=肩&tags=軽め', '/exercises/?tags=軽め&page=9',
+            '/exercises/?q=肩&facets=1', '/exercises/?tag_query=-軽め&facets=1', '/exercises/?tags=-軽め',
+            f'/exercises/{self.menus[0].pk}/', '/exercises/99999/',
+            '/history/', '/history/?page=2', '/history/?cursor=&page_size=4', '/history/?cursor=%%',
+            '/routines/', '/routines/?cursor=',
+            '/trends/', '/trends/?period=week', '/trends/?start=2026-13-01', '/trends/?period=month',
+        ]:
+            await self._assert_same('get', path)
+
+    async def test_recommend(self):
+        from .models import ConditionLog
+
+        before = await ConditionLog.objects.acount()
+        data = {'fatigue_level': 2, 'mood_level': 4, 'body_concern': '肩こり'}
+        resp = await self._assert_same('post', '/recommend/', data=data, content_type='application/json')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(await ConditionLog.objects.acount(), before + 2)
+
+        # 不正な入力
+        await self._assert_same('post', '/recommend/', data={'fatigue_level': 'x', 'mood_level': 1})
+        await self._assert_same('post', '/recommend/', data={'fatigue_level': 9, 'mood_level': 1})
+
+    async def test_recommend_batch(self):
+        from .models import ConditionLog
+
+        before = await ConditionLog.objects.acount()
+        data = {'entries': [
+            {'fatigue_level': 2, 'mood_level': 4, 'body_concern': '肩こり', 'log_date': '2026-01-05'},
+            {'fatigue_level': 5, 'mood_level': 1},
+        ]}
+        resp = await self._assert_same('post', '/recommend/batch/', data=data, content_type='application/json')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(await ConditionLog.objects.acount(), before + 4)
+
+        # 不正な入力
+        bad = {'entries': [{'fatigue_level': 1, 'mood_level': 1}, {'fatigue_level': 0, 'mood_level': 1}]}
+        await self._assert_same('post', '/recommend/batch/', data=bad, content_type='application/json')
+        await self._assert_same('post', '/recommend/batch/', data={'entries': []}, content_type='application/json')
+
+    async def test_routine_manage(self):
+        path = f'/routines/{self.menus[5].pk}/'
+        resp = await self._async('post', path)
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(resp.json()['routine']['exercise']['id'], self.menus[5].pk)
+        # 2回目は登録済み（同期版と同じ内容）
+        await self._assert_same('post', path)
+
+        self.assertEqual((await self._async('delete', path)).status_code, 204)
+        await self._assert_same('delete', path)
+        await self._assert_same('post', '/routines/99999/')
+
+    async def test_routine_bulk(self):
+        m = [menu.pk for menu in self.menus]
+        resp = await self._async(
+            'post', '/routines/bulk/', data={'add': [m[4], m[5]], 'remove': [m[0]]}, content_type='application/json'
+        )
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual((resp.json()['count'], resp.json()['removed']), (4, 1))
+
+        for data in [
+            # 2回目は登録済み・削除済み（同期版と同じ内容）
+            {'add': [m[4], m[5]], 'remove': [m[0]]},
+            {'add': [m[6], 99999]},
+            {'add': [m[6]], 'remove': [m[6]]},
+        ]:
+            await self._assert_same('post', '/routines/bulk/', data=data, content_type='application/json')
+
+    async def test_requires_login_and_method(self):
+        resp = await AsyncClient().get('/history/')
+        self.assertEqual(resp.status_code, 403)
+        self.assertIn('detail', resp.json())
+
+        resp = await self._async('get', '/recommend/')
+        self.assertEqual(resp.status_code, 405)
+
+    async def test_non_object_json_body(self):
+        for path in ['/recommend/', '/recommend/batch/', '/routines/bulk/']:
+            resp = await self._assert_same('post', path, data=[1, 2], content_type='application/json')
+            self.assertEqual(resp.status_code, 400)
+            self.assertIn('detail', resp.json())
+
+    async def test_csrf_failure_is_json(self):
+        from asgiref.sync import sync_to_async
+        from django.test import Client
+
+        data = {'fatigue_level': 2, 'mood_level': 4}
+
+        def sync_post():
+            client = Client(enforce_csrf_checks=True)
+            client.force_login(self.user)
+            with override_settings(ROOT_URLCONF='config.urls'):
+                return client.post('/api/recommend/', data=data, content_type='application/json')
+
+        client = AsyncClient(enforce_csrf_checks=True)
+        await client.aforce_login(self.user)
+        resp = await client.post('/recommend/', data=data, content_type='application/json')
+        expected = await sync_to_async(sync_post)()
+        self.assertEqual(resp.status_code, 403)
+        self.assertEqual(resp.json(), expected.json())
+        self.assertTrue(resp.json()['detail'].startswith('CSRF Failed'))
+
+        # トークンがあれば通る
+        token = 'a' * 32
+        client.cookies['csrftoken'] = token
+        resp = await client.post(
+            '/recommend/', data=data, content_type='application/json', headers={'X-CSRFToken': token}
+        )
+        self.assertEqual(resp.status_code, 200)
@@ -0,0 +1,36 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+
+class BenchApiCommandTest(TestCase):
+    options = dict(users=2, logs=5, menus=10, tags=5, routines=3, repeat=2)
+
+    def _run(self, *args, **extra):
+        out = StringIO()
+        call_command('bench_api', '--current-db', *args, stdout=out, **self.options, **extra)
+        return out.getvalue()
+
+    def test_reports_every_endpoint(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'baseline.json'
+            output = self._run(save_baseline=str(path))
+            results = json.loads(path.read_text(encoding='utf-8'))
+
+        for name in ['recommend', 'exercise_list', 'exercise_search', 'exercise_tags',
+                     'exercise_detail', 'history', 'routines', 'recommend_batch', 'routines_bulk', 'trends']:
+            self.assertIn(name, output)
+            self.assertEqual(set(results[name]), {'p50_ms', 'p95_ms', 'queries', 'peak_kb'})
+
+    def test_fails_when_baseline_is_exceeded(self):
+        baseline = {'history': {'p50_ms': 0, 'p95_ms': 0, 'queries': 0, 'peak_kb': 0}}
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'baseline.json'
+            path.write_text(json.dumps(baseline), encoding='utf-8')
+            with self.assertRaisesMessage(CommandError, 'history: queries'):
+                self._run(baseline=str(path))
@@ -0,0 +1,92 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework.renderers import JSONRenderer
+
+
+class FastSerializerParityTest(TestCase):
+    """高速版のシリアライズが ModelSerializer と同じ JSON（バイト列）になることを確認する"""
+
+    def setUp(self):
+        from .models import ConditionLog, ExerciseMenu, Routine, Tag
+
+        self.user = get_user_model().objects.create_user(username='parity', password='pass')
+        tags = [Tag.objects.create(name=name) for name in ['肩こり解消', 'ストレッチ', 'quote"タグ']]
+        with_tags = ExerciseMenu.objects.create(
+            name='肩回し', description='肩を\n回す', beginner_guide='ゆっくり', category='other',
+            target_area='肩、首',
+        )
+        with_tags.tags.add(*tags)
+        ExerciseMenu.objects.create(name='タグなし', description='', target_area='')
+        ConditionLog.objects.create(user=self.user, fatigue_level=1, mood_level=5, body_concern='')
+        ConditionLog.objects.create(user=self.user, fatigue_level=5, mood_level=1, body_concern='腰が痛い')
+        Routine.objects.create(user=self.user, exercise=with_tags, view_count=3)
+
+    def assertSameJson(self, fast, drf):
+        renderer = JSONRenderer()
+        self.assertEqual(renderer.render(fast), renderer.render(drf))
+
+    def _check_all(self):
+        from .models import ConditionLog, ExerciseMenu, Routine
+        from .serializers import (
+            ConditionLogSerializer, ExerciseMenuSerializer, RoutineSerializer,
+            log_to_dict, menu_to_dict, routine_to_dict,
+        )
+
+        menus = list(ExerciseMenu.objects.prefetch_related('tags').order_by('id'))
+        self.assertSameJson([menu_to_dict(m) for m in menus], ExerciseMenuSerializer(menus, many=True).data)
+        # プリフェッチしていないメニューも同じ
+        menu = ExerciseMenu.objects.get(name='肩回し')
+        self.assertSameJson(menu_to_dict(menu), ExerciseMenuSerializer(menu).data)
+
+        logs = list(ConditionLog.objects.all())
+        self.assertSameJson([log_to_dict(log) for log in logs], ConditionLogSerializer(logs, many=True).data)
+
+        routines = list(Routine.objects.select_related('exercise').prefetch_related('exercise__tags'))
+        self.assertSameJson(
+            [routine_to_dict(r) for r in routines], RoutineSerializer(routines, many=True).data
+        )
+
+    def test_parity(self):
+        self._check_all()
+
+    @override_settings(TIME_ZONE='UTC')
+    def test_parity_in_utc(self):
+        # UTC の日時は DRF と同じく末尾が Z になる
+        from .models import ConditionLog
+        from .serializers import log_to_dict
+
+        self.assertTrue(log_to_dict(ConditionLog.objects.first())['created_at'].endswith('Z'))
+        self._check_all()
+
+    def test_api_responses_unchanged(self):
+        """APIのレスポンスが ModelSerializer でシリアライズした場合と同じ"""
+        from .models import ConditionLog, Routine
+        from .serializers import ConditionLogSerializer, RoutineSerializer
+
+        self.client.force_login(self.user)
+        resp = self.client.get('/api/history/')
+        logs = ConditionLog.objects.filter(user=self.user).order_by('-log_date', '-created_at', '-id')
+        self.assertSameJson(resp.json()['results'], ConditionLogSerializer(logs, many=True).data)
+
+        resp = self.client.get('/api/routines/')
+        routines = Routine.objects.filter(user=self.user)
+        self.assertSameJson(resp.json()['results'], RoutineSerializer(routines, many=True).data)
+
+
+class BenchSerializersCommandTest(TestCase):
+    def test_reports_each_kind(self):
+        out = StringIO()
+        call_command('bench_serializers', '--current-db', rows=5, repeat=1, stdout=out)
+        for name in ['menus', 'logs', 'routines']:
+            self.assertIn(name, out.getvalue())
+
+
+class BenchRenderersCommandTest(TestCase):
+    def test_reports_each_payload(self):
+        out = StringIO()
+        call_command('bench_renderers', '--current-db', rows=5, repeat=1, stdout=out)
+        for name in ['recommend', 'list', 'list(all)']:
+            self.assertIn(name, out.getvalue())
@@ -0,0 +1,81 @@
+from django.contrib.auth import get_user_model
+from django.test import AsyncClient, TestCase, override_settings
+
+
+class ConditionalGetTest(TestCase):
+    def setUp(self):
+        from .models import ExerciseMenu, Tag
+
+        self.user = get_user_model().objects.create_user(username='cacher', password='pass')
+        self.tag = Tag.objects.create(name='肩')
+        self.menu = ExerciseMenu.objects.create(name='肩回し', description='説明')
+        self.menu.tags.add(self.tag)
+        self.client.force_login(self.user)
+        self.detail = f'/api/exercises/{self.menu.pk}/'
+
+    def test_detail_not_modified(self):
+        resp = self.client.get(self.detail)
+        self.assertEqual(resp.status_code, 200)
+        etag = resp['ETag']
+        self.assertTrue(etag.startswith('"'))
+        self.assertIn('max-age=60', resp['Cache-Control'])
+        self.assertIn('private', resp['Cache-Control'])
+        self.assertNotIn('public', resp['Cache-Control'])
+        # updated_at は検証にだけ使い、レスポンスには含めない
+        self.assertNotIn('updated_at', resp.json())
+        self.assertIn('Cookie', resp['Vary'])
+
+        # メニューの取得のみ（タグの取得・シリアライズはしない）
+        with self.assertNumQueries(1 + 2):  # セッション + ユーザー + メニュー
+            resp = self.client.get(self.detail, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp['ETag'], etag)
+
+        resp = self.client.get(self.detail, HTTP_IF_MODIFIED_SINCE=resp['Last-Modified'])
+        self.assertEqual(resp.status_code, 304)
+
+    def test_detail_etag_changes_with_menu_and_tags(self):
+        etag = self.client.get(self.detail)['ETag']
+
+        self.tag.name = '肩こり'
+        self.tag.save()
+        resp = self.client.get(self.detail, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()['tags'], [{'name': '肩こり'}])
+
+        etag = resp['ETag']
+        self.menu.description = '新しい説明'
+        self.menu.save()
+        self.assertEqual(self.client.get(self.detail, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_list_not_modified_without_catalog_queries(self):
+        from .models import ExerciseMenu
+
+        resp = self.client.get('/api/exercises/?q=肩&page=1')
+        etag = resp['ETag']
+        with self.assertNumQueries(2):  # セッション + ユーザー
+            resp = self.client.get('/api/exercises/?page=1&q=肩', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)
+
+        self.assertNotEqual(self.client.get('/api/exercises/?q=首')['ETag'], etag)
+
+        ExerciseMenu.objects.create(name='首回し', description='説明')
+        resp = self.client.get('/api/exercises/?q=肩&page=1', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+
+    async def test_async_views_share_etags(self):
+        from asgiref.sync import sync_to_async
+
+        etag = (await sync_to_async(self.client.get)(self.detail))['ETag']
+        list_etag = (await sync_to_async(self.client.get)('/api/exercises/'))['ETag']
+
+        client = AsyncClient()
+        await client.aforce_login(self.user)
+        with override_settings(ROOT_URLCONF='apps.condition_manager.async_urls'):
+            resp = await client.get(f'/exercises/{self.menu.pk}/', headers={'If-None-Match': etag})
+            self.assertEqual(resp.status_code, 304)
+            resp = await client.get('/exercises/', headers={'If-None-Match': list_etag})
+            self.assertEqual(resp.status_code, 304)
+            resp = await client.get(f'/exercises/{self.menu.pk}/')
+            self.assertEqual(resp['ETag'], etag)
+            self.assertEqual(resp.json()['tags'], [{'name': '肩'}])
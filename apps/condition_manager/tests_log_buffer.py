@@ -0,0 +1,197 @@
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError
+from django.test import TestCase, TransactionTestCase, override_settings
+from rest_framework.test import APIRequestFactory
+
+
+class ConditionLogBufferTest(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.user = User.objects.create_user(username='buffered', password='pass')
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.spool = Path(self.tmp.name) / 'spool.jsonl'
+
+    def _log(self, concern=''):
+        from .models import ConditionLog
+
+        return ConditionLog(user=self.user, fatigue_level=3, mood_level=4, body_concern=concern)
+
+    def test_recommend_does_not_wait_for_insert(self):
+        from . import log_buffer
+        from .models import ConditionLog
+        from .views import recommend_exercise_view
+
+        buffer = log_buffer.ConditionLogBuffer(max_size=3, autostart=False)
+        data = {'fatigue_level': 3, 'mood_level': 3, 'body_concern': '肩'}
+        with override_settings(CONDITION_LOG_WRITE_BEHIND=True), \
+                mock.patch.object(log_buffer, 'get_log_buffer', return_value=buffer):
+            for expected in [0, 0, 3]:
+                req = APIRequestFactory().post('/api/recommend/', data, format='json')
+                req.user = self.user
+                self.assertEqual(recommend_exercise_view(req).status_code, 200)
+                self.assertEqual(ConditionLog.objects.count(), expected)
+        self.assertEqual(len(buffer), 0)
+
+    def test_failed_flush_is_spooled_and_replayed(self):
+        from .log_buffer import ConditionLogBuffer
+        from .models import ConditionLog
+
+        buffer = ConditionLogBuffer(spool_path=self.spool, autostart=False)
+        buffer.add(self._log('肩こり'))
+        buffer.add(self._log('腰痛'))
+
+        with mock.patch.object(ConditionLog.objects, 'bulk_create', side_effect=DatabaseError), \
+                self.assertLogs('apps.condition_manager.log_buffer', 'WARNING'):
+            self.assertEqual(buffer.flush(), 0)
+        self.assertEqual(len(self.spool.read_text(encoding='utf-8').splitlines()), 2)
+
+        buffer.add(self._log('首'))
+        self.assertEqual(buffer.flush(), 3)
+        self.assertFalse(self.spool.exists())
+        self.assertEqual(
+            sorted(ConditionLog.objects.values_list('body_concern', flat=True)), ['肩こり', '腰痛', '首']
+        )
+
+    def test_spool_left_by_crashed_process_is_replayed(self):
+        import os
+        from .log_buffer import ConditionLogBuffer
+        from .models import ConditionLog
+
+        def leave_reading(pid, concern):
+            # 読み込み中（別名にした後）にプロセスが落ちた退避ファイル
+            writer = ConditionLogBuffer(spool_path=self.spool, autostart=False)
+            writer._write_spool([self._log(concern)])
+            os.replace(self.spool, self.spool.with_name(f'{self.spool.name}.{pid}.reading'))
+
+        leave_reading(999999999, '落ちた')  # もう無いプロセス
+        leave_reading(os.getppid(), '読み込み中')  # 動いているプロセス（そのプロセスが保存する）
+        buffer = ConditionLogBuffer(spool_path=self.spool, autostart=False)
+        buffer.add(self._log('新しい'))
+        with self.assertLogs('apps.condition_manager.log_buffer', 'WARNING'):
+            self.assertEqual(buffer.flush(), 2)
+        self.assertEqual(sorted(ConditionLog.objects.values_list('body_concern', flat=True)), ['新しい', '落ちた'])
+        self.assertEqual(
+            [path.name for path in Path(self.tmp.name).iterdir()], [f'spool.jsonl.{os.getppid()}.reading']
+        )
+
+    def test_spool_is_kept_until_saved(self):
+        from .log_buffer import ConditionLogBuffer
+        from .models import ConditionLog
+
+        buffer = ConditionLogBuffer(spool_path=self.spool, autostart=False)
+        buffer._write_spool([self._log('退避')])
+        # 保存の途中で想定外のエラー（プロセスが落ちた場合と同じく、退避ファイルは消えない）
+        with mock.patch('apps.condition_manager.log_buffer.save_condition_logs', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                buffer.flush()
+        with self.assertLogs('apps.condition_manager.log_buffer', 'WARNING'):
+            self.assertEqual(buffer.flush(), 1)
+        self.assertEqual(list(ConditionLog.objects.values_list('body_concern', flat=True)), ['退避'])
+        self.assertEqual(list(Path(self.tmp.name).iterdir()), [])
+
+    def test_bad_row_is_quarantined_without_blocking_others(self):
+        import json
+        from django.db import IntegrityError
+        from . import log_buffer
+        from .log_buffer import ConditionLogBuffer
+        from .models import ConditionLog
+
+        quarantine = Path(self.tmp.name) / 'rejected.jsonl'
+        buffer = ConditionLogBuffer(spool_path=self.spool, quarantine_path=quarantine, autostart=False)
+        save = log_buffer.save_condition_logs
+
+        def save_unless_rejected(logs):
+            # 削除されたユーザーのログなど、何度保存しても失敗するログ
+            if any(log.body_concern == '不正' for log in logs):
+                raise IntegrityError
+            return save(logs)
+
+        for concern in ['肩こり', '不正', '腰痛']:
+            buffer.add(self._log(concern))
+        with mock.patch.object(log_buffer, 'save_condition_logs', side_effect=save_unless_rejected), \
+                self.assertLogs('apps.condition_manager.log_buffer', 'WARNING'):
+            self.assertEqual(buffer.flush(), 2)
+        self.assertFalse(self.spool.exists())
+        rejected = [json.loads(line) for line in quarantine.read_text(encoding='utf-8').splitlines()]
+        self.assertEqual([record['body_concern'] for record in rejected], ['不正'])
+
+        # 次回以降の保存は妨げない
+        buffer.add(self._log('首'))
+        self.assertEqual(buffer.flush(), 1)
+        self.assertEqual(
+            sorted(ConditionLog.objects.values_list('body_concern', flat=True)), ['肩こり', '腰痛', '首']
+        )
+
+    def test_unreadable_spool_line_is_quarantined(self):
+        from .log_buffer import ConditionLogBuffer
+
+        quarantine = Path(self.tmp.name) / 'rejected.jsonl'
+        buffer = ConditionLogBuffer(spool_path=self.spool, quarantine_path=quarantine, autostart=False)
+        buffer._write_spool([self._log()])
+        with open(self.spool, 'a', encoding='utf-8') as f:
+            f.write('{"broken"\n')
+        with self.assertLogs('apps.condition_manager.log_buffer', 'ERROR'):
+            self.assertEqual(buffer.flush(), 1)
+        self.assertEqual(quarantine.read_text(encoding='utf-8'), '{"broken"\n')
+
+    def test_writer_thread_survives_unexpected_errors(self):
+        from .log_buffer import ConditionLogBuffer
+
+        buffer = ConditionLogBuffer(interval=0.01)
+        calls = []
+
+        def flush():
+            calls.append(1)
+            if len(calls) == 1:
+                raise RuntimeError('unexpected')
+            if len(calls) >= 3:
+                buffer._stopped.set()
+            return 0
+
+        with mock.patch.object(buffer, 'flush', side_effect=flush), \
+                mock.patch('apps.condition_manager.log_buffer.connection'), \
+                self.assertLogs('apps.condition_manager.log_buffer', 'ERROR'):
+            buffer._run()
+        self.assertEqual(len(calls), 3)
+
+    def test_flush_command_replays_spool(self):
+        from io import StringIO
+        from django.core.management import call_command
+        from .log_buffer import ConditionLogBuffer
+        from .models import ConditionLog
+
+        ConditionLogBuffer(spool_path=self.spool, autostart=False)._write_spool([self._log()])
+        with override_settings(CONDITION_LOG_SPOOL_PATH=self.spool):
+            call_command('flush_condition_logs', stdout=StringIO())
+        self.assertEqual(ConditionLog.objects.count(), 1)
+
+
+class ConditionLogBufferThreadTest(TransactionTestCase):
+    def setUp(self):
+        from apps.management.metrics import flush_metrics
+
+        # コミットされた分のダッシュボードの集計値はテスト用DBがあるうちに反映する
+        self.addCleanup(flush_metrics)
+
+    def test_background_thread_flushes_on_interval(self):
+        from .log_buffer import ConditionLogBuffer
+        from .models import ConditionLog
+
+        user = get_user_model().objects.create_user(username='threaded', password='pass')
+        buffer = ConditionLogBuffer(max_size=100, interval=0.05)
+        buffer.add(ConditionLog(user=user, fatigue_level=1, mood_level=1))
+
+        deadline = time.monotonic() + 5
+        while ConditionLog.objects.count() == 0 and time.monotonic() < deadline:
+            time.sleep(0.02)
+        self.assertEqual(ConditionLog.objects.count(), 1)
+
+        buffer.add(ConditionLog(user=user, fatigue_level=2, mood_level=2))
+        buffer.close()
+        self.assertEqual(ConditionLog.objects.count(), 2)
@@ -0,0 +1,122 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+
+class MenuPayloadCacheTest(TestCase):
+    def setUp(self):
+        from .models import ExerciseMenu, Tag
+
+        self.user = get_user_model().objects.create_user(username='payload', password='pass')
+        self.tag = Tag.objects.create(name='肩')
+        self.menus = []
+        for i in range(5):
+            menu = ExerciseMenu.objects.create(name=f'体操{i}', description='説明', target_area='肩')
+            menu.tags.add(self.tag)
+            self.menus.append(menu)
+        # タグの追加で updated_at が更新されるので読み直す
+        self.menus = list(ExerciseMenu.objects.order_by('id'))
+
+    def _expected(self, menus):
+        from .models import ExerciseMenu
+        from .serializers import ExerciseMenuSerializer
+
+        menus = ExerciseMenu.objects.filter(pk__in=[m.pk for m in menus]).order_by('id').prefetch_related('tags')
+        return [dict(d) for d in ExerciseMenuSerializer(menus, many=True).data]
+
+    def test_matches_serializer_and_caches(self):
+        from .catalog import get_catalog_version
+        from .menu_cache import get_menu_payloads, serialize_menus
+
+        ids = [self.menus[3].pk, self.menus[1].pk, 99999]
+        expected = self._expected(self.menus)
+        by_id = {d['id']: d for d in expected}
+
+        # 1回目: メニュー + タグ
+        with self.assertNumQueries(2):
+            payloads = get_menu_payloads(ids)
+        self.assertEqual(payloads, [by_id[ids[0]], by_id[ids[1]]])
+
+        # 2回目以降はDBを読まない（インスタンスからでも同じ）
+        with self.assertNumQueries(0):
+            self.assertEqual(get_menu_payloads(ids[:2]), payloads)
+            self.assertEqual(serialize_menus([self.menus[1]]), [by_id[ids[1]]])
+
+        # 一部だけキャッシュに無い場合はその分のタグだけ取得する
+        # （メニューを読む前のバージョンを渡すと、プライマリから読んだインスタンスをそのまま使う）
+        with self.assertNumQueries(1):
+            self.assertEqual(serialize_menus(self.menus, get_catalog_version()), expected)
+
+    def test_menus_read_before_the_version_are_read_again(self):
+        from .catalog import get_catalog_version
+        from .menu_cache import menu_payload_key, serialize_menus
+
+        menu = self.menus[0]
+        # メニューを読んだ後に変更がコミットされた（インスタンスは古い）
+        type(menu).objects.filter(pk=menu.pk).update(name='変更後')
+        version = get_catalog_version()
+
+        # バージョンを指定しなければキャッシュに無い分はプライマリから読み直す
+        with self.assertNumQueries(2):
+            payload = serialize_menus([menu])[0]
+        self.assertEqual(payload['name'], '変更後')
+        self.assertEqual(cache.get(menu_payload_key(version, menu.pk))['name'], '変更後')
+
+    def test_invalidated_on_catalog_change(self):
+        from .menu_cache import get_menu_payloads
+
+        pk = self.menus[0].pk
+        self.assertEqual(get_menu_payloads([pk])[0]['tags'], [{'name': '肩'}])
+        self.tag.name = '肩こり'
+        self.tag.save()
+        self.assertEqual(get_menu_payloads([pk])[0]['tags'], [{'name': '肩こり'}])
+
+    def test_payload_cached_before_commit_is_discarded(self):
+        from django.core.cache import cache
+        from .catalog import get_catalog_version
+        from .menu_cache import get_menu_payloads, menu_payload_key
+
+        menu = self.menus[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            menu.name = '新しい体操'
+            menu.save()
+            # コミット前に別のリクエストが古い内容を新しいバージョンでキャッシュした場合
+            stale = {**get_menu_payloads([menu.pk])[0], 'name': '体操0'}
+            cache.set(menu_payload_key(get_catalog_version(), menu.pk), stale)
+        self.assertEqual(get_menu_payloads([menu.pk])[0]['name'], '新しい体操')
+
+    def test_routine_list_uses_cached_menus(self):
+        from .models import Routine
+        from .views import routine_list_view
+
+        for menu in self.menus:
+            Routine.objects.create(user=self.user, exercise=menu)
+
+        def get():
+            req = APIRequestFactory().get('/api/routines/')
+            force_authenticate(req, user=self.user)
+            return routine_list_view(req)
+
+        expected = get().data['results']
+        # ルーティン（メニューを JOIN、最大20件をまとめて取得）のみ、タグは取得しない
+        with self.assertNumQueries(1):
+            resp = get()
+        self.assertEqual(resp.data['results'], expected)
+        self.assertEqual(resp.data['results'][0]['exercise']['tags'], [{'name': '肩'}])
+
+
+class SharedCacheCheckTest(SimpleTestCase):
+    def test_locmem_with_several_workers_is_an_error(self):
+        from .checks import check_shared_cache
+
+        with override_settings(WEB_CONCURRENCY=4):
+            errors = check_shared_cache(None)
+        self.assertEqual([error.id for error in errors], ['condition_manager.E001'])
+
+        # ワーカーが1つなら LocMemCache でよい
+        self.assertEqual(check_shared_cache(None), [])
+
+        shared = {'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'cache'}}
+        with override_settings(WEB_CONCURRENCY=4, CACHES=shared):
+            self.assertEqual(check_shared_cache(None), [])
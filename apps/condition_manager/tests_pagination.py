@@ -0,0 +1,109 @@
+from datetime import date, timedelta
+
+from django.test import SimpleTestCase, TestCase
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+
+class CursorEncodingTest(SimpleTestCase):
+    def test_round_trip(self):
+        from .pagination import decode_cursor, encode_cursor
+
+        values = ['2026-02-01', '2026-02-01T10:00:00+00:00', 42]
+        self.assertEqual(decode_cursor(encode_cursor(values)), values)
+
+    def test_invalid_cursor(self):
+        from .pagination import InvalidCursor, decode_cursor
+
+        for cursor in ['%%%', 'bm90IGpzb24', 'eyJhIjogMX0']:  # 壊れた base64 / JSON でない / list でない
+            with self.assertRaises(InvalidCursor):
+                decode_cursor(cursor)
+
+
+class CursorPaginationViewTest(TestCase):
+    def setUp(self):
+        from .models import ConditionLog, ExerciseMenu, Routine
+
+        User = get_user_model()
+        self.user = User.objects.create_user(username='scroller', password='pass')
+        other = User.objects.create_user(username='other', password='pass')
+
+        # 同じ日付のログを複数作り、並び替えキーが重なる場合も確認する
+        today = date(2026, 2, 1)
+        for i in range(25):
+            ConditionLog.objects.create(
+                user=self.user, log_date=today - timedelta(days=i // 3),
+                fatigue_level=3, mood_level=3,
+            )
+        ConditionLog.objects.create(user=other, fatigue_level=3, mood_level=3)
+
+        for i in range(9):
+            menu = ExerciseMenu.objects.create(name=f'メニュー{i}', description='説明')
+            Routine.objects.create(user=self.user, exercise=menu, view_count=i % 2)
+
+    def _get(self, view, params):
+        req = APIRequestFactory().get('/', params)
+        force_authenticate(req, user=self.user)
+        return view(req)
+
+    def _walk(self, view, page_size):
+        ids, cursor, requests = [], '', 0
+        while cursor is not None:
+            resp = self._get(view, {'cursor': cursor, 'page_size': page_size})
+            self.assertEqual(resp.status_code, 200)
+            ids += [row['id'] for row in resp.data['results']]
+            cursor = resp.data['next_cursor']
+            requests += 1
+        return ids, requests
+
+    def test_history_can_scroll_whole_history(self):
+        from .models import ConditionLog
+        from .views import history_list_view
+
+        expected = list(
+            ConditionLog.objects.filter(user=self.user)
+            .order_by('-log_date', '-created_at', '-id').values_list('id', flat=True)
+        )
+        ids, requests = self._walk(history_list_view, 4)
+        self.assertEqual(ids, expected)
+        self.assertEqual(requests, 7)
+
+    def test_routines_follow_view_count_order(self):
+        from .models import Routine
+        from .views import routine_list_view
+
+        expected = list(
+            Routine.objects.filter(user=self.user)
+            .order_by('-view_count', '-added_at', '-id').values_list('id', flat=True)
+        )
+        ids, _ = self._walk(routine_list_view, 2)
+        self.assertEqual(ids, expected)
+
+    def test_cursor_page_does_not_count(self):
+        from .views import history_list_view
+
+        first = self._get(history_list_view, {'cursor': ''})
+        self.assertNotIn('count', first.data)
+        with self.assertNumQueries(1):
+            resp = self._get(history_list_view, {'cursor': first.data['next_cursor']})
+        self.assertEqual(len(resp.data['results']), 6)
+
+    def test_invalid_cursor_returns_400(self):
+        from .pagination import encode_cursor
+        from .views import history_list_view
+
+        for cursor in ['???', encode_cursor([1]), encode_cursor(['not-a-date', 'x', 1])]:
+            resp = self._get(history_list_view, {'cursor': cursor})
+            self.assertEqual(resp.status_code, 400)
+
+    def test_tampered_cursor_returns_400(self):
+        from .pagination import encode_cursor
+        from .views import history_list_view, routine_list_view
+
+        for values in [
+            [{}, {}, {}], [None, None, None], [[1], [2], [3]], [True, False, True],
+            ['2026-02-01', None, 1], ['2026-02-01', '2026-02-01T00:00:00', 'x'], [1e400, 1, 1],
+        ]:
+            for view in (history_list_view, routine_list_view):
+                resp = self._get(view, {'cursor': encode_cursor(values)})
+                self.assertEqual(resp.status_code, 400, (view.__name__, values))
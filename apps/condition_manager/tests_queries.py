@@ -0,0 +1,99 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+
+class ListViewQueryCountTest(TestCase):
+    """一覧APIのクエリ数が件数に比例しないことを確認する（N+1 の回帰テスト）"""
+
+    def setUp(self):
+        from .models import Tag, ExerciseMenu
+
+        User = get_user_model()
+        self.user = User.objects.create_user(username='counter', password='pass')
+        self.tags = [Tag.objects.create(name=f'タグ{i}') for i in range(3)]
+        self.menus = []
+        for i in range(8):
+            menu = ExerciseMenu.objects.create(name=f'メニュー{i}', description='説明')
+            menu.tags.add(*self.tags)
+            self.menus.append(menu)
+
+    def _get(self, view, path):
+        req = APIRequestFactory().get(path)
+        force_authenticate(req, user=self.user)
+        return view(req)
+
+    def _add_routines(self, count):
+        from .models import Routine
+
+        start = Routine.objects.filter(user=self.user).count()
+        for menu in self.menus[start:start + count]:
+            Routine.objects.create(user=self.user, exercise=menu)
+
+    def _add_logs(self, count):
+        from .models import ConditionLog
+
+        for _ in range(count):
+            ConditionLog.objects.create(user=self.user, fatigue_level=3, mood_level=3)
+
+    def test_routine_list_query_count(self):
+        from .views import routine_list_view
+
+        # ルーティン（メニューを JOIN、最大20件をまとめて取得）+ タグ
+        self._add_routines(2)
+        with self.assertNumQueries(2):
+            self.assertEqual(self._get(routine_list_view, '/api/routines/').status_code, 200)
+
+        self._add_routines(6)
+        with self.assertNumQueries(2):
+            resp = self._get(routine_list_view, '/api/routines/')
+        self.assertEqual(len(resp.data['results']), 6)
+        self.assertEqual(len(resp.data['results'][0]['exercise']['tags']), 3)
+
+    def test_exercise_list_query_count(self):
+        from .tag_filter import get_tag_filter_index
+        from .views import exercise_list_view
+
+        # COUNT + メニュー + タグ
+        with self.assertNumQueries(3):
+            resp = self._get(exercise_list_view, '/api/exercises/')
+        self.assertEqual(len(resp.data['results']), 6)
+
+        # 全文検索のみ（タグ条件はメモリ上のインデックス、メニューはシリアライズ結果のキャッシュから）
+        get_tag_filter_index()
+        with self.assertNumQueries(1):
+            resp = self._get(exercise_list_view, '/api/exercises/?q=メニュー&tags=タグ1')
+        self.assertEqual(resp.data['count'], 8)
+
+    def test_history_list_query_count(self):
+        from .views import history_list_view
+
+        # COUNT + ログ
+        self._add_logs(2)
+        with self.assertNumQueries(2):
+            self._get(history_list_view, '/api/history/')
+
+        self._add_logs(10)
+        with self.assertNumQueries(2):
+            resp = self._get(history_list_view, '/api/history/')
+        self.assertEqual(len(resp.data['results']), 6)
+
+
+class QueryPlanTest(TestCase):
+    def test_hot_queries_use_indexes(self):
+        from io import StringIO
+        from django.core.management import call_command
+
+        out = StringIO()
+        call_command('check_query_plans', stdout=out)
+        self.assertNotIn('NG', out.getvalue())
+
+    def test_detects_temp_sort(self):
+        from django.db import connection
+        from .management.commands.check_query_plans import find_problems
+
+        if connection.vendor != 'sqlite':
+            self.skipTest('SQLite の実行計画の形式で確認する')
+        plan = '3 0 0 SCAN condition_manager_tag\n9 0 0 USE TEMP B-TREE FOR ORDER BY'
+        self.assertEqual(len(find_problems(plan, allow_scan=False)), 2)
+        self.assertEqual(len(find_problems(plan, allow_scan=True)), 1)
@@ -0,0 +1,276 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIRequestFactory
+
+
+class RecommendationIndexTest(TestCase):
+    def setUp(self):
+        # lazy imports to avoid AppRegistry issues during discovery
+        from .models import Tag, ExerciseMenu
+
+        User = get_user_model()
+        self.user = User.objects.create_user(username='indexer', password='pass')
+
+        names = ['肩こり解消', 'ストレッチ', '筋トレ', 'リラックス', '初心者向け', '#有酸素', '腰痛']
+        self.tags = {name: Tag.objects.create(name=name) for name in names}
+
+        self.menus = []
+        tag_sets = [
+            ['肩こり解消', 'ストレッチ'],
+            ['筋トレ'],
+            ['リラックス', '初心者向け'],
+            ['#有酸素'],
+            ['腰痛', 'ストレッチ', '初心者向け'],
+            [],
+        ]
+        for i, tag_names in enumerate(tag_sets):
+            menu = ExerciseMenu.objects.create(name=f'メニュー{i}', description='説明')
+            menu.tags.add(*[self.tags[n] for n in tag_names])
+            self.menus.append(menu)
+
+    def _expected_top(self, fatigue, mood, concern, limit=3):
+        from .models import ExerciseMenu
+        from .tests_scoring import reference_score
+
+        scored = []
+        for menu in ExerciseMenu.objects.order_by('id').prefetch_related('tags'):
+            s = reference_score(menu, fatigue, mood, concern)
+            if s > 0:
+                scored.append((s, menu))
+        scored.sort(key=lambda x: x[0], reverse=True)
+        return [m.pk for _, m in scored[:limit]]
+
+    def test_index_matches_scalar_ranking(self):
+        from .recommendation import get_recommendation_index
+
+        index = get_recommendation_index()
+        for fatigue in range(1, 6):
+            for mood in range(1, 6):
+                for concern in ['', '肩がつらい', '腰が痛い', '気分転換したい']:
+                    got = [m.pk for m in index.recommend(fatigue, mood, concern)]
+                    self.assertEqual(got, self._expected_top(fatigue, mood, concern))
+
+    def test_index_is_rebuilt_after_catalog_change(self):
+        from .models import ExerciseMenu
+        from .recommendation import get_recommendation_index
+
+        before = get_recommendation_index()
+        self.assertIs(before, get_recommendation_index())
+
+        self.menus[5].tags.add(self.tags['腰痛'])
+        after_m2m = get_recommendation_index()
+        self.assertIsNot(before, after_m2m)
+
+        ExerciseMenu.objects.create(name='追加メニュー', description='説明')
+        after_save = get_recommendation_index()
+        self.assertIsNot(after_m2m, after_save)
+        self.assertEqual(len(after_save), len(self.menus) + 1)
+
+    def test_scoring_does_not_read_catalog(self):
+        from .recommendation import get_recommendation_index
+        from .views import recommend_exercise_view
+
+        get_recommendation_index()  # warm up
+
+        factory = APIRequestFactory()
+        data = {'fatigue_level': 4, 'mood_level': 2, 'body_concern': '肩がつらい'}
+        req = factory.post('/api/recommend/', data, format='json')
+        req.user = self.user
+
+        # ConditionLog の INSERT と集計（日別集計・ダッシュボードの集計値）の更新のみ（運動メニュー・タグは読まない）
+        with CaptureQueriesContext(connection) as queries:
+            resp = recommend_exercise_view(req)
+        self.assertEqual(resp.status_code, 200)
+        tables = {
+            'condition_manager_conditionlog', 'condition_manager_dailyconditionsummary',
+            'management_metriccounter', 'management_dailymetric',
+        }
+        for query in queries.captured_queries:
+            sql = query['sql']
+            if not sql.startswith(('SAVEPOINT', 'RELEASE SAVEPOINT')):
+                self.assertTrue(any(table in sql for table in tables), sql)
+        self.assertEqual([m['id'] for m in resp.data], self._expected_top(4, 2, '肩がつらい'))
+
+
+class RecommendationCacheTest(TestCase):
+    def setUp(self):
+        from .models import Tag, ExerciseMenu
+
+        User = get_user_model()
+        self.user = User.objects.create_user(username='cacher', password='pass')
+        self.tag = Tag.objects.create(name='肩こり解消')
+        self.menu = ExerciseMenu.objects.create(name='肩回し', description='説明', target_area='肩')
+        self.menu.tags.add(self.tag)
+
+    def _post(self, data):
+        from .views import recommend_exercise_view
+
+        req = APIRequestFactory().post('/api/recommend/', data, format='json')
+        req.user = self.user
+        return recommend_exercise_view(req)
+
+    def test_repeated_input_is_served_from_cache(self):
+        from unittest import mock
+        from . import recommendation
+
+        data = {'fatigue_level': 3, 'mood_level': 3, 'body_concern': '肩がつらい'}
+        first = self._post(data)
+
+        # 前後の空白や大文字小文字が違っても同じキー
+        with mock.patch.object(recommendation, 'get_recommendation_index') as index:
+            second = self._post({**data, 'body_concern': '  肩がつらい '})
+            index.assert_not_called()
+        self.assertEqual(first.data, second.data)
+
+    def test_cache_is_invalidated_by_catalog_change(self):
+        from .models import ExerciseMenu
+
+        data = {'fatigue_level': 3, 'mood_level': 3, 'body_concern': '肩がつらい'}
+        self.assertEqual(len(self._post(data).data), 1)
+
+        other = ExerciseMenu.objects.create(name='肩甲骨ほぐし', description='説明')
+        other.tags.add(self.tag)
+        self.assertEqual(len(self._post(data).data), 2)
+
+        self.menu.delete()
+        self.assertEqual([m['id'] for m in self._post(data).data], [other.pk])
+
+    def test_cache_key_includes_limit(self):
+        from .models import ExerciseMenu
+        from .recommendation import get_recommendation_payload, get_recommendation_payloads
+
+        for i in range(5):
+            ExerciseMenu.objects.create(name=f'肩ほぐし{i}', description='説明', target_area='肩').tags.add(self.tag)
+        self.assertEqual(len(get_recommendation_payload(3, 3, '肩がつらい', limit=3)), 3)
+        self.assertEqual(len(get_recommendation_payload(3, 3, '肩がつらい', limit=5)), 5)
+        self.assertEqual(len(get_recommendation_payload(3, 3, '肩がつらい', limit=2)), 2)
+        self.assertEqual([len(p) for p in get_recommendation_payloads([(3, 3, '肩がつらい')], limit=4)], [4])
+
+    def test_rest_suggestion_is_cached(self):
+        from .models import ExerciseMenu
+        from unittest import mock
+        from . import recommendation
+
+        ExerciseMenu.objects.all().delete()
+        data = {'fatigue_level': 1, 'mood_level': 1, 'body_concern': ''}
+        self.assertTrue(self._post(data).data['rest_suggestion'])
+        with mock.patch.object(recommendation, 'get_recommendation_index') as index:
+            self.assertTrue(self._post(data).data['rest_suggestion'])
+            index.assert_not_called()
+
+
+class RecommendBatchTest(TestCase):
+    def setUp(self):
+        from .models import Tag, ExerciseMenu
+
+        User = get_user_model()
+        self.user = User.objects.create_user(username='batcher', password='pass')
+        shoulder = Tag.objects.create(name='肩こり解消')
+        relax = Tag.objects.create(name='リラックス')
+        for i in range(4):
+            menu = ExerciseMenu.objects.create(name=f'肩回し{i}', description='説明', target_area='肩')
+            menu.tags.add(shoulder, *([relax] if i % 2 else []))
+
+    def _post(self, view, data):
+        req = APIRequestFactory().post('/api/recommend/', data, format='json')
+        req.user = self.user
+        return view(req)
+
+    def test_results_match_single_endpoint(self):
+        from .models import ConditionLog
+        from .views import recommend_batch_view, recommend_exercise_view
+
+        entries = [
+            {'fatigue_level': 4, 'mood_level': 2, 'body_concern': '肩がつらい', 'log_date': '2026-01-03'},
+            {'fatigue_level': 1, 'mood_level': 5, 'body_concern': '', 'log_date': '2026-01-04'},
+            {'fatigue_level': 4, 'mood_level': 2, 'body_concern': ' 肩がつらい'},
+        ]
+        resp = self._post(recommend_batch_view, {'entries': entries})
+        self.assertEqual(resp.status_code, 200)
+        results = resp.data['results']
+        self.assertEqual(len(results), 3)
+
+        for entry, result in zip(entries, results):
+            single = self._post(recommend_exercise_view, entry).data
+            if isinstance(single, dict):
+                self.assertEqual(result, {'log_date': result['log_date'], **single})
+            else:
+                self.assertFalse(result['rest_suggestion'])
+                self.assertEqual(result['recommended_menus'], single)
+        self.assertEqual(results[0]['log_date'], '2026-01-03')
+
+        dates = {str(d) for d in ConditionLog.objects.values_list('log_date', flat=True)}
+        self.assertTrue({'2026-01-03', '2026-01-04'} <= dates)
+
+    def test_single_insert_and_single_scoring_pass(self):
+        from unittest import mock
+        from .models import ConditionLog
+        from .recommendation import RecommendationIndex, get_recommendation_index
+        from .views import recommend_batch_view
+
+        get_recommendation_index()  # warm up
+        entries = [
+            {'fatigue_level': f, 'mood_level': m, 'body_concern': '肩がつらい', 'log_date': '2026-01-10'}
+            for f in range(1, 6) for m in range(1, 6)
+        ]
+        with mock.patch.object(
+            RecommendationIndex, 'recommend_many', autospec=True, side_effect=RecommendationIndex.recommend_many,
+        ) as recommend_many, CaptureQueriesContext(connection) as queries:
+            resp = self._post(recommend_batch_view, {'entries': entries})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(recommend_many.call_count, 1)
+        self.assertEqual(ConditionLog.objects.filter(user=self.user).count(), 25)
+
+        inserts = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('INSERT INTO "condition_manager_conditionlog"')]
+        self.assertEqual(len(inserts), 1)
+        # 運動メニュー・タグは読まない
+        for query in queries.captured_queries:
+            self.assertNotIn('condition_manager_exercisemenu', query['sql'])
+            self.assertNotIn('condition_manager_tag', query['sql'])
+
+        # 同じ入力はキャッシュから返す
+        with mock.patch.object(RecommendationIndex, 'recommend_many') as recommend_many:
+            self._post(recommend_batch_view, {'entries': entries[:5]})
+            recommend_many.assert_not_called()
+
+    def test_summaries_are_updated(self):
+        from .models import DailyConditionSummary
+        from .views import recommend_batch_view
+
+        entries = [
+            {'fatigue_level': 2, 'mood_level': 3, 'body_concern': '肩こり', 'log_date': '2026-01-10'},
+            {'fatigue_level': 4, 'mood_level': 5, 'body_concern': '肩こり', 'log_date': '2026-01-10'},
+            {'fatigue_level': 1, 'mood_level': 1, 'log_date': '2026-01-11'},
+        ]
+        self._post(recommend_batch_view, {'entries': entries})
+        summary = DailyConditionSummary.objects.get(user=self.user, date='2026-01-10')
+        self.assertEqual((summary.log_count, summary.fatigue_total, summary.mood_total), (2, 6, 8))
+        self.assertEqual(summary.concern_counts, {'肩こり': 2})
+        self.assertEqual(DailyConditionSummary.objects.get(user=self.user, date='2026-01-11').log_count, 1)
+
+    def test_invalid_input_saves_nothing(self):
+        from django.test import override_settings
+        from .models import ConditionLog
+        from .views import recommend_batch_view
+
+        valid = {'fatigue_level': 3, 'mood_level': 3}
+        cases = [
+            ({}, None),
+            ({'entries': []}, None),
+            ({'entries': valid}, None),
+            ({'entries': [valid, 'x']}, 1),
+            ({'entries': [valid, {'fatigue_level': 6, 'mood_level': 3}]}, 1),
+            ({'entries': [{**valid, 'log_date': '2026/01/01'}]}, 0),
+            ({'entries': [valid, valid, {**valid, 'log_date': '2999-01-01'}]}, 2),
+        ]
+        for data, index in cases:
+            resp = self._post(recommend_batch_view, data)
+            self.assertEqual(resp.status_code, 400, data)
+            self.assertEqual(resp.data.get('index'), index, data)
+
+        with override_settings(RECOMMEND_BATCH_MAX_ENTRIES=2):
+            resp = self._post(recommend_batch_view, {'entries': [valid] * 3})
+        self.assertEqual(resp.status_code, 400)
+        self.assertFalse(ConditionLog.objects.exists())
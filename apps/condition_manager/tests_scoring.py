@@ -0,0 +1,211 @@
+import random
+import re
+
+from django.test import SimpleTestCase, TestCase
+
+
+def reference_score(menu, fatigue: int, mood: int, concern: str) -> int:
+    """
+    比較の基準にするスコア
+    ScoringEngine 導入前の views.calculate_score をそのまま写したもの（本体のコードとは共有しない）。
+    1) の悩みの照合だけは、タグ名の1文字目ではなくタグ名・対象部位のキーワード全体で照合する
+    規則（concern_matcher）に変わったので、その規則を素朴に書き直している
+    """
+    # ベース点（0件を減らすために少し入れる）
+    score = 5
+
+    tags_raw = [t.name for t in menu.tags.all() if t.name]
+    tags_lower = {t.lower().lstrip("#") for t in tags_raw}
+
+    concern = (concern or "").strip().lower()
+
+    def has_any(*names: str) -> bool:
+        names_lower = {n.lower() for n in names}
+        return any(n in tags_lower for n in names_lower)
+
+    # 1) 悩み（タグ名・対象部位のキーワードが悩みの文章に含まれるか）
+    keywords = {a for a in re.split(r"[、,，・/／\s]+", (menu.target_area or "").lower()) if a}
+    for tag in tags_lower:
+        if not tag:
+            continue
+        keywords.add(tag)
+        for suffix in ("解消", "改善", "軽減", "予防", "対策", "向け"):
+            if tag.endswith(suffix) and len(tag) > len(suffix):
+                keywords.add(tag[:-len(suffix)])
+    if concern and any(k in concern for k in keywords):
+        score += 60
+
+    # 2) 疲れレベル
+    if fatigue >= 4:
+        # 高疲労 → 軽め優遇、筋トレ/高強度は減点
+        if has_any("高疲労向け", "ストレッチ", "リラックス", "呼吸法", "軽め", "座ったまま"):
+            score += 30
+        if has_any("筋トレ", "高強度", "追い込み"):
+            score -= 25
+    elif fatigue <= 2:
+        # 低疲労 → 筋トレ/有酸素もOK
+        if has_any("筋トレ", "有酸素", "アクティブ"):
+            score += 20
+    else:
+        # 3 あたりは中間
+        if has_any("ストレッチ", "筋トレ"):
+            score += 10
+
+    # 3) 気分レベル
+    if mood <= 2:
+        # 気分低い → 気分転換/リフレッシュ系優遇
+        if has_any("リフレッシュ", "気分転換", "呼吸法", "瞑想", "リラックス"):
+            score += 25
+    elif mood >= 4:
+        # 気分高い → 達成感/筋トレも少し優遇
+        if has_any("達成感", "筋トレ", "有酸素"):
+            score += 10
+
+    # 4) 継続性（やりやすいメニューを少し上げる）
+    if has_any("初心者向け", "短時間", "座ったまま"):
+        score += 10
+
+    return max(score, 0)
+
+
+CONCERNS = [
+    '', '肩がつらい', '肩こりがひどい', '腰痛', '気分転換したい', '  #ストレス  ', 'ABC', '全身がだるい', '背中と首',
+]
+
+
+class ScoringEngineRuleTest(SimpleTestCase):
+    def test_engine_matches_rules_for_every_flag_combination(self):
+        from .scoring import FEATURE_COLUMNS, ScoringEngine, score_features
+
+        all_flags = list(range(1 << len(FEATURE_COLUMNS)))
+        terms = [frozenset([('tag', 1)]) if f % 2 else frozenset() for f in all_flags]
+        engine = ScoringEngine(all_flags, terms)
+
+        for fatigue in range(1, 6):
+            for mood in range(1, 6):
+                for matched in [set(), {('tag', 1)}, {('area', '肩')}]:
+                    got = engine.score(fatigue, mood, matched).tolist()
+                    expected = [
+                        score_features(f, bool(terms[i] & matched), fatigue, mood)
+                        for i, f in enumerate(all_flags)
+                    ]
+                    self.assertEqual(got, expected)
+
+    def test_empty_catalog(self):
+        from .scoring import ScoringEngine
+
+        engine = ScoringEngine([], [])
+        self.assertEqual(engine.top_k([(3, 3, {('area', '肩')})]), [[]])
+        self.assertEqual(engine.score_many([]).shape, (0, 0))
+
+
+class ScoringEngineEquivalenceTest(TestCase):
+    """ScoringEngine・calculate_score の結果が基準のスコア（reference_score）と一致することを確認する"""
+
+    def setUp(self):
+        from .models import Tag, ExerciseMenu
+        from .scoring import FEATURE_TAGS
+
+        rng = random.Random(15)
+        vocabulary = sorted({name for names in FEATURE_TAGS.values() for name in names})
+        vocabulary += ['肩こり解消', '腰痛改善', '#ストレス軽減', '全身', 'ABCトレーニング', '#']
+        tags = [Tag.objects.create(name=name) for name in vocabulary]
+
+        areas = ['', '肩', '腰', '肩、背中', '首・肩', '全身', 'abc']
+        for i in range(40):
+            menu = ExerciseMenu.objects.create(
+                name=f'メニュー{i}', description='説明', target_area=rng.choice(areas)
+            )
+            menu.tags.add(*rng.sample(tags, rng.randint(0, 4)))
+
+    def _scalar_scores(self, fatigue, mood, concern):
+        from .models import ExerciseMenu
+
+        menus = ExerciseMenu.objects.order_by('id').prefetch_related('tags')
+        return [reference_score(m, fatigue, mood, concern) for m in menus]
+
+    def _queries(self):
+        return [
+            (fatigue, mood, concern)
+            for fatigue in range(1, 6)
+            for mood in range(1, 6)
+            for concern in CONCERNS
+        ]
+
+    def test_scores_match_reference_score(self):
+        from .models import ExerciseMenu
+        from .recommendation import get_recommendation_index
+        from .views import calculate_score
+
+        index = get_recommendation_index()
+        menus = list(ExerciseMenu.objects.order_by('id').prefetch_related('tags'))
+        for fatigue, mood, concern in self._queries():
+            expected = self._scalar_scores(fatigue, mood, concern)
+            self.assertEqual(index.scores(fatigue, mood, concern), expected, msg=(fatigue, mood, concern))
+            self.assertEqual(
+                [calculate_score(m, fatigue, mood, concern) for m in menus], expected, msg=(fatigue, mood, concern)
+            )
+
+    def test_rankings_match_full_sort(self):
+        from .recommendation import get_recommendation_index
+
+        index = get_recommendation_index()
+        for fatigue, mood, concern in self._queries():
+            scored = [
+                (s, i) for i, s in enumerate(self._scalar_scores(fatigue, mood, concern)) if s > 0
+            ]
+            scored.sort(key=lambda x: x[0], reverse=True)
+            expected = [index.menus[i].pk for _, i in scored[:3]]
+
+            got = [m.pk for m in index.recommend(fatigue, mood, concern)]
+            self.assertEqual(got, expected, msg=(fatigue, mood, concern))
+
+    def test_batch_matches_single_requests(self):
+        from .recommendation import get_recommendation_index
+
+        index = get_recommendation_index()
+        queries = self._queries()
+
+        batch = index.engine.score_many([(f, m, index.match(c)) for f, m, c in queries])
+        for col, (fatigue, mood, concern) in enumerate(queries):
+            self.assertEqual(batch[:, col].tolist(), index.scores(fatigue, mood, concern))
+
+        self.assertEqual(
+            index.recommend_many(queries, limit=5),
+            [index.recommend(f, m, c, limit=5) for f, m, c in queries],
+        )
+
+
+class ConcernMatcherTest(SimpleTestCase):
+    def test_finds_all_keywords_in_one_pass(self):
+        from .concern_matcher import ConcernMatcher
+
+        matcher = ConcernMatcher({
+            '肩': {'area:肩'},
+            '肩こり': {'tag:1'},
+            'こり': {'tag:2'},
+            '腰痛': {'tag:3'},
+            'he': {'x:he'},
+            'she': {'x:she'},
+            'hers': {'x:hers'},
+        })
+        self.assertEqual(matcher.match('肩こりがつらい'), {'area:肩', 'tag:1', 'tag:2'})
+        self.assertEqual(matcher.match('腰が痛い'), frozenset())
+        self.assertEqual(matcher.match('USHERS'), {'x:he', 'x:she', 'x:hers'})
+        self.assertEqual(matcher.match(''), frozenset())
+
+    def test_keywords_from_tags_and_areas(self):
+        from .concern_matcher import area_keywords, tag_keywords
+
+        self.assertEqual(tag_keywords('#肩こり解消'), {'肩こり解消', '肩こり'})
+        self.assertEqual(tag_keywords('解消'), {'解消'})
+        self.assertEqual(tag_keywords('#'), set())
+        self.assertEqual(area_keywords('肩、背中・首 / 腰'), {'肩', '背中', '首', '腰'})
+        self.assertEqual(area_keywords(''), set())
+
+    def test_first_character_no_longer_over_matches(self):
+        from .concern_matcher import menu_keywords
+
+        # 以前は「肩」で始まるタグが「肩」を含むすべての悩みに一致していた
+        keywords = menu_keywords(['肩甲骨はがし'], '背中')
+        self.assertFalse(any(k in '肩がつらい' for k in keywords))
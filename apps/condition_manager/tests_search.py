@@ -0,0 +1,92 @@
+from django.test import SimpleTestCase, TestCase
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+
+class TokenizerTest(SimpleTestCase):
+    def test_japanese_text_is_split_into_ngrams(self):
+        from .search import document_tokens, query_tokens
+
+        self.assertEqual(document_tokens('肩こり'), ['肩', 'こ', 'り', '肩こ', 'こり'])
+        self.assertEqual(document_tokens('Yoga で肩'), ['yoga', 'で', '肩', 'で肩'])
+        # 全角英数字は半角に揃える
+        self.assertEqual(document_tokens('ＡＢＣ'), ['abc'])
+        self.assertEqual(query_tokens('肩こり'), [('肩こ', False), ('こり', False)])
+        self.assertEqual(query_tokens('肩 yog'), [('肩', False), ('yog', True)])
+        self.assertEqual(query_tokens('!!'), [])
+
+    def test_postgres_query_matches_fts5_query(self):
+        from .search import POSTGRES_INSERT_SQL, _match_expression, _tsquery_expression
+
+        self.assertEqual(_match_expression('肩こり yog'), '"肩こ" AND "こり" AND "yog"*')
+        self.assertEqual(_tsquery_expression('肩こり yog'), "'肩こ' & 'こり' & 'yog':*")
+        self.assertEqual(_tsquery_expression('!!'), '')
+        # name, description, target_area, tags の順に重みを付ける
+        self.assertEqual(POSTGRES_INSERT_SQL.count('%s'), 5)
+        self.assertIn("setweight(to_tsvector('simple', %s), 'A')", POSTGRES_INSERT_SQL)
+
+
+class ExerciseSearchTest(TestCase):
+    def setUp(self):
+        from .models import Tag, ExerciseMenu
+
+        User = get_user_model()
+        self.user = User.objects.create_user(username='searcher', password='pass')
+        self.tag = Tag.objects.create(name='リラックス')
+        self.by_name = ExerciseMenu.objects.create(
+            name='肩甲骨ストレッチ', description='背中をほぐす', target_area='背中'
+        )
+        self.by_description = ExerciseMenu.objects.create(
+            name='タオル体操', description='肩甲骨を寄せる体操', target_area='肩'
+        )
+        self.by_tag = ExerciseMenu.objects.create(name='深呼吸', description='ゆっくり呼吸する')
+        self.by_tag.tags.add(self.tag)
+        self.other = ExerciseMenu.objects.create(name='スクワット', description='Leg training', target_area='脚')
+
+    def _ids(self, keyword):
+        from .search import search_menu_ids
+
+        return search_menu_ids(keyword)
+
+    def test_ranks_name_matches_first(self):
+        self.assertEqual(self._ids('肩甲骨'), [self.by_name.pk, self.by_description.pk])
+        self.assertEqual(self._ids('肩'), [self.by_name.pk, self.by_description.pk])
+        self.assertEqual(self._ids('リラックス'), [self.by_tag.pk])
+        self.assertEqual(self._ids('train'), [self.other.pk])
+        self.assertEqual(self._ids('存在しない'), [])
+
+    def test_index_follows_catalog_changes(self):
+        self.other.name = '肩甲骨スクワット'
+        self.other.save()
+        self.assertIn(self.other.pk, self._ids('肩甲骨'))
+
+        self.tag.name = '瞑想'
+        self.tag.save()
+        self.assertEqual(self._ids('リラックス'), [])
+        self.assertEqual(self._ids('瞑想'), [self.by_tag.pk])
+
+        self.by_tag.tags.remove(self.tag)
+        self.assertEqual(self._ids('瞑想'), [])
+        self.tag.exercisemenu_set.add(self.other)
+        self.assertEqual(self._ids('瞑想'), [self.other.pk])
+        self.tag.exercisemenu_set.clear()
+        self.assertEqual(self._ids('瞑想'), [])
+
+        self.other.tags.add(self.tag)
+        self.tag.delete()
+        self.assertEqual(self._ids('瞑想'), [])
+
+        self.by_name.delete()
+        self.assertNotIn(self.by_name.pk, self._ids('肩甲骨'))
+
+    def test_exercise_list_view_uses_search_order(self):
+        from .views import exercise_list_view
+
+        req = APIRequestFactory().get('/api/exercises/', {'q': '肩'})
+        force_authenticate(req, user=self.user)
+        resp = exercise_list_view(req)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data['count'], 2)
+        self.assertEqual(
+            [m['id'] for m in resp.data['results']], [self.by_name.pk, self.by_description.pk]
+        )
@@ -0,0 +1,175 @@
+from datetime import date
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+
+class DailyConditionSummaryTest(TestCase):
+    def setUp(self):
+        from apps.management.metrics import flush_metrics
+
+        # コミット時のコールバックで溜まったダッシュボードの集計値はテスト用DBがあるうちに反映する
+        self.addCleanup(flush_metrics)
+        User = get_user_model()
+        self.user = User.objects.create_user(username='summarized', password='pass')
+        self.other = User.objects.create_user(username='other', password='pass')
+
+    def _log(self, day, fatigue, mood, concern='', user=None):
+        from .models import ConditionLog
+
+        return ConditionLog.objects.create(
+            user=user or self.user, log_date=day, fatigue_level=fatigue, mood_level=mood, body_concern=concern,
+        )
+
+    def _summary(self, day, user=None):
+        from .models import DailyConditionSummary
+
+        return DailyConditionSummary.objects.get(user=user or self.user, date=day)
+
+    def test_logs_are_added_incrementally(self):
+        day = date(2026, 2, 1)
+        self._log(day, 4, 2, '肩こり')
+        self._log(day, 2, 4, ' 肩こり ')
+        self._log(day, 3, 3, '腰痛')
+        self._log(day, 5, 1, user=self.other)
+
+        summary = self._summary(day)
+        self.assertEqual(summary.log_count, 3)
+        self.assertEqual(summary.avg_fatigue, 3)
+        self.assertEqual(summary.avg_mood, 3)
+        self.assertEqual(summary.concern_counts, {'肩こり': 2, '腰痛': 1})
+        self.assertEqual(self._summary(day, self.other).log_count, 1)
+
+    def test_default_log_date_is_today(self):
+        from django.utils import timezone
+        from .models import ConditionLog
+
+        ConditionLog.objects.create(user=self.user, fatigue_level=3, mood_level=3)
+        self.assertEqual(self._summary(timezone.localdate()).log_count, 1)
+
+    def test_update_and_delete_recount_the_day(self):
+        first, second = date(2026, 2, 1), date(2026, 2, 2)
+        log = self._log(first, 4, 2, '肩こり')
+        self._log(first, 2, 2)
+
+        log.fatigue_level = 2
+        log.save()
+        self.assertEqual(self._summary(first).fatigue_total, 4)
+
+        # 日付を変えると両方の日を数え直す
+        log.log_date = second
+        log.save()
+        self.assertEqual(self._summary(first).log_count, 1)
+        self.assertEqual(self._summary(second).concern_counts, {'肩こり': 1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            log.delete()
+        from .models import DailyConditionSummary
+        self.assertFalse(DailyConditionSummary.objects.filter(user=self.user, date=second).exists())
+
+    def test_bulk_delete_recounts_each_day_once(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from .models import ConditionLog
+
+        days = [date(2026, 2, d) for d in range(1, 6)]
+        for day in days:
+            for fatigue in range(1, 5):
+                self._log(day, fatigue, 3)
+        self._log(days[0], 5, 5, user=self.other)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            ConditionLog.objects.filter(user=self.user, fatigue_level__lte=2).delete()
+        with CaptureQueriesContext(connection) as queries:
+            for callback in callbacks:
+                callback()
+        # ユーザーごとに 集計の削除 + 体調ログの集計 + 集計の作成（件数・日数に比例しない）
+        statements = [q['sql'] for q in queries.captured_queries if 'SAVEPOINT' not in q['sql']]
+        self.assertEqual(len(statements), 3, statements)
+        for day in days:
+            self.assertEqual((self._summary(day).log_count, self._summary(day).fatigue_total), (2, 7))
+        self.assertEqual(self._summary(days[0], self.other).log_count, 1)
+
+    def test_buffered_logs_update_summary(self):
+        from .log_buffer import ConditionLogBuffer
+        from .models import ConditionLog
+
+        buffer = ConditionLogBuffer(max_size=10, autostart=False)
+        for fatigue in (1, 2, 3):
+            buffer.add(ConditionLog(user=self.user, log_date=date(2026, 2, 1), fatigue_level=fatigue, mood_level=5))
+        self.assertEqual(buffer.flush(), 3)
+
+        summary = self._summary(date(2026, 2, 1))
+        self.assertEqual((summary.log_count, summary.fatigue_total, summary.mood_total), (3, 6, 15))
+
+    def test_rebuild_command_matches_incremental(self):
+        from .models import DailyConditionSummary
+
+        for i in range(10):
+            self._log(date(2026, 2, 1 + i % 3), i % 5 + 1, 5 - i % 5, ['肩こり', '腰痛', ''][i % 3])
+        fields = ('user_id', 'date', 'log_count', 'fatigue_total', 'mood_total', 'concern_counts')
+        expected = list(DailyConditionSummary.objects.order_by('date').values_list(*fields))
+
+        DailyConditionSummary.objects.all().delete()
+        out = StringIO()
+        call_command('rebuild_condition_summaries', stdout=out)
+        self.assertIn('3 件', out.getvalue())
+        self.assertEqual(list(DailyConditionSummary.objects.order_by('date').values_list(*fields)), expected)
+
+
+class ConditionTrendsViewTest(TestCase):
+    def setUp(self):
+        from .models import ConditionLog
+
+        User = get_user_model()
+        self.user = User.objects.create_user(username='trender', password='pass')
+        # 2026-02-02 は月曜日
+        for day, fatigue, mood, concern in [
+            (date(2026, 2, 2), 4, 2, '肩こり'), (date(2026, 2, 2), 2, 4, '肩こり'),
+            (date(2026, 2, 4), 3, 3, '腰痛'), (date(2026, 2, 9), 5, 1, '頭痛'),
+            (date(2026, 1, 1), 1, 5, ''),
+        ]:
+            ConditionLog.objects.create(
+                user=self.user, log_date=day, fatigue_level=fatigue, mood_level=mood, body_concern=concern,
+            )
+
+    def _get(self, params):
+        from .views import condition_trends_view
+
+        req = APIRequestFactory().get('/api/trends/', params)
+        force_authenticate(req, user=self.user)
+        return condition_trends_view(req)
+
+    def test_daily_trend(self):
+        resp = self._get({'start': '2026-02-01', 'end': '2026-02-28'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data['period'], 'day')
+        self.assertEqual([row['date'] for row in resp.data['results']], ['2026-02-02', '2026-02-04', '2026-02-09'])
+        self.assertEqual(resp.data['results'][0], {
+            'date': '2026-02-02', 'log_count': 2, 'avg_fatigue': 3.0, 'avg_mood': 3.0,
+            'top_concerns': [{'concern': '肩こり', 'count': 2}],
+        })
+
+    def test_weekly_trend(self):
+        resp = self._get({'start': '2026-02-01', 'end': '2026-02-28', 'period': 'week'})
+        self.assertEqual([row['date'] for row in resp.data['results']], ['2026-02-02', '2026-02-09'])
+        week = resp.data['results'][0]
+        self.assertEqual(week['log_count'], 3)
+        self.assertEqual(week['avg_fatigue'], 3.0)
+        self.assertEqual(week['top_concerns'], [{'concern': '肩こり', 'count': 2}, {'concern': '腰痛', 'count': 1}])
+
+    def test_reads_only_summaries(self):
+        from .models import ConditionLog
+
+        for _ in range(20):
+            ConditionLog.objects.create(user=self.user, log_date=date(2026, 2, 3), fatigue_level=3, mood_level=3)
+        with self.assertNumQueries(1):
+            resp = self._get({'start': '2026-01-01', 'end': '2026-12-31'})
+        self.assertEqual(len(resp.data['results']), 5)
+
+    def test_invalid_params(self):
+        for params in [{'period': 'month'}, {'start': '2026/02/01'}, {'start': '2026-03-01', 'end': '2026-02-01'}]:
+            self.assertEqual(self._get(params).status_code, 400, params)
@@ -0,0 +1,187 @@
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+
+class ParseTagQueryTest(SimpleTestCase):
+    def test_parse(self):
+        from .tag_filter import parse_tag_query
+
+        self.assertEqual(
+            parse_tag_query(' 肩 , 首|腰 ,-筋トレ, ,|'),
+            [[(False, '肩')], [(False, '首'), (False, '腰')], [(True, '筋トレ')]],
+        )
+        self.assertEqual(parse_tag_query(''), [])
+        self.assertEqual(parse_tag_query('-'), [])
+
+    def test_parse_tag_list_keeps_names(self):
+        from .tag_filter import parse_tag_list
+
+        self.assertEqual(
+            parse_tag_list(' 上半身|下半身 ,-10kg, ,'),
+            [[(False, '上半身|下半身')], [(False, '-10kg')]],
+        )
+
+
+class TagFilterIndexTest(TestCase):
+    def setUp(self):
+        from .models import ExerciseMenu, Tag
+
+        shoulder = Tag.objects.create(name='肩こり解消')
+        neck = Tag.objects.create(name='首')
+        strength = Tag.objects.create(name='筋トレ')
+        Tag.objects.create(name='未使用')
+        self.menus = {}
+        for name, tags in [
+            ('A', [shoulder]), ('B', [shoulder, neck]), ('C', [neck, strength]),
+            ('D', [strength]), ('E', []),
+        ]:
+            menu = ExerciseMenu.objects.create(name=name, description='説明')
+            menu.tags.add(*tags)
+            self.menus[name] = menu.pk
+
+    def _names(self, ids):
+        names = {pk: name for name, pk in self.menus.items()}
+        return [names[pk] for pk in ids]
+
+    def _filter(self, text):
+        from .tag_filter import get_tag_filter_index, parse_tag_query
+
+        index = get_tag_filter_index()
+        return self._names(index.ids(index.filter_bits(parse_tag_query(text))))
+
+    def test_and_or_not(self):
+        self.assertEqual(self._filter('肩'), ['A', 'B'])  # 部分一致
+        self.assertEqual(self._filter('肩,首'), ['B'])
+        self.assertEqual(self._filter('肩|筋'), ['A', 'B', 'C', 'D'])
+        self.assertEqual(self._filter('-筋トレ'), ['A', 'B', 'E'])
+        self.assertEqual(self._filter('首,-筋トレ'), ['B'])
+        self.assertEqual(self._filter('-肩|筋'), ['C', 'D', 'E'])
+        self.assertEqual(self._filter('未使用'), [])
+        self.assertEqual(self._filter('存在しない'), [])
+
+    def test_matches_orm_for_and(self):
+        from .models import ExerciseMenu
+
+        for tags in [['肩'], ['首', '筋'], ['こり', '首']]:
+            qs = ExerciseMenu.objects.all()
+            for name in tags:
+                qs = qs.filter(tags__name__icontains=name)
+            expected = sorted(qs.distinct().values_list('pk', flat=True))
+            self.assertEqual(self._filter(','.join(tags)), self._names(expected))
+
+    def test_tags_with_operator_characters(self):
+        from .models import ExerciseMenu, Tag
+        from .views import exercise_list_view
+
+        user = get_user_model().objects.create_user(username='tagger', password='pass')
+        either = Tag.objects.create(name='首|肩')
+        minus = Tag.objects.create(name='-5kg')
+        ExerciseMenu.objects.create(name='F', description='説明').tags.add(either)
+        ExerciseMenu.objects.create(name='G', description='説明').tags.add(either, minus)
+
+        def names(params):
+            req = APIRequestFactory().get('/api/exercises/', params)
+            force_authenticate(req, user=user)
+            return [m['name'] for m in exercise_list_view(req).data['results']]
+
+        # tags はタグ名をそのまま使う
+        self.assertEqual(names({'tags': '首|肩'}), ['F', 'G'])
+        self.assertEqual(names({'tags': '-5kg'}), ['G'])
+        # tag_query は式として解釈する。併用した場合は AND
+        self.assertEqual(names({'tag_query': '首|肩'}), ['A', 'B', 'C', 'F', 'G'])
+        self.assertEqual(names({'tags': '首|肩', 'tag_query': '-5kg'}), ['F'])
+
+    def test_select_keeps_order(self):
+        from .tag_filter import get_tag_filter_index, parse_tag_query
+
+        index = get_tag_filter_index()
+        bits = index.filter_bits(parse_tag_query('首'))
+        order = [self.menus[n] for n in ['C', 'A', 'B', 'E']] + [99999]
+        self.assertEqual(self._names(index.select(order, bits)), ['C', 'B'])
+
+    def test_rebuilt_when_catalog_changes(self):
+        from .models import ExerciseMenu, Tag
+
+        self.assertEqual(self._filter('首'), ['B', 'C'])
+        menu = ExerciseMenu.objects.create(name='F', description='説明')
+        menu.tags.add(Tag.objects.get(name='首'))
+        self.menus['F'] = menu.pk
+        self.assertEqual(self._filter('首'), ['B', 'C', 'F'])
+
+        Tag.objects.filter(name='首').update(name='くび')  # シグナルが出ない更新
+        Tag.objects.get(name='くび').save()
+        self.assertEqual(self._filter('くび'), ['B', 'C', 'F'])
+
+    def test_list_view_uses_index(self):
+        from .tag_filter import get_tag_filter_index
+        from .views import exercise_list_view
+
+        user = get_user_model().objects.create_user(username='tagger', password='pass')
+        get_tag_filter_index()
+
+        req = APIRequestFactory().get('/api/exercises/', {'tag_query': '首|肩,-筋トレ'})
+        force_authenticate(req, user=user)
+        # ページ分のメニュー + タグ（COUNT や M2M の JOIN は発行しない）
+        with self.assertNumQueries(2):
+            resp = exercise_list_view(req)
+        self.assertEqual([m['name'] for m in resp.data['results']], ['A', 'B'])
+        self.assertEqual(resp.data['count'], 2)
+
+
+class FacetTest(TestCase):
+    def setUp(self):
+        from .models import ExerciseMenu, Tag
+
+        self.user = get_user_model().objects.create_user(username='faceter', password='pass')
+        shoulder = Tag.objects.create(name='肩こり解消')
+        light = Tag.objects.create(name='軽め')
+        for i in range(9):
+            menu = ExerciseMenu.objects.create(
+                name=f'体操{i}', description='説明',
+                category='stretch' if i % 3 else 'cardio',
+                target_area='肩' if i < 4 else ('' if i == 8 else '全身'),
+            )
+            menu.tags.add(shoulder, *([light] if i % 2 else []))
+
+    def _get(self, params):
+        from .views import exercise_list_view
+
+        req = APIRequestFactory().get('/api/exercises/', params)
+        force_authenticate(req, user=self.user)
+        return exercise_list_view(req)
+
+    def test_facets_match_orm_counts(self):
+        from django.db.models import Count
+        from .models import ExerciseMenu
+
+        facets = self._get({'facets': '1', 'tags': '軽め'}).data['facets']
+        menus = ExerciseMenu.objects.filter(tags__name='軽め')
+
+        tag_counts = (
+            ExerciseMenu.tags.through.objects.filter(exercisemenu__in=menus)
+            .values_list('tag__name').annotate(n=Count('id'))
+        )
+        self.assertEqual({f['name']: f['count'] for f in facets['tags']}, dict(tag_counts))
+        category_counts = menus.values_list('category').annotate(n=Count('id'))
+        self.assertEqual({f['value']: f['count'] for f in facets['category']}, dict(category_counts))
+        self.assertEqual(facets['category'][0]['label'], 'ストレッチ')
+        self.assertEqual(facets['target_area'], [{'value': '全身', 'count': 2}, {'value': '肩', 'count': 2}])
+
+    def test_facets_cover_whole_result_and_are_cached(self):
+        resp = self._get({'facets': 'true', 'q': '体操'})
+        self.assertEqual(len(resp.data['results']), 6)
+        self.assertEqual(resp.data['facets']['tags'][0], {'name': '肩こり解消', 'count': 9})
+        self.assertNotIn('facets', self._get({'q': '体操'}).data)
+
+        # 2ページ目は件数をキャッシュから返す（全文検索 + ページ分のメニュー + タグ）
+        with self.assertNumQueries(3):
+            resp = self._get({'facets': '1', 'q': '体操', 'page': 2})
+        self.assertEqual(resp.data['facets']['tags'][0]['count'], 9)
+
+    def test_facets_invalidated_on_catalog_change(self):
+        from .models import ExerciseMenu
+
+        self.assertEqual(self._get({'facets': '1'}).data['facets']['category'][0]['count'], 6)
+        ExerciseMenu.objects.create(name='追加', description='説明', category='stretch')
+        self.assertEqual(self._get({'facets': '1'}).data['facets']['category'][0]['count'], 7)
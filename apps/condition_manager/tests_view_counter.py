@@ -0,0 +1,161 @@
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError
+from django.test import TestCase, TransactionTestCase
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+
+class ViewCountBufferTest(TestCase):
+    def setUp(self):
+        from .models import ExerciseMenu, Routine
+
+        User = get_user_model()
+        self.user = User.objects.create_user(username='viewer', password='pass')
+        self.other = User.objects.create_user(username='other', password='pass')
+        self.menus = [ExerciseMenu.objects.create(name=f'メニュー{i}', description='説明') for i in range(3)]
+        for menu in self.menus:
+            Routine.objects.create(user=self.user, exercise=menu)
+        Routine.objects.create(user=self.other, exercise=self.menus[0])
+
+    def _counts(self, user):
+        from .models import Routine
+
+        return dict(Routine.objects.filter(user=user).values_list('exercise_id', 'view_count'))
+
+    def test_flush_applies_aggregated_deltas(self):
+        from .view_counter import ViewCountBuffer
+
+        buffer = ViewCountBuffer(max_size=100, interval=60)
+        for _ in range(3):
+            buffer.add(self.user.pk, self.menus[0].pk)
+        buffer.add(self.user.pk, self.menus[1].pk)
+        buffer.add(self.other.pk, self.menus[0].pk)
+        buffer.add(self.other.pk, self.menus[2].pk)  # ルーティンに無いメニューは無視される
+        self.assertEqual(buffer.pending_for(self.user.pk), {self.menus[0].pk: 3, self.menus[1].pk: 1})
+
+        # 増分（1 と 3）ごとに UPDATE 1回
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(buffer.flush(), 3)
+        self.assertEqual(len([q for q in queries.captured_queries if q['sql'].startswith('UPDATE')]), 2)
+        self.assertEqual(self._counts(self.user), {self.menus[0].pk: 3, self.menus[1].pk: 1, self.menus[2].pk: 0})
+        self.assertEqual(self._counts(self.other), {self.menus[0].pk: 1})
+        self.assertEqual(len(buffer), 0)
+
+    def test_thresholds(self):
+        from .view_counter import ViewCountBuffer
+
+        buffer = ViewCountBuffer(max_size=2, interval=60)
+        self.assertFalse(buffer.add(self.user.pk, self.menus[0].pk))
+        self.assertTrue(buffer.add(self.user.pk, self.menus[1].pk))
+        self.assertTrue(ViewCountBuffer(max_size=100, interval=0).add(self.user.pk, self.menus[0].pk))
+
+    def test_failed_flush_keeps_deltas(self):
+        from .view_counter import ViewCountBuffer
+
+        buffer = ViewCountBuffer()
+        buffer.add(self.user.pk, self.menus[0].pk)
+        with mock.patch('django.db.models.query.QuerySet.update', side_effect=DatabaseError), \
+                self.assertLogs('apps.condition_manager.view_counter', level='ERROR'):
+            self.assertEqual(buffer.flush(), 0)
+        self.assertEqual(buffer.pending_for(self.user.pk), {self.menus[0].pk: 1})
+        buffer.flush()
+        self.assertEqual(self._counts(self.user)[self.menus[0].pk], 1)
+
+    def test_partially_applied_flush_is_not_counted_twice(self):
+        from django.db.models.query import QuerySet
+        from .view_counter import ViewCountBuffer
+
+        buffer = ViewCountBuffer()
+        buffer.add(self.user.pk, self.menus[0].pk)
+        buffer.add(self.user.pk, self.menus[1].pk, count=2)
+        update = QuerySet.update
+        calls = []
+
+        def fail_second_update(queryset, **kwargs):
+            # 1つ目の増分の UPDATE は成功し、2つ目で失敗する
+            calls.append(1)
+            if len(calls) == 2:
+                raise DatabaseError
+            return update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, 'update', autospec=True, side_effect=fail_second_update), \
+                self.assertLogs('apps.condition_manager.view_counter', level='ERROR'):
+            self.assertEqual(buffer.flush(), 0)
+        self.assertEqual(self._counts(self.user)[self.menus[0].pk], 0)
+        buffer.flush()
+        self.assertEqual(self._counts(self.user), {self.menus[0].pk: 1, self.menus[1].pk: 2, self.menus[2].pk: 0})
+
+    def test_detail_views_are_counted_and_merged_into_routine_list(self):
+        from . import view_counter
+        from .views import exercise_detail_view, routine_list_view
+
+        buffer = view_counter.ViewCountBuffer(max_size=100, interval=60)
+
+        def get(view, path, **kwargs):
+            req = APIRequestFactory().get(path)
+            force_authenticate(req, user=self.user)
+            return view(req, **kwargs)
+
+        with mock.patch.object(view_counter, 'get_view_counter', return_value=buffer):
+            with self.captureOnCommitCallbacks(execute=True):
+                for _ in range(2):
+                    get(exercise_detail_view, '/api/exercises/', pk=self.menus[2].pk)
+                get(exercise_detail_view, '/api/exercises/', pk=self.menus[1].pk)
+
+            # 閲覧のたびには書き込まない
+            self.assertEqual(set(self._counts(self.user).values()), {0})
+
+            resp = get(routine_list_view, '/api/routines/')
+            self.assertEqual(
+                [(row['exercise']['id'], row['view_count']) for row in resp.data['results']],
+                [(self.menus[2].pk, 2), (self.menus[1].pk, 1), (self.menus[0].pk, 0)],
+            )
+
+            buffer.flush()
+            resp = get(routine_list_view, '/api/routines/')
+            self.assertEqual([row['view_count'] for row in resp.data['results']], [2, 1, 0])
+
+    def test_merge_brings_in_routines_beyond_the_limit(self):
+        from .models import Routine
+        from .view_counter import ViewCountBuffer, merge_pending_views
+
+        buffer = ViewCountBuffer()
+        buffer.add(self.user.pk, self.menus[0].pk, count=5)
+        routines = Routine.objects.filter(user=self.user).select_related('exercise').order_by(
+            '-view_count', '-added_at', '-id'
+        )
+        with mock.patch('apps.condition_manager.view_counter.get_view_counter', return_value=buffer):
+            merged = merge_pending_views(routines[:1], routines, self.user.pk, 1)
+        self.assertEqual([(r.exercise_id, r.view_count) for r in merged], [(self.menus[0].pk, 5)])
+
+
+class ViewCountBufferThreadTest(TransactionTestCase):
+    def setUp(self):
+        from apps.management.metrics import flush_metrics
+
+        # コミットされた分のダッシュボードの集計値はテスト用DBがあるうちに反映する
+        self.addCleanup(flush_metrics)
+
+    def test_background_thread_flushes_on_interval(self):
+        from .models import ExerciseMenu, Routine
+        from .view_counter import ViewCountBuffer
+
+        user = get_user_model().objects.create_user(username='threaded', password='pass')
+        routine = Routine.objects.create(user=user, exercise=ExerciseMenu.objects.create(name='肩回し'))
+        buffer = ViewCountBuffer(max_size=100, interval=0.05, autostart=True)
+        buffer.add(user.pk, routine.exercise_id)
+
+        # 閲覧が続かなくても間隔ごとに反映される
+        deadline = time.monotonic() + 5
+        while Routine.objects.get().view_count == 0 and time.monotonic() < deadline:
+            time.sleep(0.02)
+        self.assertEqual(Routine.objects.get().view_count, 1)
+
+        buffer.add(user.pk, routine.exercise_id)
+        buffer.close()
+        self.assertEqual(Routine.objects.get().view_count, 2)
@@ -69,3 +69,75 @@ class ConditionManagerViewsTest(TestCase):
         # should return a list of recommended menus
         self.assertIsInstance(resp.data, list)
         self.assertTrue(len(resp.data) >= 1)
+
+
+class RoutineBulkViewTest(TestCase):
+    def setUp(self):
+        from .models import ExerciseMenu, Routine
+
+        User = get_user_model()
+        self.user = User.objects.create_user(username='bulker', password='pass')
+        self.other = User.objects.create_user(username='other', password='pass')
+        self.menus = [ExerciseMenu.objects.create(name=f'メニュー{i}', description='説明') for i in range(8)]
+        Routine.objects.create(user=self.user, exercise=self.menus[0])
+        Routine.objects.create(user=self.user, exercise=self.menus[1])
+        Routine.objects.create(user=self.other, exercise=self.menus[2])
+
+    def _post(self, data, path='/api/routines/bulk/'):
+        from .views import routine_bulk_view
+
+        req = APIRequestFactory().post(path, data, format='json')
+        req.user = self.user
+        return routine_bulk_view(req)
+
+    def _exercise_ids(self, user):
+        from .models import Routine
+
+        return set(Routine.objects.filter(user=user).values_list('exercise_id', flat=True))
+
+    def test_add_and_remove(self):
+        m = [menu.pk for menu in self.menus]
+        # 登録済み（m[0]）の追加と未登録（m[3]）の削除は無視される
+        resp = self._post({'add': [m[0], m[2], m[4], m[2]], 'remove': [m[1], m[3]]})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data['removed'], 1)
+        self.assertEqual(resp.data['count'], 3)
+        self.assertEqual(
+            {routine['exercise']['id'] for routine in resp.data['results']}, {m[0], m[2], m[4]}
+        )
+        self.assertEqual(self._exercise_ids(self.user), {m[0], m[2], m[4]})
+        # 他のユーザーのルーティンは変わらない
+        self.assertEqual(self._exercise_ids(self.other), {m[2]})
+
+        # ページ指定
+        resp = self._post({'add': m[5:]}, path='/api/routines/bulk/?page=2')
+        self.assertEqual((resp.data['count'], resp.data['current_page']), (6, 1))
+        self.assertEqual(self._post({'add': m[5:]}).data['removed'], 0)
+
+    def test_single_statement_writes(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        m = [menu.pk for menu in self.menus]
+        with CaptureQueriesContext(connection) as queries:
+            resp = self._post({'add': m[2:], 'remove': [m[0]]})
+        self.assertEqual(resp.status_code, 200)
+        statements = [q['sql'].split()[0] for q in queries.captured_queries if 'SAVEPOINT' not in q['sql']]
+        # 存在の確認 + INSERT + DELETE + 更新後のルーティン一覧 + タグ
+        self.assertEqual(statements.count('INSERT'), 1)
+        self.assertEqual(statements.count('DELETE'), 1)
+        self.assertLessEqual(len(statements), 5)
+
+    def test_invalid_input_changes_nothing(self):
+        from django.test import override_settings
+
+        m = [menu.pk for menu in self.menus]
+        for data in [{}, {'add': []}, {'add': m[0]}, {'add': ['1']}, {'add': [True]}, {'add': [m[2]], 'remove': [m[2]]}]:
+            self.assertEqual(self._post(data).status_code, 400, data)
+        with override_settings(ROUTINE_BULK_MAX_IDS=3):
+            self.assertEqual(self._post({'add': m[2:4], 'remove': m[:2]}).status_code, 400)
+
+        resp = self._post({'add': [m[3], 99999], 'remove': [m[0], 99998]})
+        self.assertEqual(resp.status_code, 404)
+        self.assertEqual(resp.data['missing'], [99999, 99998])
+        self.assertEqual(self._exercise_ids(self.user), {m[0], m[1]})
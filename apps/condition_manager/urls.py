@@ -6,12 +6,21 @@ urlpatterns = [
     # 体調ログ保存＆メニュー提案API
     path('recommend/', views.recommend_exercise_view, name='recommend_exercise'),
 
+    # 体調ログのまとめて保存＆メニュー提案API（オフライン中に溜まった入力の送信用）
+    path('recommend/batch/', views.recommend_batch_view, name='recommend_batch'),
+
     # ルーティン管理API (追加/削除)
     path('routines/<int:exercise_id>/', views.routine_manage_view, name='manage_routine'),
 
+    # ルーティンのまとめて追加/削除API
+    path('routines/bulk/', views.routine_bulk_view, name='bulk_routine'),
+
     # 履歴取得API
     path('history/', views.history_list_view, name='history_list'),
 
+    # 体調の推移API（日別集計）
+    path('trends/', views.condition_trends_view, name='condition_trends'),
+
     # ルーティン一覧取得API
     path('routines/', views.routine_list_view, name='routine_list'),
     
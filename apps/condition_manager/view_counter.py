@@ -0,0 +1,211 @@
+"""
+ルーティンの閲覧数（Routine.view_count）のカウント
+
+運動メニューの詳細APIが呼ばれるたびに Routine を保存すると、読み込みのたびに書き込みが発生し、
+人気のメニューでは同じ行のロック待ちも起きる。そこで閲覧は (ユーザーID, メニューID) ごとの件数として
+プロセス内に溜めておき、増分ごとにまとめた UPDATE（view_count = view_count + 増分）で反映する。
+反映はバックグラウンドのスレッドが ROUTINE_VIEW_FLUSH_INTERVAL 秒ごとに行い
+（件数が ROUTINE_VIEW_BUFFER_SIZE に達したときはすぐ）、プロセス終了時には残りを反映する。
+
+閲覧数は結果整合: DB の view_count は最大 ROUTINE_VIEW_FLUSH_INTERVAL 秒ほど遅れる。
+ルーティン一覧は merge_pending_views で未反映の分を足してから並べるが、足せるのは同じプロセスで
+記録された分だけで、他のプロセスの分はそのプロセスが反映するまで含まれない。
+ルーティンに登録していないメニューの閲覧は、反映時に更新される行が無いだけで無視される。
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.db.models import F, Q
+
+
+logger = logging.getLogger(__name__)
+
+# 1回の UPDATE で条件にするユーザーの数
+USERS_PER_UPDATE = 200
+
+
+class ViewCountBuffer:
+    def __init__(self, max_size=1000, interval=5.0, autostart=False):
+        self.max_size = max_size
+        self.interval = interval
+        self.autostart = autostart
+
+        self._pending = Counter()
+        # 反映中の分（反映が終わるまでは pending_for に含める）
+        self._flushing = Counter()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, user_id: int, exercise_id: int, count: int = 1) -> bool:
+        """閲覧を記録する。反映するタイミングなら True"""
+        if self.autostart:
+            self._ensure_thread()
+        with self._lock:
+            self._pending[(user_id, exercise_id)] += count
+            return len(self._pending) >= self.max_size or time.monotonic() - self._last_flush >= self.interval
+
+    def request_flush(self):
+        """反映する（スレッドを使う場合はスレッドに任せ、使わない場合（テストなど）はその場で反映する）"""
+        if self.autostart:
+            self._wakeup.set()
+        else:
+            self.flush()
+
+    def pending_for(self, user_id: int) -> dict:
+        """ユーザーの未反映の閲覧数（メニューID → 件数）"""
+        with self._lock:
+            pending = Counter()
+            for counts in (self._flushing, self._pending):
+                for (pending_user_id, exercise_id), count in counts.items():
+                    if pending_user_id == user_id:
+                        pending[exercise_id] += count
+            return dict(pending)
+
+    def flush(self) -> int:
+        """溜まっている閲覧数を反映し、更新したルーティンの数を返す（別のスレッドが反映中なら何もしない）"""
+        from .models import Routine
+
+        if not self._flush_lock.acquire(blocking=False):
+            return 0
+        try:
+            with self._lock:
+                self._flushing, self._pending = self._pending, Counter()
+                self._last_flush = time.monotonic()
+            if not self._flushing:
+                return 0
+
+            # 増分ごと・ユーザーごとにまとめる: {増分: {ユーザーID: [メニューID]}}
+            groups = defaultdict(lambda: defaultdict(list))
+            for (user_id, exercise_id), count in self._flushing.items():
+                groups[count][user_id].append(exercise_id)
+
+            updated = 0
+            try:
+                # 一部だけ反映された状態で戻して二重に数えないよう、1つのトランザクションで反映する
+                with transaction.atomic():
+                    for count, users in sorted(groups.items()):
+                        users = sorted(users.items())
+                        for i in range(0, len(users), USERS_PER_UPDATE):
+                            condition = Q()
+                            for user_id, exercise_ids in users[i:i + USERS_PER_UPDATE]:
+                                condition |= Q(user_id=user_id, exercise_id__in=exercise_ids)
+                            updated += Routine.objects.filter(condition).update(view_count=F("view_count") + count)
+            except DatabaseError:
+                # 反映できなかった分は戻して次回に反映する
+                logger.exception("ルーティンの閲覧数 %d 件を反映できませんでした", len(self._flushing))
+                with self._lock:
+                    self._pending.update(self._flushing)
+                return 0
+            finally:
+                with self._lock:
+                    self._flushing = Counter()
+            return updated
+        finally:
+            self._flush_lock.release()
+
+    def close(self):
+        """スレッドを止めて残りを反映する（プロセス終了時に呼ばれる）"""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=max(self.interval, 1.0) * 5)
+        self.flush()
+
+    # ---- バックグラウンドスレッド ----
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="routine-view-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        try:
+            while not self._stopped.is_set():
+                self._wakeup.wait(self.interval)
+                self._wakeup.clear()
+                try:
+                    self.flush()
+                except Exception:
+                    # 想定外のエラーでもスレッドを止めない（残りは次回反映する）
+                    logger.exception("ルーティンの閲覧数の反映中にエラーが発生しました")
+        finally:
+            # このスレッド用のDB接続を閉じる
+            connection.close()
+
+
+# ---- プロセス内で共有するバッファ ----
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_view_counter() -> ViewCountBuffer:
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = ViewCountBuffer(
+                    max_size=getattr(settings, "ROUTINE_VIEW_BUFFER_SIZE", 1000),
+                    interval=getattr(settings, "ROUTINE_VIEW_FLUSH_INTERVAL", 5.0),
+                    autostart=getattr(settings, "BACKGROUND_FLUSH", True),
+                )
+                atexit.register(_buffer.close)
+    return _buffer
+
+
+def _record(user_id: int, exercise_id: int):
+    buffer = get_view_counter()
+    if buffer.add(user_id, exercise_id):
+        buffer.request_flush()
+
+
+def record_routine_view(user_id: int, exercise_id: int):
+    """
+    運動メニューの閲覧を記録する（しきい値を超えていれば溜まっている分をすぐに反映する）
+    トランザクション中はコミットされたときに記録する（ロールバックされたリクエストの分は数えない）
+    """
+    transaction.on_commit(partial(_record, user_id, exercise_id))
+
+
+async def arecord_routine_view(user_id: int, exercise_id: int):
+    """record_routine_view の非同期版（トランザクションの状態は同期処理のスレッドで確認する）"""
+    await sync_to_async(record_routine_view)(user_id, exercise_id)
+
+
+# ---- 読み込み ----
+def merge_pending_views(routines, queryset, user_id: int, limit: int) -> list:
+    """
+    閲覧数順に並んだルーティン（先頭 limit 件）に未反映の閲覧数を足し、並べ直して先頭 limit 件を返す
+    queryset: 同じユーザーのルーティン（未反映の閲覧があるルーティンのうち、routines に無いものを取得する）
+    """
+    routines = list(routines)
+    pending = get_view_counter().pending_for(user_id)
+    if not pending:
+        return routines
+
+    # 先頭 limit 件に入っていなくても、閲覧数が増えて入る可能性があるもの
+    known = {routine.pk for routine in routines}
+    routines += [
+        routine for routine in queryset.filter(exercise_id__in=list(pending))
+        if routine.pk not in known
+    ]
+    for routine in routines:
+        routine.view_count += pending.get(routine.exercise_id, 0)
+    # ROUTINE_ORDERING（-view_count, -added_at, -id）と同じ並び
+    routines.sort(key=lambda routine: (routine.view_count, routine.added_at, routine.pk), reverse=True)
+    return routines[:limit]
@@ -1,145 +1,193 @@
+import hashlib
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator, EmptyPage
+from django.db import transaction
+from django.db.models import Q # 検索フィルタリングにQオブジェクトを使う場合
+from django.db.models import Case, When, Value, IntegerField
 from django.shortcuts import render
-from django.db.models import Prefetch
+from django.utils import timezone
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import ParseError
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
-from .models import ConditionLog, ExerciseMenu, Tag
-from .serializers import ExerciseMenuSerializer
+
+from .models import ConditionLog, DailyConditionSummary, ExerciseMenu, Routine
+from .recommendation import get_recommendation_payload, get_recommendation_payloads
+from .log_buffer import save_condition_log, save_condition_logs
+from .concern_matcher import menu_keywords
+from .scoring import normalize_concern, normalize_tag, score_features, tag_features
+from .serializers import current_timezone, log_to_dict, routine_to_dict
+from .menu_cache import get_menu_payloads, serialize_menus
+from .search import search_menu_ids
+from .tag_filter import get_tag_filter_index, parse_tag_list, parse_tag_query
+from .catalog import get_catalog_version
+from .http_cache import (
+    add_cache_headers, catalog_etag, last_modified_timestamp, menu_etag, not_modified_response,
+)
+from .pagination import InvalidCursor, paginate_by_cursor
+from .summaries import parse_trend_params, summarize_trends
+from .view_counter import merge_pending_views, record_routine_view
 
 
 # ---- ここが肝：スコアリング（タグベース） ----
+# ルール本体は scoring.score_features にあり、推薦APIはインデックス経由で同じルールを使う
 def calculate_score(menu: ExerciseMenu, fatigue: int, mood: int, concern: str) -> int:
-    # ベース点（0件を減らすために少し入れる）
-    score = 5
-
-    tags_raw = [t.name for t in menu.tags.all() if t.name]
-    tags_lower = {t.lower().lstrip("#") for t in tags_raw}
-
-    concern = (concern or "").strip().lower()
-
-    def has_any(*names: str) -> bool:
-        names_lower = {n.lower() for n in names}
-        return any(n in tags_lower for n in names_lower)
-
-    # 1) 悩み（タグによるキーワード検索）
-    if concern:
-        for tag in tags_lower: 
-            if not tag:
-                continue
-            first_char = tag[0]
-            if first_char in concern:
-                score += 60
-                break 
-
-    # 2) 疲れレベル
-    if fatigue >= 4:
-        # 高疲労 → 軽め優遇、筋トレ/高強度は減点
-        if has_any("高疲労向け", "ストレッチ", "リラックス", "呼吸法", "軽め", "座ったまま"):
-            score += 30
-        if has_any("筋トレ", "高強度", "追い込み"):
-            score -= 25
-    elif fatigue <= 2:
-        # 低疲労 → 筋トレ/有酸素もOK
-        if has_any("筋トレ", "有酸素", "アクティブ"):
-            score += 20
-    else:
-        # 3 あたりは中間
-        if has_any("ストレッチ", "筋トレ"):
-            score += 10
+    tag_names = [t.name for t in menu.tags.all() if t.name]
+    tags_lower = {normalize_tag(name) for name in tag_names}
 
-    # 3) 気分レベル
-    if mood <= 2:
-        # 気分低い → 気分転換/リフレッシュ系優遇
-        if has_any("リフレッシュ", "気分転換", "呼吸法", "瞑想", "リラックス"):
-            score += 25
-    elif mood >= 4:
-        # 気分高い → 達成感/筋トレも少し優遇
-        if has_any("達成感", "筋トレ", "有酸素"):
-            score += 10
+    # 悩みの文章にタグ・対象部位のキーワードが含まれていれば一致
+    concern = normalize_concern(concern)
+    concern_hit = any(k in concern for k in menu_keywords(tag_names, menu.target_area))
+    return score_features(tag_features(tags_lower), concern_hit, fatigue, mood)
 
-    # 4) 継続性（やりやすいメニューを少し上げる）
-    if has_any("初心者向け", "短時間", "座ったまま"):
-        score += 10
 
-    return max(score, 0)
+# 提案できるメニューが無いときのレスポンス
+REST_SUGGESTION = {
+    "message": "あなたに最適なメニューが見つかりませんでした。今日は無理せず休息をとりましょう。",
+    "rest_suggestion": True,
+    "recommended_menus": [],
+}
 
 
-@api_view(["POST"])
-@permission_classes([IsAuthenticated])
-def recommend_exercise_view(request):
+def require_object(data):
+    """リクエストの本文（request.data）が JSON のオブジェクト・フォームでなければ ParseError（400）"""
+    if not hasattr(data, "get"):
+        raise ParseError("リクエストの本文は JSON のオブジェクトで指定してください。")
+    return data
+
+
+def parse_condition_input(data):
     """
-    体調ログを保存し、運動メニューを最大3件提案するAPI
-    - 通常: ExerciseMenu の配列
-    - 提案なし: rest_suggestion: true のオブジェクト
+    推薦APIの入力を取り出して検証する
+    戻り値: ((fatigue, mood, concern), None) または (None, エラーメッセージ)
     """
+    fatigue = data.get("fatigue_level")
+    mood = data.get("mood_level")
+    concern = data.get("body_concern", "")
 
-    # ---- 入力取得 ----
-    fatigue = request.data.get("fatigue_level")
-    mood = request.data.get("mood_level")
-    concern = request.data.get("body_concern", "")
-
-    # ---- バリデーション ----
     try:
         fatigue = int(fatigue)
         mood = int(mood)
     except (TypeError, ValueError):
-        return Response(
-            {"error": "fatigue_level と mood_level は整数(1-5)で指定してください。"},
-            status=status.HTTP_400_BAD_REQUEST,
-        )
+        return None, "fatigue_level と mood_level は整数(1-5)で指定してください。"
 
     if not (1 <= fatigue <= 5 and 1 <= mood <= 5):
-        return Response(
-            {"error": "fatigue_level と mood_level は 1〜5 の範囲で指定してください。"},
-            status=status.HTTP_400_BAD_REQUEST,
-        )
+        return None, "fatigue_level と mood_level は 1〜5 の範囲で指定してください。"
 
     if concern is None:
         concern = ""
-    concern = str(concern).strip()
+    return (fatigue, mood, str(concern).strip()), None
 
-    # ---- ログ保存 ----
-    ConditionLog.objects.create(
+
+def parse_batch_input(data):
+    """
+    まとめて提案APIの入力（{"entries": [推薦APIと同じ入力 + log_date, ...]}）を取り出して検証する
+    log_date は YYYY-MM-DD（省略時は今日。未来の日付は不可）
+    戻り値: ([(fatigue, mood, concern, log_date), ...], None) または (None, エラー内容の dict)
+    """
+    entries = data.get("entries") if hasattr(data, "get") else None
+    if not isinstance(entries, list) or not entries:
+        return None, {"error": "entries に体調の入力を1件以上の配列で指定してください。"}
+    max_entries = getattr(settings, "RECOMMEND_BATCH_MAX_ENTRIES", 100)
+    if len(entries) > max_entries:
+        return None, {"error": f"entries は {max_entries} 件以下で指定してください。"}
+
+    today = timezone.localdate()
+    values = []
+    for i, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            return None, {"error": "entries の要素はオブジェクトで指定してください。", "index": i}
+        condition, error = parse_condition_input(entry)
+        if error:
+            return None, {"error": error, "index": i}
+        try:
+            log_date = date.fromisoformat(entry["log_date"]) if entry.get("log_date") else today
+        except (TypeError, ValueError):
+            return None, {"error": "log_date は YYYY-MM-DD 形式で指定してください。", "index": i}
+        if log_date > today:
+            return None, {"error": "log_date に未来の日付は指定できません。", "index": i}
+        values.append((*condition, log_date))
+    return values, None
+
+
+def batch_results(values, payloads) -> list:
+    """まとめて提案APIの結果（入力と同じ順。提案なしの入力は休息レスポンス）"""
+    return [
+        {"log_date": log_date.isoformat(), "rest_suggestion": False, "recommended_menus": recommended}
+        if recommended else {"log_date": log_date.isoformat(), **REST_SUGGESTION}
+        for (_, _, _, log_date), recommended in zip(values, payloads)
+    ]
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def recommend_exercise_view(request):
+    """
+    体調ログを保存し、運動メニューを最大3件提案するAPI
+    - 通常: ExerciseMenu の配列
+    - 提案なし: rest_suggestion: true のオブジェクト
+    """
+
+    # ---- 入力取得・バリデーション ----
+    values, error = parse_condition_input(require_object(request.data))
+    if error:
+        return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+    fatigue, mood, concern = values
+
+    # ---- ログ保存（ライトビハインドが有効ならバッファに積むだけ）----
+    save_condition_log(ConditionLog(
         user=request.user,
         fatigue_level=fatigue,
         mood_level=mood,
         body_concern=concern,
-    )
+    ))
 
-    # ---- メニュー取得（タグもまとめて）----
-    all_menus = ExerciseMenu.objects.all().prefetch_related(
-        Prefetch("tags", queryset=Tag.objects.all())
-    )
-
-    scored = []
-    for menu in all_menus:
-        s = calculate_score(menu, fatigue, mood, concern)
-        if s > 0:
-            scored.append((s, menu))
-
-    scored.sort(key=lambda x: x[0], reverse=True)
-    recommended = [m for _, m in scored[:3]]
+    # ---- スコアリング（メモリ上のインデックスのみ、DBは読まない・結果はキャッシュ）----
+    recommended = get_recommendation_payload(fatigue, mood, concern, limit=3)
 
     # ---- 提案なし：休息レスポンス ----
     if not recommended:
-        return Response(
-            {
-                "message": "あなたに最適なメニューが見つかりませんでした。今日は無理せず休息をとりましょう。",
-                "rest_suggestion": True,
-                "recommended_menus": [],
-            },
-            status=status.HTTP_200_OK,
-        )
+        return Response(REST_SUGGESTION, status=status.HTTP_200_OK)
 
     # ---- 通常：メニュー配列 ----
-    return Response(ExerciseMenuSerializer(recommended, many=True).data, status=status.HTTP_200_OK)
+    return Response(recommended, status=status.HTTP_200_OK)
 
-from django.db.models import Q # 検索フィルタリングにQオブジェクトを使う場合
-from django.core.paginator import Paginator, EmptyPage
 
-from .models import ConditionLog, ExerciseMenu, Routine, Tag
-from .serializers import ConditionLogSerializer, RoutineSerializer, ExerciseMenuSerializer
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def recommend_batch_view(request):
+    """
+    オフライン中などに溜まった体調の入力をまとめて保存し、入力ごとに運動メニューを提案するAPI
+    - 入力: {"entries": [{fatigue_level, mood_level, body_concern, log_date}, ...]}
+    - 出力: {"results": [{log_date, rest_suggestion, recommended_menus(, message)}, ...]}（入力と同じ順）
+    1件でも不正な入力があれば何も保存せず 400（index に何件目か）
+    """
+
+    # ---- 入力取得・バリデーション ----
+    values, error = parse_batch_input(require_object(request.data))
+    if error:
+        return Response(error, status=status.HTTP_400_BAD_REQUEST)
+
+    # ---- ログ保存（1回の bulk_create、集計の更新も同じトランザクション）----
+    save_condition_logs([
+        ConditionLog(
+            user=request.user,
+            fatigue_level=fatigue,
+            mood_level=mood,
+            body_concern=concern,
+            log_date=log_date,
+        )
+        for fatigue, mood, concern, log_date in values
+    ])
+
+    # ---- スコアリング（キャッシュに無い入力だけを1回でまとめて計算）----
+    payloads = get_recommendation_payloads([value[:3] for value in values], limit=3)
+    return Response({"results": batch_results(values, payloads)}, status=status.HTTP_200_OK)
+
 
 @api_view(['POST', 'DELETE'])
 @permission_classes([IsAuthenticated]) # ログインユーザーのみアクセス可能
@@ -161,19 +209,19 @@ def routine_manage_view(request, exercise_id: int):
         routine, created = Routine.objects.get_or_create(user=request.user, exercise=exercise)
         
         # ルーティンデータをシリアライズ
-        serializer = RoutineSerializer(routine)
+        data = serialize_routines([routine])[0]
         
         if created:
             # 新規作成時：メッセージとルーティンデータを返す
             return Response({
                 "message": "ルーティンに追加しました",
-                "routine": serializer.data
+                "routine": data
             }, status=status.HTTP_201_CREATED)
         else:
             # 既に存在する場合：メッセージと既存のルーティンデータを返す
             return Response({
                 "message": "この運動メニューは既にルーティンに登録されています。",
-                "routine": serializer.data
+                "routine": data
             }, status=status.HTTP_200_OK)
 
     elif request.method == 'DELETE':
@@ -189,6 +237,78 @@ def routine_manage_view(request, exercise_id: int):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+# カーソル方式のページングで1ページに返す件数
+CURSOR_PAGE_SIZE = 6
+CURSOR_MAX_PAGE_SIZE = 100
+
+HISTORY_ORDERING = ('-log_date', '-created_at', '-id')
+ROUTINE_ORDERING = ('-view_count', '-added_at', '-id')
+
+
+# 一覧APIのクエリ（DBにはアクセスしない、同期・非同期のビューと check_query_plans で共通）
+def history_queryset(user):
+    """体調ログ履歴（新しい順）"""
+    return ConditionLog.objects.filter(user=user).order_by(*HISTORY_ORDERING)
+
+
+def routine_queryset(user):
+    """ルーティン（閲覧数が多い順、同じ場合は追加が新しい順。運動メニューは JOIN で取得）"""
+    return Routine.objects.filter(user=user).select_related('exercise').order_by(*ROUTINE_ORDERING)
+
+
+def trend_summaries_queryset(user, start, end):
+    """体調の推移APIで読む日別集計（日付順）"""
+    return DailyConditionSummary.objects.filter(user=user, date__range=(start, end)).order_by('date')
+
+
+def cursor_page_size(request) -> int:
+    try:
+        page_size = int(request.GET.get('page_size', CURSOR_PAGE_SIZE))
+    except ValueError:
+        page_size = CURSOR_PAGE_SIZE
+    return min(max(page_size, 1), CURSOR_MAX_PAGE_SIZE)
+
+
+def serialize_logs(logs):
+    tz = current_timezone()
+    return [log_to_dict(log, tz) for log in logs]
+
+
+def serialize_routines(routines, version=None):
+    """
+    ルーティンをシリアライズする（運動メニューの部分はキャッシュから組み立てる）
+    version はルーティンを読む前に読んだカタログのバージョン（menu_cache.serialize_menus）
+    """
+    routines = list(routines)
+    payloads = serialize_menus([routine.exercise for routine in routines], version)
+    tz = current_timezone()
+    return [routine_to_dict(routine, payload, tz) for routine, payload in zip(routines, payloads)]
+
+
+def cursor_page_response(request, queryset, ordering, serialize):
+    """
+    カーソル方式のページングでレスポンスを作る
+    - serialize: そのページの行のリストをシリアライズする関数
+    - cursor: 前のレスポンスの next_cursor（1ページ目は空）
+    - page_size: 1ページの件数（最大 CURSOR_MAX_PAGE_SIZE）
+    """
+    page_size = cursor_page_size(request)
+    try:
+        items, next_cursor = paginate_by_cursor(
+            queryset, ordering, request.GET.get('cursor'), page_size
+        )
+    except InvalidCursor:
+        return Response(
+            {"error": "cursor の指定が正しくありません。"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    return Response({
+        "next_cursor": next_cursor,  # 次のページのカーソル（最後のページなら null）
+        "results": serialize(items)  # データ
+    }, status=status.HTTP_200_OK)
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated]) # ログインユーザーのみアクセス可能
 def history_list_view(request):
@@ -196,13 +316,17 @@ def history_list_view(request):
     ログインユーザーの過去の体調ログ履歴を一覧で返すAPI
     並び順: 新しい順
     件数制限: 20件、5件ごとにページング
+    cursor パラメータを付けた場合はカーソル方式（件数制限なし、全履歴をたどれる）
     """
+    # 全履歴を取得（新しい順）
+    logs = history_queryset(request.user)
+
+    if 'cursor' in request.GET:
+        return cursor_page_response(request, logs, HISTORY_ORDERING, serialize_logs)
+
     # クエリパラメータからページ番号を取得（デフォルトは1ページ目）
     page_number = request.GET.get('page', 1)
     
-    # 全履歴を取得（新しい順）
-    logs = ConditionLog.objects.filter(user=request.user).order_by('-log_date', '-created_at')
-    
     # ページネーション設定: 1ページあたり5件、最大20件まで表示
     paginator = Paginator(logs[:20], 6)  # 最大20件に制限し、5件ごとにページング
     
@@ -214,13 +338,38 @@ def history_list_view(request):
             status=status.HTTP_404_NOT_FOUND
         )
     
-    serializer = ConditionLogSerializer(page_obj, many=True)
-    
     return Response({
         "count": paginator.count,  # 総件数
         "total_pages": paginator.num_pages,  # 総ページ数
         "current_page": page_obj.number,  # 現在のページ番号
-        "results": serializer.data  # データ
+        "results": serialize_logs(page_obj)  # データ
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated]) # ログインユーザーのみアクセス可能
+def condition_trends_view(request):
+    """
+    ログインユーザーの体調の推移（件数・疲れ/気分の平均・多かった悩み）を返すAPI
+    日別集計（DailyConditionSummary）だけを読むので、体調ログの件数によらず期間の日数に比例する
+
+    クエリパラメータ:
+    - start, end: 期間（YYYY-MM-DD、両端を含む。省略時は今日までの30日間）
+    - period: day（日ごと、既定）または week（月曜始まりの週ごと）
+    ログの無い日・週は含めない
+    """
+    params, error = parse_trend_params(request.GET)
+    if error:
+        return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+    start, end, period = params
+
+    summaries = trend_summaries_queryset(request.user, start, end)
+
+    return Response({
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "period": period,
+        "results": summarize_trends(summaries, period),
     }, status=status.HTTP_200_OK)
 
 
@@ -229,17 +378,36 @@ def history_list_view(request):
 def routine_list_view(request):
     """
     ログインユーザーのルーティン一覧を返すAPI
-    並び順: 閲覧数順（view_countが多い順）
+    並び順: 閲覧数順（view_countが多い順、未反映の閲覧数を含む）
     件数制限: 20件、5件ごとにページング
+    cursor パラメータを付けた場合はカーソル方式（件数制限なし）
     """
+    # 全ルーティンを取得（閲覧数が多い順、同じ場合は追加が新しい順）
+    # 運動メニューは JOIN で取得し、タグはキャッシュに無いメニューの分だけまとめて取得する
+    routines = routine_queryset(request.user)
+
+    if 'cursor' in request.GET:
+        # カーソル方式は反映済みの閲覧数で並べる
+        version = get_catalog_version()
+        return cursor_page_response(
+            request, routines, ROUTINE_ORDERING, lambda rows: serialize_routines(rows, version)
+        )
+
+    return routine_page_response(request, routines)
+
+
+def routine_page_response(request, routines, **extra):
+    """ルーティン一覧のページ（page パラメータ）のレスポンス。extra はレスポンスに追加する項目"""
     # クエリパラメータからページ番号を取得（デフォルトは1ページ目）
     page_number = request.GET.get('page', 1)
-    
-    # 全ルーティンを取得（閲覧数が多い順、同じ場合は追加が新しい順）
-    routines = Routine.objects.filter(user=request.user).order_by('-view_count', '-added_at')
+    # メニューのシリアライズ結果をキャッシュするときのバージョン（ルーティンを読む前に読む）
+    version = get_catalog_version()
+
+    # 未反映の閲覧数を足して並べ直す
+    top_routines = merge_pending_views(routines[:20], routines, request.user.pk, 20)
     
     # ページネーション設定: 1ページあたり5件、最大20件まで表示
-    paginator = Paginator(routines[:20], 6)  # 最大20件に制限し、5件ごとにページング
+    paginator = Paginator(top_routines, 6)  # 最大20件に制限し、5件ごとにページング
     
     try:
         page_obj = paginator.get_page(page_number)
@@ -249,43 +417,92 @@ def routine_list_view(request):
             status=status.HTTP_404_NOT_FOUND
         )
     
-    serializer = RoutineSerializer(page_obj, many=True)
-    
     return Response({
         "count": paginator.count,  # 総件数
         "total_pages": paginator.num_pages,  # 総ページ数
         "current_page": page_obj.number,  # 現在のページ番号
-        "results": serializer.data  # データ
+        "results": serialize_routines(page_obj, version),  # データ
+        **extra,
     }, status=status.HTTP_200_OK)
 
 
-@api_view(['GET'])
-@permission_classes([IsAuthenticated]) # ログインユーザーのみアクセス可能
-def exercise_list_view(request):
+def parse_routine_bulk_input(data):
     """
-    運動メニュー一覧・検索API
-    
-    クエリパラメータ:
-    - q: キーワード検索（name, descriptionに部分一致）
-    - tags: タグ検索（カンマ区切りで複数指定、AND検索）
-    - page: ページ番号
-    
-    並び順:
-    - 検索時: 関連度順（nameに一致 > descriptionに一致）
-    - 通常時: ID順（登録順）
-    
-    ページネーション: 5件/ページ、最大20件
+    まとめてルーティン操作APIの入力（{"add": [運動メニューID, ...], "remove": [...]}）を取り出して検証する
+    戻り値: ((add, remove), None) または (None, エラーメッセージ)。add / remove は重複を除いたID
     """
-    # クエリパラメータを取得
-    keyword = request.GET.get('q', '').strip()  # キーワード検索
-    tags_param = request.GET.get('tags', '').strip()  # タグ検索（カンマ区切り）
-    page_number = request.GET.get('page', 1)
-    
-    # 基本クエリ（全メニュー）
+    ids = {}
+    for key in ("add", "remove"):
+        values = data.get(key, []) if hasattr(data, "get") else None
+        if not isinstance(values, list) or any(isinstance(v, bool) or not isinstance(v, int) for v in values):
+            return None, f"{key} は運動メニューID（整数）の配列で指定してください。"
+        ids[key] = list(dict.fromkeys(values))
+
+    add, remove = ids["add"], ids["remove"]
+    if not add and not remove:
+        return None, "add または remove に運動メニューIDを指定してください。"
+    max_ids = getattr(settings, "ROUTINE_BULK_MAX_IDS", 100)
+    if len(add) + len(remove) > max_ids:
+        return None, f"add と remove は合わせて {max_ids} 件以下で指定してください。"
+    if set(add) & set(remove):
+        return None, "同じ運動メニューIDを add と remove の両方に指定することはできません。"
+    return (add, remove), None
+
+
+def apply_routine_changes(user, add, remove):
+    """
+    ルーティンにまとめて追加・削除する
+    存在の確認は1回の IN クエリ、追加は bulk_create（登録済みは無視）、削除は1回の DELETE
+    戻り値: (削除した件数, None) または (None, 存在しない運動メニューIDのリスト)
+    """
+    found = set(ExerciseMenu.objects.filter(pk__in=add + remove).values_list('pk', flat=True))
+    missing = [pk for pk in add + remove if pk not in found]
+    if missing:
+        return None, missing
+
+    with transaction.atomic():
+        Routine.objects.bulk_create(
+            [Routine(user=user, exercise_id=pk) for pk in add], ignore_conflicts=True
+        )
+        removed = Routine.objects.filter(user=user, exercise_id__in=remove).delete()[0] if remove else 0
+    return removed, None
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def routine_bulk_view(request):
+    """
+    ルーティンに運動メニューをまとめて追加・削除するAPI（提案されたメニューをまとめて登録する場合など）
+    - 入力: {"add": [運動メニューID, ...], "remove": [運動メニューID, ...]}（どちらか一方は省略可）
+    - 出力: 更新後のルーティン一覧のページ（ルーティン一覧APIと同じ形式）と削除した件数（removed）
+    登録済みのメニューの追加・未登録のメニューの削除は無視する。存在しないIDがあれば何も変更せず 404
+    """
+    values, error = parse_routine_bulk_input(require_object(request.data))
+    if error:
+        return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+    add, remove = values
+
+    removed, missing = apply_routine_changes(request.user, add, remove)
+    if missing:
+        return Response(
+            {"error": "運動メニューが見つかりません。", "missing": missing},
+            status=status.HTTP_404_NOT_FOUND,
+        )
+
+    routines = routine_queryset(request.user)
+    return routine_page_response(request, routines, removed=removed)
+
+
+def build_exercise_queryset(keyword, ranked_ids):
+    """
+    運動メニュー一覧・検索APIのクエリ（DBにはアクセスしない、同期・非同期のビューで共通）
+    ranked_ids: 全文検索の結果（インデックスが使えないDBでは None）
+    """
+    # 基本クエリ（全メニュー、タグはシリアライズ結果のキャッシュに無いものだけ後で取得）
     exercises = ExerciseMenu.objects.all()
-    
-    # キーワード検索（OR検索: nameまたはdescriptionに部分一致）
-    if keyword:
+
+    # インデックスが使えないDBでは部分一致検索（OR検索: nameまたはdescriptionに部分一致）
+    if keyword and ranked_ids is None:
         exercises = exercises.filter(
             Q(name__icontains=keyword) | 
             Q(description__icontains=keyword) |
@@ -295,8 +512,6 @@ def exercise_list_view(request):
         
         # 検索時は関連度順にソート（nameに一致が優先、次にdescription）
         # nameに完全一致 > nameに部分一致 > descriptionに一致 の順
-        from django.db.models import Case, When, Value, IntegerField
-        
         exercises = exercises.annotate(
             relevance=Case(
                 When(name__iexact=keyword, then=Value(3)),  # 完全一致（最優先）
@@ -306,24 +521,117 @@ def exercise_list_view(request):
                 output_field=IntegerField()
             )
         ).order_by('-relevance', 'id')
-    else:
+    elif not keyword:
         # 通常時はID順（登録順）
         exercises = exercises.order_by('id')
     
-    # タグ検索（AND検索: 指定された全てのタグを持つメニュー）
-    if tags_param:
-        tag_names = [tag.strip() for tag in tags_param.split(',') if tag.strip()]
-        
-        if tag_names:
-            # 各タグ名でフィルタリング（AND検索）
-            for tag_name in tag_names:
-                exercises = exercises.filter(tags__name__icontains=tag_name)
-            
-            # 重複を除去（ManyToManyで同じメニューが複数回取得される可能性があるため）
-            exercises = exercises.distinct()
+    return exercises
+
+
+def tag_conditions(params) -> list:
+    """tags（タグ名のカンマ区切り）と tag_query（条件式）を合わせたタグ条件（tag_filter を参照）"""
+    return parse_tag_list(params.get('tags', '')) + parse_tag_query(params.get('tag_query', ''))
+
+
+def resolve_exercise_ids(keyword, clauses):
+    """
+    キーワード・タグ条件（tag_conditions）に一致するメニューIDを表示順に返す
+    どちらの条件も無い、またはインデックスが使えないDBでキーワードだけの場合は None
+    （build_exercise_queryset のクエリをそのままページングする）
+    """
+    # キーワード検索（全文検索インデックスで関連度順のIDを取得）
+    ranked_ids = search_menu_ids(keyword) if keyword else None
+
+    # タグ検索（メモリ上のビットセットで絞り込み、M2M の JOIN を使わない）
+    if not clauses:
+        return ranked_ids
+
+    index = get_tag_filter_index()
+    bits = index.filter_bits(clauses)
+    if not keyword:
+        return index.ids(bits)  # ID順（登録順）
+    if ranked_ids is None:
+        # 部分一致検索の関連度順
+        ranked_ids = build_exercise_queryset(keyword, None).values_list('pk', flat=True)
+    # 検索結果の並び順を保ったまま、タグ条件に合うものだけ残す
+    return index.select(ranked_ids, bits)
+
+
+def facet_cache_key(version: int, keyword: str, clauses: list) -> str:
+    digest = hashlib.md5(f"{keyword}\0{clauses!r}".encode("utf-8")).hexdigest()
+    return f"condition_manager:facets:{version}:{digest}"
+
+
+def exercise_facets(keyword, clauses, ranked_ids, exercises):
+    """
+    検索結果全体（ページではない）のタグ・カテゴリ・対象部位ごとの件数
+    (q, タグ条件) ごとにキャッシュし、カタログが変わったら使わない
+    """
+    key = facet_cache_key(get_catalog_version(), keyword, clauses)
+    facets = cache.get(key)
+    if facets is not None:
+        return facets
+
+    index = get_tag_filter_index()
+    if ranked_ids is not None:
+        bits = index.bits_of(ranked_ids)
+    elif keyword:
+        bits = index.bits_of(exercises.values_list('pk', flat=True))
+    else:
+        bits = index.all_bits
+    facets = index.facets(bits)
+    cache.set(key, facets, timeout=getattr(settings, "FACET_CACHE_TIMEOUT", 600))
+    return facets
+
+
+def wants_facets(request) -> bool:
+    return request.GET.get('facets', '').lower() in ('1', 'true')
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated]) # ログインユーザーのみアクセス可能
+def exercise_list_view(request):
+    """
+    運動メニュー一覧・検索API
     
+    クエリパラメータ:
+    - q: キーワード検索（name, description, target_area, タグ名を全文検索）
+    - tags: タグ検索（タグ名のカンマ区切りで AND。| や - もタグ名の一部として扱う）
+    - tag_query: タグの条件式（tags と併用した場合は AND）
+        式     := 条件 ("," 条件)*        カンマ区切りは AND
+        条件   := 項 ("|" 項)*            | 区切りは OR
+        項     := ["-"] タグ名            先頭に - で NOT
+      例: tag_query=肩|首,-筋トレ（肩か首を含み、筋トレを含まない）
+      タグ名に , や | を含むもの、- で始まるものは tags で指定する
+    タグ名はどちらも部分一致（大文字・小文字は区別しない）
+    - page: ページ番号
+    - facets: 1 を指定すると検索結果全体のタグ・カテゴリ・対象部位ごとの件数（facets）も返す
+    
+    並び順:
+    - 検索時: 関連度順（SQLite は BM25、PostgreSQL は ts_rank。nameの一致を重視）
+    - 通常時: ID順（登録順）
+    
+    ページネーション: 5件/ページ、最大20件
+    ETag による条件付き GET に対応（カタログが変わっていなければ 304）
+    """
+    # カタログが変わっていなければ 304（DBは読まない）
+    version = get_catalog_version()
+    etag = catalog_etag(version, request.GET, request.accepted_renderer.format)
+    not_modified = not_modified_response(request, etag)
+    if not_modified is not None:
+        return not_modified
+
+    # クエリパラメータを取得
+    keyword = request.GET.get('q', '').strip()  # キーワード検索
+    clauses = tag_conditions(request.GET)  # タグ検索
+    page_number = request.GET.get('page', 1)
+    
+    # 条件に一致するメニューIDを表示順に取得（キーワードだけのDB検索ならクエリのまま）
+    ranked_ids = resolve_exercise_ids(keyword, clauses)
+    exercises = build_exercise_queryset(keyword, ranked_ids)
+
     # ページネーション設定: 1ページあたり5件
-    paginator = Paginator(exercises, 6)
+    paginator = Paginator(exercises if ranked_ids is None else ranked_ids, 6)
     
     try:
         page_obj = paginator.get_page(page_number)
@@ -332,15 +640,22 @@ def exercise_list_view(request):
             {"error": "指定されたページが存在しません。"}, 
             status=status.HTTP_404_NOT_FOUND
         )
+
+    if ranked_ids is None:
+        results = serialize_menus(page_obj.object_list, version)
+    else:
+        # ページ分のIDのシリアライズ結果（キャッシュに無いものだけDBから取得）を関連度順に並べる
+        results = get_menu_payloads(page_obj.object_list)
     
-    serializer = ExerciseMenuSerializer(page_obj, many=True)
-    
-    return Response({
+    data = {
         "count": paginator.count,  # 総件数
         "total_pages": paginator.num_pages,  # 総ページ数
         "current_page": page_obj.number,  # 現在のページ番号
-        "results": serializer.data  # データ
-    }, status=status.HTTP_200_OK)
+        "results": results  # データ
+    }
+    if wants_facets(request):
+        data["facets"] = exercise_facets(keyword, clauses, ranked_ids, exercises)
+    return add_cache_headers(Response(data, status=status.HTTP_200_OK), etag)
 
 
 @api_view(['GET'])
@@ -348,7 +663,12 @@ def exercise_list_view(request):
 def exercise_detail_view(request, pk: int): # URLから渡される主キー (ID) をpkとして受け取る
     """
     特定の運動メニューの詳細情報を返すAPI
+    ETag / Last-Modified による条件付き GET に対応（更新されていなければ 304）
+    閲覧はルーティンの閲覧数として記録する（view_counter でまとめて反映）
     """
+    # シリアライズ結果をキャッシュするときのバージョン（メニューを読む前に読む）
+    version = get_catalog_version()
+
     # 運動メニューが見つからない場合の適切なエラーレスポンス
     try:
         exercise = ExerciseMenu.objects.get(pk=pk)
@@ -358,8 +678,18 @@ def exercise_detail_view(request, pk: int): # URLから渡される主キー (ID
             status=status.HTTP_404_NOT_FOUND
         )
 
-    serializer = ExerciseMenuSerializer(exercise)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    record_routine_view(request.user.pk, exercise.pk)
+
+    # 更新されていなければ 304（タグの取得・シリアライズを行わない）
+    # 変更時はカタログのバージョンが上がるので、シリアライズ結果のキャッシュも古いものは使われない
+    etag = menu_etag(exercise.pk, exercise.updated_at, request.accepted_renderer.format)
+    last_modified = last_modified_timestamp(exercise.updated_at)
+    not_modified = not_modified_response(request, etag, last_modified)
+    if not_modified is not None:
+        return not_modified
+
+    data = serialize_menus([exercise], version)[0]
+    return add_cache_headers(Response(data, status=status.HTTP_200_OK), etag, last_modified)
 
 # ---- Page Views ----
 def exercise_detail_page(request, pk: int):
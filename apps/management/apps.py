@@ -3,3 +3,7 @@ from django.apps import AppConfig
 class ManagementConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.management'
+
+    def ready(self):
+        # シグナルの登録（ダッシュボードの集計値）
+        from . import signals  # noqa: F401
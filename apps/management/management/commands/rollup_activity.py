@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from apps.management import rollups
+
+
+class Command(BaseCommand):
+    help = "管理画面のグラフ用の日・週ごとの集計を、前回以降に記録された体調ログの分だけ更新する（定期実行用）"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full", action="store_true",
+            help="全期間を作り直す（ログの変更・削除や過去の日付への追加を反映する場合）",
+        )
+
+    def handle(self, *args, **options):
+        result = rollups.update_rollups(full=options["full"])
+        self.stdout.write(self.style.SUCCESS(
+            f"{result['days']} 日分を集計し {result['rollups']} 行を作り直しました"
+            f"（体調ログID {result['high_water_mark']} まで）"
+        ))
@@ -0,0 +1,27 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.management import metrics
+
+
+class Command(BaseCommand):
+    help = "ダッシュボードの集計値（総件数・日ごとの件数）を元のテーブルから数え直す（定期実行用）"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days", type=int, default=None,
+            help="日ごとの件数を数え直す日数（今日を含む。省略時は全期間）",
+        )
+
+    def handle(self, *args, **options):
+        counters = metrics.rollup_counters()
+        start = None
+        if options["days"] is not None:
+            start = timezone.localdate() - timedelta(days=options["days"] - 1)
+        created = metrics.rollup_daily(start=start)
+
+        for name, value in counters.items():
+            self.stdout.write(f"{name}: {value}")
+        self.stdout.write(self.style.SUCCESS(f"日ごとの件数 {created} 行を作り直しました"))
@@ -0,0 +1,348 @@
+"""
+ダッシュボードの集計値
+
+総件数（MetricCounter）と日ごとの件数（DailyMetric）を集計テーブルに持ち、
+ダッシュボードは COUNT(*) を実行せずに数行だけを読む。
+
+- signals.py: ユーザー・体調ログ・運動メニューの作成・削除で差分を足し込む
+- rollup_metrics コマンド: 元のテーブルから数え直す（導入時・ずれの修正用、定期実行を想定）
+総件数の行がまだ無い場合は、最初に読んだときに数えて作る。
+
+差分は書き込んだトランザクションの中では反映しない（すべての書き込みが同じ集計行のロックを待つため）。
+コミット後にプロセス内のバッファ（MetricBuffer）に溜め、バックグラウンドのスレッドが
+METRIC_FLUSH_INTERVAL 秒ごと（件数が METRIC_BUFFER_SIZE に達したときはすぐ）に
+1つのトランザクションでまとめて反映する。ダッシュボードの値は最大でその間隔だけ遅れる
+（結果整合。プロセス終了時には残りを反映する）。
+
+差分はコミットした時刻と一緒に溜め、数え直した行（counted_at）より前の差分は反映しない
+（数え直した値に含まれている）。どのプロセスのバッファに残っている差分でも、数え直しの後に
+二重に足し込まれない。
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.db.models import Count, F
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from apps.condition_manager.models import ConditionLog, ExerciseMenu
+
+from .models import DailyMetric, MetricCounter
+
+
+logger = logging.getLogger(__name__)
+
+# 集計の名前
+USERS = "users"
+CONDITION_LOGS = "condition_logs"
+EXERCISE_MENUS = "exercise_menus"
+
+# 日ごとの件数の名前（新規ユーザー数・記録された体調ログ数）
+NEW_USERS = "new_users"
+NEW_CONDITION_LOGS = "new_condition_logs"
+
+
+def _counter_sources():
+    # 総件数の名前と元のテーブル
+    return {
+        USERS: get_user_model().objects.all(),
+        CONDITION_LOGS: ConditionLog.objects.all(),
+        EXERCISE_MENUS: ExerciseMenu.objects.all(),
+    }
+
+
+def _daily_sources():
+    # 日ごとの件数の名前と (元のテーブル, 日時の項目)
+    return {
+        NEW_USERS: (get_user_model().objects.all(), "date_joined"),
+        NEW_CONDITION_LOGS: (ConditionLog.objects.all(), "created_at"),
+    }
+
+
+def local_day(value):
+    """日時を日付にする（settings.TIME_ZONE の日付）"""
+    return timezone.localdate(value) if value is not None else timezone.localdate()
+
+
+# ---- 差分の足し込み ----
+def increment(name: str, delta: int = 1):
+    # 行が無い場合は何もしない（最初に読んだときに数えて作るので、その値に含まれる）
+    MetricCounter.objects.filter(name=name).update(value=F("value") + delta, updated_at=timezone.now())
+
+
+def increment_daily(name: str, day, delta: int = 1):
+    if DailyMetric.objects.filter(name=name, date=day).update(value=F("value") + delta):
+        return
+    try:
+        with transaction.atomic():
+            DailyMetric.objects.create(name=name, date=day, value=delta)
+    except IntegrityError:
+        # 同時に別のリクエストが作った場合はそちらに足し込む
+        DailyMetric.objects.filter(name=name, date=day).update(value=F("value") + delta)
+
+
+def _since(entries, counted_at) -> int:
+    """数え直した時刻より後にコミットされた差分の合計（entries: [(コミットした時刻, 差分)]）"""
+    return sum(delta for stamp, delta in entries if counted_at is None or stamp >= counted_at)
+
+
+def apply_deltas(counters, daily):
+    """
+    溜めた差分を反映する（counters: {名前: [(時刻, 差分)]}、daily: {(名前, 日付): [(時刻, 差分)]}）
+    数え直しと同時に行わないよう、集計行をロックしてから数え直した時刻を読む
+    """
+    counted = dict(
+        MetricCounter.objects.select_for_update().filter(name__in=list(counters)).values_list("name", "counted_at")
+    )
+    for name, entries in sorted(counters.items()):
+        delta = _since(entries, counted.get(name))
+        if delta:
+            increment(name, delta)
+
+    if not daily:
+        return
+    counted = {
+        (name, day): counted_at
+        for name, day, counted_at in DailyMetric.objects.select_for_update().filter(
+            name__in={name for name, _ in daily}, date__in={day for _, day in daily},
+        ).values_list("name", "date", "counted_at")
+    }
+    for (name, day), entries in sorted(daily.items()):
+        delta = _since(entries, counted.get((name, day)))
+        if delta:
+            increment_daily(name, day, delta)
+
+
+class MetricBuffer:
+    def __init__(self, max_size=100, interval=5.0, autostart=False):
+        self.max_size = max_size
+        self.interval = interval
+        self.autostart = autostart
+
+        # {名前: [(コミットした時刻, 差分)]}、{(名前, 日付): [(コミットした時刻, 差分)]}
+        self._counters = defaultdict(list)
+        self._daily = defaultdict(list)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def __len__(self):
+        return len(self._counters) + len(self._daily)
+
+    def add(self, counters, daily, stamp=None):
+        """
+        コミットした差分を溜める（counters: {名前: 差分}、daily: {(名前, 日付): 差分}）
+        stamp: コミットした時刻（省略すると現在時刻）
+        """
+        stamp = stamp or timezone.now()
+        with self._lock:
+            for name, delta in counters.items():
+                self._counters[name].append((stamp, delta))
+            for key, delta in daily.items():
+                self._daily[key].append((stamp, delta))
+            full = len(self) >= self.max_size
+            due = full or time.monotonic() - self._last_flush >= self.interval
+
+        if not self.autostart:
+            # スレッドを使わない場合（テストなど）はその場で反映する
+            if due:
+                self.flush()
+            return
+
+        self._ensure_thread()
+        if full:
+            self._wakeup.set()
+
+    def flush(self) -> int:
+        """溜まっている差分を反映し、反映した件数を返す（別のスレッドが反映中なら何もしない）"""
+        if not self._flush_lock.acquire(blocking=False):
+            return 0
+        try:
+            with self._lock:
+                counters, self._counters = self._counters, defaultdict(list)
+                daily, self._daily = self._daily, defaultdict(list)
+                self._last_flush = time.monotonic()
+            if not counters and not daily:
+                return 0
+            try:
+                # 一部だけ反映された状態で戻して二重に数えないよう、1つのトランザクションで反映する
+                with transaction.atomic():
+                    apply_deltas(counters, daily)
+            except DatabaseError:
+                logger.exception("ダッシュボードの集計値 %d 件を反映できませんでした", len(counters) + len(daily))
+                with self._lock:
+                    for name, entries in counters.items():
+                        self._counters[name][:0] = entries
+                    for key, entries in daily.items():
+                        self._daily[key][:0] = entries
+                return 0
+            return len(counters) + len(daily)
+        finally:
+            self._flush_lock.release()
+
+    def close(self):
+        """スレッドを止めて残りを反映する（プロセス終了時に呼ばれる）"""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=max(self.interval, 1.0) * 5)
+        self.flush()
+
+    # ---- バックグラウンドスレッド ----
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="metric-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        try:
+            while not self._stopped.is_set():
+                self._wakeup.wait(self.interval)
+                self._wakeup.clear()
+                try:
+                    self.flush()
+                except Exception:
+                    # 想定外のエラーでもスレッドを止めない（残りは次回反映する）
+                    logger.exception("ダッシュボードの集計値の反映中にエラーが発生しました")
+        finally:
+            # このスレッド用のDB接続を閉じる
+            connection.close()
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_metric_buffer() -> MetricBuffer:
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = MetricBuffer(
+                    max_size=getattr(settings, "METRIC_BUFFER_SIZE", 100),
+                    interval=getattr(settings, "METRIC_FLUSH_INTERVAL", 5.0),
+                    autostart=getattr(settings, "BACKGROUND_FLUSH", True),
+                )
+                atexit.register(_buffer.close)
+    return _buffer
+
+
+def _add(counters, daily):
+    get_metric_buffer().add(counters, daily)
+
+
+def flush_metrics() -> int:
+    """溜まっている差分をすぐに反映する"""
+    return get_metric_buffer().flush()
+
+
+def record(counter: str, daily: str = None, days=(), delta: int = 1):
+    """
+    作成（delta=1）・削除（delta=-1）を集計に反映する（コミット後にバッファに溜める）
+    days: 日ごとの件数に足し込む日付（1件につき1つ、同じ日付はまとめて足し込む）
+    """
+    days = Counter(days)
+    if not days:
+        return
+    counters = {counter: delta * sum(days.values())}
+    daily_deltas = {(daily, day): delta * count for day, count in days.items()} if daily else {}
+    transaction.on_commit(partial(_add, counters, daily_deltas))
+
+
+def record_counter(counter: str, delta: int = 1):
+    """日ごとの件数が無い総件数の作成・削除を反映する（コミット後にバッファに溜める）"""
+    transaction.on_commit(partial(_add, {counter: delta}, {}))
+
+
+# ---- 読み込み ----
+def get_counters(names=None) -> dict:
+    """総件数を返す（1クエリ、行が無いものは数えて作る）"""
+    names = list(names or _counter_sources())
+    values = dict(MetricCounter.objects.filter(name__in=names).values_list("name", "value"))
+    missing = [name for name in names if name not in values]
+    if missing:
+        values.update(rollup_counters(missing))
+    return {name: values[name] for name in names}
+
+
+def daily_series(name: str, start, end) -> list:
+    """start〜end（両端を含む）の日ごとの件数。[(日付, 件数)] で、行の無い日は 0"""
+    values = dict(
+        DailyMetric.objects.filter(name=name, date__range=(start, end)).values_list("date", "value")
+    )
+    return [
+        (start + timedelta(days=i), values.get(start + timedelta(days=i), 0))
+        for i in range((end - start).days + 1)
+    ]
+
+
+def sum_daily(name: str, start, end) -> int:
+    return sum(value for _, value in daily_series(name, start, end))
+
+
+# ---- 数え直し ----
+def rollup_counters(names=None) -> dict:
+    """
+    総件数を元のテーブルから数え直して保存する
+    数え直す前の時刻を counted_at に保存し、それより前にコミットされた差分（どのプロセスの
+    バッファに残っていても）は反映しない
+    """
+    sources = _counter_sources()
+    names = list(names or sources)
+    values = {}
+    for name in names:
+        counted_at = timezone.now()
+        values[name] = sources[name].count()
+        MetricCounter.objects.update_or_create(
+            name=name, defaults={"value": values[name], "counted_at": counted_at}
+        )
+    return values
+
+
+def rollup_daily(start=None, end=None) -> int:
+    """
+    日ごとの件数を元のテーブルから数え直して保存する（start / end を省略すると全期間）
+    保存した行数を返す
+    """
+    tz = timezone.get_current_timezone()
+    created = 0
+    # 数え直す前の時刻（これより前にコミットされた差分は反映しない。rollup_counters と同じ）
+    counted_at = timezone.now()
+    with transaction.atomic():
+        for name, (queryset, field) in _daily_sources().items():
+            rows = queryset.annotate(day=TruncDate(field, tzinfo=tz)).values("day").annotate(count=Count("pk"))
+            existing = DailyMetric.objects.filter(name=name)
+            if start is not None:
+                rows = rows.filter(day__gte=start)
+                existing = existing.filter(date__gte=start)
+            if end is not None:
+                rows = rows.filter(day__lte=end)
+                existing = existing.filter(date__lte=end)
+            # 行は削除せずに 0 にする（削除すると、その日の差分が数え直した値に含まれているか分からなくなる）
+            existing.update(value=0, counted_at=counted_at)
+            metrics = DailyMetric.objects.bulk_create(
+                [
+                    DailyMetric(name=name, date=row["day"], value=row["count"], counted_at=counted_at)
+                    for row in rows.order_by("day")
+                ],
+                batch_size=500,
+                update_conflicts=True,
+                unique_fields=("name", "date"),
+                update_fields=("value", "counted_at"),
+            )
+            created += len(metrics)
+    return created
@@ -0,0 +1,38 @@
+# Generated by Django 6.0.1 on 2026-10-18 11:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('management', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('high_water_mark', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ActivityRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('day', '日'), ('week', '週')], max_length=10)),
+                ('start', models.DateField()),
+                ('log_count', models.PositiveIntegerField(default=0)),
+                ('active_users', models.PositiveIntegerField(default=0, help_text='ログを記録したユーザー数')),
+                ('fatigue_total', models.PositiveIntegerField(default=0)),
+                ('mood_total', models.PositiveIntegerField(default=0)),
+                ('concern_counts', models.JSONField(blank=True, default=dict, help_text='体の悩みごとの件数')),
+            ],
+            options={
+                'unique_together': {('period', 'start')},
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-18 12:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('management', '0002_activityrollup_rollupstate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dailymetric',
+            name='counted_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='metriccounter',
+            name='counted_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,3 +1,71 @@
 from django.db import models
 
-# Create your models here.
+
+# MetricCounter モデルの定義
+class MetricCounter(models.Model):
+    """
+    ダッシュボードの集計値（総ユーザー数など）
+    metrics.py がシグナルで増減させ、rollup_metrics コマンドで数え直す
+    """
+    name = models.CharField(max_length=50, unique=True)
+    value = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    # 数え直した時刻（これより前にコミットされた差分は value に含まれているので足し込まない）
+    counted_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+
+# DailyMetric モデルの定義
+class DailyMetric(models.Model):
+    """日ごとの件数（新規ユーザー数・体調ログ数など）"""
+    name = models.CharField(max_length=50)
+    date = models.DateField()
+    value = models.BigIntegerField(default=0)
+    # 数え直した時刻（MetricCounter.counted_at と同じ）
+    counted_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ('name', 'date')
+
+    def __str__(self):
+        return f"{self.name} - {self.date}: {self.value}"
+
+
+# ActivityRollup モデルの定義
+class ActivityRollup(models.Model):
+    """
+    日・週ごとの体調ログの集計（管理画面のグラフ用）
+    rollups.py が rollup_activity コマンドで、新しく記録されたログの日・週の分だけ作り直す
+    """
+    PERIOD_CHOICES = [
+        ('day', '日'),
+        ('week', '週'),
+    ]
+    period = models.CharField(max_length=10, choices=PERIOD_CHOICES)
+    # 日ごとはその日、週ごとはその週の月曜日
+    start = models.DateField()
+    log_count = models.PositiveIntegerField(default=0)
+    active_users = models.PositiveIntegerField(default=0, help_text="ログを記録したユーザー数")
+    fatigue_total = models.PositiveIntegerField(default=0)
+    mood_total = models.PositiveIntegerField(default=0)
+    concern_counts = models.JSONField(default=dict, blank=True, help_text="体の悩みごとの件数")
+
+    class Meta:
+        unique_together = ('period', 'start')
+
+    def __str__(self):
+        return f"{self.period} {self.start}: {self.log_count} logs"
+
+
+# RollupState モデルの定義
+class RollupState(models.Model):
+    """集計の処理済み位置（ハイウォーターマーク）"""
+    name = models.CharField(max_length=50, unique=True)
+    # 集計済みの体調ログの最大ID
+    high_water_mark = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name}: {self.high_water_mark}"
@@ -0,0 +1,150 @@
+"""
+管理画面のグラフ用の集計（ActivityRollup）
+
+日・週ごとの体調ログ数・ログを記録したユーザー数・疲れ/気分の平均・多かった悩みを
+集計テーブルに持ち、グラフのAPIは集計テーブルだけを読む。
+
+rollup_activity コマンド（定期実行を想定）が、前回集計した体調ログの最大ID
+（ハイウォーターマーク、RollupState）より新しいログの日付を調べ、その日と週の分だけ作り直す。
+作り直しにはユーザー・日付ごとの集計（DailyConditionSummary）を使い、体調ログは読まない。
+ログの変更・削除や過去の日付へのログの追加は --full で全期間を作り直す。
+"""
+from collections import Counter
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from apps.condition_manager.models import ConditionLog, DailyConditionSummary
+from apps.condition_manager.summaries import TOP_CONCERNS, week_start
+
+from .models import ActivityRollup, RollupState
+
+
+STATE_NAME = "activity"
+
+# グラフのAPIで一度に返す点の数の上限
+MAX_POINTS = 400
+
+
+class _Bucket:
+    def __init__(self):
+        self.log_count = 0
+        self.fatigue_total = 0
+        self.mood_total = 0
+        self.users = set()
+        self.concerns = Counter()
+
+    def add(self, user_id, log_count, fatigue_total, mood_total, concern_counts):
+        self.log_count += log_count
+        self.fatigue_total += fatigue_total
+        self.mood_total += mood_total
+        self.users.add(user_id)
+        self.concerns.update(concern_counts)
+
+    def to_rollup(self, period, start):
+        return ActivityRollup(
+            period=period, start=start, log_count=self.log_count, active_users=len(self.users),
+            fatigue_total=self.fatigue_total, mood_total=self.mood_total, concern_counts=dict(self.concerns),
+        )
+
+
+def rollup_days(days) -> int:
+    """
+    指定した日付と、その日付を含む週の集計を作り直す
+    作った集計行の数を返す
+    """
+    days = set(days)
+    if not days:
+        return 0
+    weeks = {week_start(day) for day in days}
+    # 週の集計には週のすべての日の分が必要
+    dates = days | {week + timedelta(days=i) for week in weeks for i in range(7)}
+
+    buckets = {("day", day): _Bucket() for day in days}
+    buckets.update({("week", week): _Bucket() for week in weeks})
+    rows = DailyConditionSummary.objects.filter(date__in=sorted(dates)).values_list(
+        "date", "user_id", "log_count", "fatigue_total", "mood_total", "concern_counts"
+    )
+    for day, *values in rows.iterator(chunk_size=2000):
+        for key in (("day", day), ("week", week_start(day))):
+            if key in buckets:
+                buckets[key].add(*values)
+
+    rollups = [
+        bucket.to_rollup(period, start)
+        for (period, start), bucket in sorted(buckets.items())
+        if bucket.log_count
+    ]
+    with transaction.atomic():
+        ActivityRollup.objects.filter(period="day", start__in=days).delete()
+        ActivityRollup.objects.filter(period="week", start__in=weeks).delete()
+        ActivityRollup.objects.bulk_create(rollups, batch_size=500)
+    return len(rollups)
+
+
+def update_rollups(full: bool = False) -> dict:
+    """
+    ハイウォーターマークより新しい体調ログの分だけ集計を更新する（full=True なら全期間）
+    戻り値: {"days": 作り直した日数, "rollups": 作った集計行の数, "high_water_mark": 新しい位置}
+    """
+    with transaction.atomic():
+        # 同時に実行された場合は後から来た方が待つ
+        RollupState.objects.get_or_create(name=STATE_NAME)
+        state = RollupState.objects.select_for_update().get(name=STATE_NAME)
+
+        latest = ConditionLog.objects.aggregate(latest=Max("id"))["latest"] or 0
+        if full:
+            ActivityRollup.objects.all().delete()
+            days = set(DailyConditionSummary.objects.values_list("date", flat=True).distinct())
+        else:
+            # ID の範囲は主キーのインデックスで絞り込める
+            days = set(
+                ConditionLog.objects.filter(id__gt=state.high_water_mark, id__lte=latest)
+                .values_list("log_date", flat=True).distinct()
+            )
+            # 前回の集計中にコミットされたログ（ID が前後する）を取りこぼさないよう、今日の分は毎回作り直す
+            days.add(timezone.localdate())
+
+        created = rollup_days(days)
+        state.high_water_mark = latest
+        state.save(update_fields=["high_water_mark", "updated_at"])
+    return {"days": len(days), "rollups": created, "high_water_mark": latest}
+
+
+# ---- 読み込み ----
+def activity_series(period: str, start, end) -> list:
+    """
+    start〜end（両端を含む）の日・週ごとの集計（グラフのAPIのデータ）
+    週ごとの場合は start を含む週の月曜日から。ログの無い日・週は件数 0・平均 None
+    """
+    if period == "week":
+        start = week_start(start)
+        step = timedelta(days=7)
+    else:
+        step = timedelta(days=1)
+
+    rollups = {
+        rollup.start: rollup
+        for rollup in ActivityRollup.objects.filter(period=period, start__range=(start, end))
+    }
+    series = []
+    current = start
+    while current <= end:
+        rollup = rollups.get(current)
+        count = rollup.log_count if rollup else 0
+        series.append({
+            "date": current.isoformat(),
+            "log_count": count,
+            "active_users": rollup.active_users if rollup else 0,
+            "avg_fatigue": round(rollup.fatigue_total / count, 2) if count else None,
+            "avg_mood": round(rollup.mood_total / count, 2) if count else None,
+            # 件数の多い順（同数なら悩みの文字列順）
+            "top_concerns": [
+                {"concern": concern, "count": n}
+                for concern, n in sorted(rollup.concern_counts.items(), key=lambda item: (-item[1], item[0]))[:TOP_CONCERNS]
+            ] if rollup else [],
+        })
+        current += step
+    return series
@@ -0,0 +1,55 @@
+"""
+ユーザー・体調ログ・運動メニューの作成・削除を検知して、ダッシュボードの集計値を更新する
+（ライトビハインドで bulk_create された体調ログは condition_logs_recorded で受け取る）
+差分はコミット後にまとめて反映する（metrics.MetricBuffer）ので、ここではDBに書き込まない
+"""
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.condition_manager.models import ConditionLog, ExerciseMenu
+from apps.condition_manager.signals import condition_logs_recorded
+
+from . import metrics
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def on_user_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        metrics.record(metrics.USERS, metrics.NEW_USERS, [metrics.local_day(instance.date_joined)])
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def on_user_deleted(sender, instance, **kwargs):
+    metrics.record(metrics.USERS, metrics.NEW_USERS, [metrics.local_day(instance.date_joined)], delta=-1)
+
+
+@receiver(post_save, sender=ConditionLog)
+def on_condition_log_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        metrics.record(metrics.CONDITION_LOGS, metrics.NEW_CONDITION_LOGS, [metrics.local_day(instance.created_at)])
+
+
+@receiver(condition_logs_recorded)
+def on_condition_logs_recorded(sender, logs, **kwargs):
+    metrics.record(
+        metrics.CONDITION_LOGS, metrics.NEW_CONDITION_LOGS, [metrics.local_day(log.created_at) for log in logs]
+    )
+
+
+@receiver(post_delete, sender=ConditionLog)
+def on_condition_log_deleted(sender, instance, **kwargs):
+    metrics.record(
+        metrics.CONDITION_LOGS, metrics.NEW_CONDITION_LOGS, [metrics.local_day(instance.created_at)], delta=-1
+    )
+
+
+@receiver(post_save, sender=ExerciseMenu)
+def on_menu_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        metrics.record_counter(metrics.EXERCISE_MENUS)
+
+
+@receiver(post_delete, sender=ExerciseMenu)
+def on_menu_deleted(sender, instance, **kwargs):
+    metrics.record_counter(metrics.EXERCISE_MENUS, -1)
@@ -0,0 +1,269 @@
+import time
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+
+
+class MetricsTest(TestCase):
+    def setUp(self):
+        from . import metrics
+
+        User = get_user_model()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.staff = User.objects.create_user(username='staff', password='pass', is_staff=True)
+        self.addCleanup(metrics.flush_metrics)
+
+    def _counters(self):
+        from . import metrics
+
+        metrics.flush_metrics()
+        return metrics.get_counters()
+
+    def test_counters_follow_creates_and_deletes(self):
+        from apps.condition_manager.models import ConditionLog, ExerciseMenu
+        from . import metrics
+
+        self.assertEqual(self._counters(), {metrics.USERS: 1, metrics.CONDITION_LOGS: 0, metrics.EXERCISE_MENUS: 0})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            user = get_user_model().objects.create_user(username='member', password='pass')
+            logs = [ConditionLog.objects.create(user=user, fatigue_level=3, mood_level=3) for _ in range(3)]
+            menu = ExerciseMenu.objects.create(name='肩回し', description='説明')
+        self.assertEqual(self._counters(), {metrics.USERS: 2, metrics.CONDITION_LOGS: 3, metrics.EXERCISE_MENUS: 1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            logs[0].delete()
+            menu.delete()
+        self.assertEqual(self._counters(), {metrics.USERS: 2, metrics.CONDITION_LOGS: 2, metrics.EXERCISE_MENUS: 0})
+
+        # ユーザーの削除で体調ログも削除される
+        with self.captureOnCommitCallbacks(execute=True):
+            user.delete()
+        self.assertEqual(self._counters(), {metrics.USERS: 1, metrics.CONDITION_LOGS: 0, metrics.EXERCISE_MENUS: 0})
+
+    def test_buffered_logs_are_counted(self):
+        from apps.condition_manager.log_buffer import ConditionLogBuffer
+        from apps.condition_manager.models import ConditionLog
+        from . import metrics
+
+        self._counters()
+        buffer = ConditionLogBuffer(autostart=False)
+        for _ in range(4):
+            buffer.add(ConditionLog(user=self.staff, fatigue_level=3, mood_level=3))
+        with self.captureOnCommitCallbacks(execute=True):
+            buffer.flush()
+
+        today = timezone.localdate()
+        self.assertEqual(self._counters()[metrics.CONDITION_LOGS], 4)
+        self.assertEqual(metrics.daily_series(metrics.NEW_CONDITION_LOGS, today, today), [(today, 4)])
+
+    def test_writers_do_not_touch_metric_rows(self):
+        from django.db import connection, transaction
+        from django.test.utils import CaptureQueriesContext
+        from apps.condition_manager.models import ConditionLog
+        from . import metrics
+
+        self._counters()
+        with self.captureOnCommitCallbacks() as callbacks:
+            with CaptureQueriesContext(connection) as queries, transaction.atomic():
+                for _ in range(3):
+                    ConditionLog.objects.create(user=self.staff, fatigue_level=3, mood_level=3)
+        # 書き込むトランザクションの中では集計行を更新しない（コミット後にバッファに溜める）
+        for query in queries.captured_queries:
+            self.assertNotIn('management_', query['sql'])
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self._counters()[metrics.CONDITION_LOGS], 3)
+
+    def test_failed_flush_is_not_applied_twice(self):
+        from unittest import mock
+        from django.db import DatabaseError
+        from . import metrics
+        from .models import DailyMetric
+
+        self._counters()
+        today = timezone.localdate()
+        buffer = metrics.MetricBuffer()
+        buffer.add({metrics.USERS: 2}, {(metrics.NEW_USERS, today): 2})
+        # 総件数を足し込んだ後に失敗した場合も、どちらも反映されていない状態に戻る
+        with mock.patch.object(metrics, 'increment_daily', side_effect=DatabaseError), \
+                self.assertLogs('apps.management.metrics', 'ERROR'):
+            self.assertEqual(buffer.flush(), 0)
+        self.assertEqual(self._counters()[metrics.USERS], 1)
+        self.assertEqual(buffer.flush(), 2)
+        self.assertEqual(self._counters()[metrics.USERS], 3)
+        self.assertEqual(DailyMetric.objects.get(name=metrics.NEW_USERS, date=today).value, 3)
+
+    def test_rollup_ignores_deltas_committed_before_it(self):
+        from . import metrics
+        from .models import DailyMetric
+
+        self._counters()
+        today = timezone.localdate()
+        # 別のプロセスのバッファ: 数え直す前にコミットした差分と、後にコミットした差分
+        other = metrics.MetricBuffer()
+        before = timezone.now()
+        get_user_model().objects.create_user(username='counted', password='pass')
+        other.add({metrics.USERS: 1}, {(metrics.NEW_USERS, today): 1}, stamp=before)
+
+        metrics.rollup_counters()
+        metrics.rollup_daily(start=today)
+        other.add({metrics.USERS: 1}, {(metrics.NEW_USERS, today): 1})
+        get_user_model().objects.create_user(username='later', password='pass')
+
+        self.assertEqual(other.flush(), 2)
+        self.assertEqual(self._counters()[metrics.USERS], 3)
+        self.assertEqual(DailyMetric.objects.get(name=metrics.NEW_USERS, date=today).value, 3)
+
+    def test_rollup_matches_live_updates(self):
+        from apps.condition_manager.models import ConditionLog
+        from .models import DailyMetric, MetricCounter
+
+        self._counters()
+        User = get_user_model()
+        for i in range(3):
+            user = User.objects.create_user(username=f'user{i}', password='pass')
+            ConditionLog.objects.create(user=user, fatigue_level=3, mood_level=3)
+        # 過去に登録されたユーザー
+        User.objects.filter(username='user0').update(date_joined=timezone.now() - timedelta(days=3))
+
+        MetricCounter.objects.update(value=0)
+        DailyMetric.objects.all().delete()
+        out = StringIO()
+        call_command('rollup_metrics', stdout=out)
+        self.assertIn('users: 4', out.getvalue())
+
+        today = timezone.localdate()
+        self.assertEqual(
+            dict(DailyMetric.objects.filter(name='new_users').values_list('date', 'value')),
+            {today: 3, today - timedelta(days=3): 1},
+        )
+        self.assertEqual(DailyMetric.objects.get(name='new_condition_logs').value, 3)
+
+    def test_dashboard_reads_only_metric_tables(self):
+        self._counters()
+        self.client.force_login(self.staff)
+        url = reverse('management:dashboard')
+        self.client.get(url)  # セッションなどの初回の読み込み
+
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.context['total_users'], 1)
+        self.assertEqual(resp.context['new_users_30d'], 1)
+        self.assertEqual(len(resp.context['daily_metrics']), 14)
+        for query in queries.captured_queries:
+            self.assertNotIn('COUNT(', query['sql'])
+
+
+class MetricBufferThreadTest(TransactionTestCase):
+    def test_background_thread_flushes_on_interval(self):
+        from . import metrics
+        from .models import MetricCounter
+
+        MetricCounter.objects.create(name=metrics.EXERCISE_MENUS, value=0)
+        buffer = metrics.MetricBuffer(interval=0.05, autostart=True)
+        buffer.add({metrics.EXERCISE_MENUS: 2}, {})
+
+        # 書き込みが続かなくても間隔ごとに反映される
+        deadline = time.monotonic() + 5
+        while MetricCounter.objects.get().value == 0 and time.monotonic() < deadline:
+            time.sleep(0.02)
+        self.assertEqual(MetricCounter.objects.get().value, 2)
+
+        buffer.add({metrics.EXERCISE_MENUS: 1}, {})
+        buffer.close()
+        self.assertEqual(MetricCounter.objects.get().value, 3)
+
+
+class ActivityRollupTest(TestCase):
+    def setUp(self):
+        from datetime import date
+
+        User = get_user_model()
+        self.staff = User.objects.create_user(username='staff', password='pass', is_staff=True)
+        self.member = User.objects.create_user(username='member', password='pass')
+        # 2026-02-02 は月曜日
+        self.monday = date(2026, 2, 2)
+
+    def _log(self, user, day, fatigue, mood, concern=''):
+        from apps.condition_manager.models import ConditionLog
+
+        return ConditionLog.objects.create(
+            user=user, log_date=day, fatigue_level=fatigue, mood_level=mood, body_concern=concern,
+        )
+
+    def _rollup(self, period, start):
+        from .models import ActivityRollup
+
+        return ActivityRollup.objects.get(period=period, start=start)
+
+    def test_incremental_update_uses_high_water_mark(self):
+        from .models import RollupState
+        from .rollups import update_rollups
+
+        self._log(self.staff, self.monday, 4, 2, '肩こり')
+        self._log(self.member, self.monday, 2, 4, '肩こり')
+        first = update_rollups()
+        day = self._rollup('day', self.monday)
+        self.assertEqual((day.log_count, day.active_users, day.fatigue_total), (2, 2, 6))
+
+        # 新しいログの日・週だけ作り直す
+        tuesday = self.monday + timedelta(days=1)
+        last = self._log(self.member, tuesday, 3, 3, '腰痛')
+        result = update_rollups()
+        self.assertEqual(RollupState.objects.get().high_water_mark, last.pk)
+        self.assertGreater(result['high_water_mark'], first['high_water_mark'])
+        week = self._rollup('week', self.monday)
+        self.assertEqual((week.log_count, week.active_users), (3, 2))
+        self.assertEqual(week.concern_counts, {'肩こり': 2, '腰痛': 1})
+
+        # 新しいログが無ければ今日の分だけ
+        self.assertEqual(update_rollups()['days'], 1)
+
+    def test_full_rebuild_command(self):
+        from .models import ActivityRollup
+
+        self._log(self.member, self.monday, 4, 2)
+        self._log(self.member, self.monday + timedelta(days=7), 2, 4)
+        out = StringIO()
+        call_command('rollup_activity', '--full', stdout=out)
+        self.assertIn('2 日分', out.getvalue())
+        self.assertEqual(ActivityRollup.objects.filter(period='week').count(), 2)
+
+    def test_activity_series_endpoint(self):
+        from asgiref.sync import async_to_sync
+        from django.test import AsyncClient
+        from .rollups import update_rollups
+
+        self._log(self.member, self.monday, 4, 2, '肩こり')
+        self._log(self.member, self.monday + timedelta(days=2), 2, 4)
+        update_rollups()
+
+        async def get(user, params):
+            client = AsyncClient()
+            await client.aforce_login(user)
+            return await client.get(reverse('management:activity_series'), params)
+
+        resp = async_to_sync(get)(self.staff, {'start': '2026-02-01', 'end': '2026-02-04'})
+        self.assertEqual(resp.status_code, 200)
+        results = resp.json()['results']
+        self.assertEqual([row['log_count'] for row in results], [0, 1, 0, 1])
+        self.assertEqual(results[1]['top_concerns'], [{'concern': '肩こり', 'count': 1}])
+        self.assertIsNone(results[0]['avg_fatigue'])
+
+        resp = async_to_sync(get)(self.staff, {'start': '2026-02-04', 'end': '2026-02-10', 'period': 'week'})
+        self.assertEqual([(row['date'], row['log_count']) for row in resp.json()['results']],
+                         [('2026-02-02', 2), ('2026-02-09', 0)])
+
+        self.assertEqual(async_to_sync(get)(self.member, {}).status_code, 403)
+        self.assertEqual(async_to_sync(get)(self.staff, {'start': '2020-01-01'}).status_code, 400)
@@ -5,6 +5,8 @@ app_name = 'management'
 
 urlpatterns = [
     path('', views.DashboardView.as_view(), name='dashboard'),
+    # グラフ用の集計（JSON）
+    path('api/activity/', views.activity_series_view, name='activity_series'),
     
     # User
     path('users/', views.UserListView.as_view(), name='user_list'),
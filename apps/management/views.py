@@ -1,15 +1,28 @@
+from asgiref.sync import sync_to_async
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.http import HttpResponse
+from django.views.decorators.http import require_GET
 from django.views.generic import TemplateView, ListView, DetailView, CreateView, UpdateView, DeleteView
 from django.contrib.auth import get_user_model
 from django.urls import reverse_lazy
 from django.db.models import Count
 from django.utils import timezone
 from datetime import timedelta
+from apps.common.api.renderers import dumps
 from apps.condition_manager.models import ConditionLog, ExerciseMenu, Tag
+from apps.condition_manager.summaries import parse_trend_params
 from .forms import UserUpdateForm, ExerciseMenuForm, TagForm
+from . import metrics, rollups
 
 User = get_user_model()
 
+# 画面のクエリ（check_query_plans でも同じものの実行計画を確認する）
+def dashboard_recent_logs():
+    return ConditionLog.objects.select_related('user').order_by('-created_at')[:5]
+
+def user_recent_logs(user):
+    return ConditionLog.objects.filter(user=user).order_by('-created_at')[:10]
+
 class StaffRequiredMixin(LoginRequiredMixin, UserPassesTestMixin):
     def test_func(self):
         return self.request.user.is_staff
@@ -17,23 +30,67 @@ class StaffRequiredMixin(LoginRequiredMixin, UserPassesTestMixin):
 class DashboardView(StaffRequiredMixin, TemplateView):
     template_name = 'management/dashboard.html'
 
+    # 日ごとの推移を表示する日数
+    series_days = 14
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
-        # KEY METRICS
-        context['total_users'] = User.objects.count()
-        context['total_logs'] = ConditionLog.objects.count()
-        context['total_exercises'] = ExerciseMenu.objects.count()
+        # KEY METRICS（集計テーブルから読む。COUNT(*) は実行しない）
+        counters = metrics.get_counters()
+        context['total_users'] = counters[metrics.USERS]
+        context['total_logs'] = counters[metrics.CONDITION_LOGS]
+        context['total_exercises'] = counters[metrics.EXERCISE_MENUS]
         
-        # Recent data for graphs/tables
-        last_30_days = timezone.now() - timedelta(days=30)
-        context['new_users_30d'] = User.objects.filter(date_joined__gte=last_30_days).count()
+        # Recent data for graphs/tables（日ごとの件数、今日を含む）
+        today = timezone.localdate()
+        context['new_users_30d'] = metrics.sum_daily(metrics.NEW_USERS, today - timedelta(days=29), today)
+        start = today - timedelta(days=self.series_days - 1)
+        context['daily_metrics'] = [
+            {'date': day, 'new_users': users, 'new_logs': logs}
+            for (day, users), (_, logs) in zip(
+                metrics.daily_series(metrics.NEW_USERS, start, today),
+                metrics.daily_series(metrics.NEW_CONDITION_LOGS, start, today),
+            )
+        ]
         
         # Recent logs
-        context['recent_logs'] = ConditionLog.objects.select_related('user').order_by('-created_at')[:5]
+        context['recent_logs'] = dashboard_recent_logs()
 
         return context
 
+def _json_response(data, status=200):
+    return HttpResponse(dumps(data), status=status, content_type="application/json")
+
+
+@require_GET
+async def activity_series_view(request):
+    """
+    グラフ用の日・週ごとの体調ログの集計（JSON、スタッフのみ）
+    集計テーブル（rollup_activity コマンドで更新）だけを読む。ページの表示後に JavaScript から読み込む
+
+    クエリパラメータ:
+    - start, end: 期間（YYYY-MM-DD、両端を含む。省略時は今日までの30日間）
+    - period: day（日ごと、既定）または week（月曜始まりの週ごと）
+    """
+    user = await request.auser()
+    if not user.is_authenticated or not user.is_staff:
+        return _json_response({"error": "スタッフのみ利用できます。"}, status=403)
+
+    params, error = parse_trend_params(request.GET)
+    if error:
+        return _json_response({"error": error}, status=400)
+    start, end, period = params
+    if (end - start).days // (7 if period == "week" else 1) >= rollups.MAX_POINTS:
+        return _json_response({"error": "期間が長すぎます。"}, status=400)
+
+    return _json_response({
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "period": period,
+        "results": await sync_to_async(rollups.activity_series)(period, start, end),
+    })
+
 # --- User Management ---
 class UserListView(StaffRequiredMixin, ListView):
     model = User
@@ -59,7 +116,7 @@ class UserDetailView(StaffRequiredMixin, UpdateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         # ユーザーの行動履歴などを表示する場合に備えて
-        context['recent_logs'] = ConditionLog.objects.filter(user=self.object).order_by('-created_at')[:10]
+        context['recent_logs'] = user_recent_logs(self.object)
         return context
 
 # --- Exercise Menu Management ---
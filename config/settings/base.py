@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 # config/settings/base.py
@@ -25,6 +26,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    # 読み取り専用のリクエストをレプリカDBへ（セッション・認証より前に置く）
+    "apps.common.db_router.ReplicaRoutingMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -62,6 +65,86 @@ DATABASES = {
     }
 }
 
+# レプリカDB（読み取り専用）を使う場合は DATABASES に追加する（無ければすべてプライマリ）
+#   DATABASES["replica"] = {..., "TEST": {"MIRROR": "default"}}
+# GET などの読み込みはレプリカ、書き込みと書き込んだ直後の読み込みはプライマリ（apps/common/db_router.py）
+DATABASE_ROUTERS = ["apps.common.db_router.PrimaryReplicaRouter"]
+REPLICA_DATABASE = "replica"
+REPLICA_PIN_SECONDS = 5  # 書き込んだクライアントがプライマリから読む秒数（レプリカの遅延より長く）
+
+# Django REST framework
+REST_FRAMEWORK = {
+    # JSON は orjson があれば orjson で出力する（無ければ標準の json、出力は同じ）
+    "DEFAULT_RENDERER_CLASSES": [
+        "apps.common.api.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+}
+
+# キャッシュ（LocMemCache は MAX_ENTRIES を超えると古いものから削除される LRU 方式）
+# LocMemCache はプロセスごとなので、ワーカーが1つのとき（開発・テスト）だけ使う。
+# 本番は prod.py で共有キャッシュ（config/settings/caches.py）に切り替える
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "condition-support",
+        "TIMEOUT": 300,
+        # 運動メニューごとのシリアライズ結果も入るので、メニュー数より十分大きくする
+        "OPTIONS": {"MAX_ENTRIES": 20000},
+    }
+}
+
+# ワーカープロセスの数（gunicorn と同じく WEB_CONCURRENCY で指定する）
+# 1 より大きいのに LocMemCache を使っているとシステムチェックでエラーになる（apps/condition_manager/checks.py）
+WEB_CONCURRENCY = int(os.environ.get("WEB_CONCURRENCY", "1"))
+
+# 運動メニュー提案結果のキャッシュ保持時間（秒）
+RECOMMEND_CACHE_TIMEOUT = 60 * 10
+
+# まとめて提案API（/api/recommend/batch/）で1回に送れる体調の入力の件数
+RECOMMEND_BATCH_MAX_ENTRIES = 100
+
+# 運動メニューごとのシリアライズ結果のキャッシュ保持時間（秒）
+# カタログが変わると使われなくなるので長めでよい
+MENU_PAYLOAD_CACHE_TIMEOUT = 60 * 60
+
+# 運動メニューAPI（一覧・詳細）をブラウザ・プロキシにキャッシュさせる時間（秒）
+# 期限が切れた後も ETag で確認し、変わっていなければ 304 を返す
+CATALOG_CACHE_MAX_AGE = 60
+
+# 運動メニュー一覧のファセット（件数）のキャッシュ時間（秒）
+FACET_CACHE_TIMEOUT = 60 * 10
+
+# 体調ログをバッファしてまとめて保存する（ライトビハインド）
+# 有効にすると推薦APIはログの INSERT を待たずにレスポンスを返す
+CONDITION_LOG_WRITE_BEHIND = False
+CONDITION_LOG_BUFFER_SIZE = 100  # この件数が溜まったら保存
+CONDITION_LOG_FLUSH_INTERVAL = 1.0  # 秒（件数に達しなくてもこの間隔で保存）
+CONDITION_LOG_SPOOL_PATH = BASE_DIR / "condition_log_spool.jsonl"  # 保存できなかったログの退避先
+CONDITION_LOG_QUARANTINE_PATH = BASE_DIR / "condition_log_rejected.jsonl"  # 内容の問題で保存できないログの隔離先
+
+# まとめてルーティン操作API（/api/routines/bulk/）で1回に指定できる運動メニューIDの件数（add と remove の合計）
+ROUTINE_BULK_MAX_IDS = 100
+
+# ルーティンの閲覧数はまとめて反映する（view_counter.py）
+ROUTINE_VIEW_BUFFER_SIZE = 1000  # 未反映の (ユーザー, メニュー) がこの数に達したら反映
+ROUTINE_VIEW_FLUSH_INTERVAL = 5.0  # 秒（バックグラウンドのスレッドがこの間隔で反映）
+
+# ダッシュボードの集計値の差分はまとめて反映する（apps/management/metrics.py）
+METRIC_BUFFER_SIZE = 100  # 未反映の集計値（総件数・日ごとの件数）がこの数に達したら反映
+METRIC_FLUSH_INTERVAL = 5.0  # 秒（バックグラウンドのスレッドがこの間隔で反映）
+
+# まとめて反映するバッファをバックグラウンドのスレッドで定期的に反映する
+# （False ならコミット時に件数・時間のしきい値を超えていればその場で反映する。テストでは False: config/test_runner.py）
+BACKGROUND_FLUSH = True
+
+# テストではバックグラウンドのスレッドを使わない（テストのトランザクションの外で書き込まないように）
+TEST_RUNNER = "config.test_runner.TestRunner"
+
+# /api/ を非同期ビュー（apps/condition_manager/async_views.py）で処理する
+# uvicorn などの ASGI サーバーで動かすときに有効にする
+ASYNC_API = False
+
 AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"},
     {"NAME": "django.contrib.auth.password_validation.MinimumLengthValidator"},
@@ -0,0 +1,45 @@
+"""
+本番用のキャッシュ設定（prod.py から使う）
+
+カタログのバージョン（apps/condition_manager/catalog.py）はキャッシュに置くので、
+ワーカープロセスが複数あるときは全プロセスで共有するキャッシュが必要
+（プロセス内の LocMemCache では、あるワーカーでの変更を他のワーカーが検知できない）
+
+DJANGO_CACHE_BACKEND で選ぶ
+    database（既定）: DB のテーブル（python manage.py createcachetable で作る）
+    redis: Redis（REDIS_URL、pip install redis が必要）
+    memcached: Memcached（MEMCACHED_LOCATION、pip install pymemcache が必要）
+"""
+import os
+
+
+# キャッシュの保持時間の既定値（秒）
+CACHE_TIMEOUT = 300
+
+# 運動メニューごとのシリアライズ結果も入るので、メニュー数より十分大きくする
+CACHE_MAX_ENTRIES = 20000
+
+
+def shared_cache(env=os.environ) -> dict:
+    """環境変数から、全ワーカープロセスで共有するキャッシュの設定を作る"""
+    backend = env.get("DJANGO_CACHE_BACKEND", "database")
+    if backend == "database":
+        return {
+            "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+            "LOCATION": env.get("DJANGO_CACHE_TABLE", "condition_support_cache"),
+            "TIMEOUT": CACHE_TIMEOUT,
+            "OPTIONS": {"MAX_ENTRIES": CACHE_MAX_ENTRIES},
+        }
+    if backend == "redis":
+        return {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": env.get("REDIS_URL", "redis://localhost:6379/0"),
+            "TIMEOUT": CACHE_TIMEOUT,
+        }
+    if backend == "memcached":
+        return {
+            "BACKEND": "django.core.cache.backends.memcached.PyMemcacheCache",
+            "LOCATION": env.get("MEMCACHED_LOCATION", "localhost:11211"),
+            "TIMEOUT": CACHE_TIMEOUT,
+        }
+    raise ValueError(f"DJANGO_CACHE_BACKEND は database / redis / memcached のいずれかを指定してください: {backend}")
@@ -0,0 +1,72 @@
+"""
+本番用のDB接続設定（prod.py から使う）
+
+- SQLite: 接続を使い回し、接続ごとに PRAGMA（WAL など）を設定する
+- PostgreSQL: DJANGO_DB_ENGINE=postgres のとき。接続プールは DJANGO_DB_POOL で選ぶ
+    pgbouncer（既定）: サーバー側のプール（PgBouncer のトランザクションモード）を経由する
+    psycopg: Django の接続プール（pip install "psycopg[pool]" が必要）
+    none: プールなし（接続の使い回しのみ）
+"""
+import os
+
+
+# 接続を使い回す秒数（リクエストごとに接続を開かない）
+CONN_MAX_AGE = 600
+
+
+def sqlite_database(path, timeout: int = 20) -> dict:
+    return {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": path,
+        "CONN_MAX_AGE": CONN_MAX_AGE,
+        # 使い回す接続はリクエストの最初に使えるか確認する
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {
+            # 書き込むトランザクションは最初に書き込みロックを取る（途中でロックを取れずに失敗しない）
+            "transaction_mode": "IMMEDIATE",
+            "timeout": timeout,
+            "init_command": ";".join([
+                # 書き込み中も読み込みをブロックしない（WAL はDBファイルに記録され、以降の接続でも有効）
+                "PRAGMA journal_mode=WAL",
+                # WAL では NORMAL でも壊れない（電源断時に直前のコミットを失う可能性があるのみ）
+                "PRAGMA synchronous=NORMAL",
+                # ロック待ちの上限（ミリ秒）
+                f"PRAGMA busy_timeout={timeout * 1000}",
+                # 読み込みをメモリマップで行う（256MB まで）
+                "PRAGMA mmap_size=268435456",
+                "PRAGMA temp_store=MEMORY",
+            ]),
+        },
+    }
+
+
+def postgres_database(env=os.environ, host: str = None) -> dict:
+    """環境変数（POSTGRES_DB など）から PostgreSQL の接続設定を作る。host はレプリカ用"""
+    database = {
+        "ENGINE": "django.db.backends.postgresql",
+        "NAME": env.get("POSTGRES_DB", "condition_partner"),
+        "USER": env.get("POSTGRES_USER", "postgres"),
+        "PASSWORD": env.get("POSTGRES_PASSWORD", ""),
+        "HOST": host or env.get("POSTGRES_HOST", "localhost"),
+        "PORT": env.get("POSTGRES_PORT", "5432"),
+        "CONN_MAX_AGE": CONN_MAX_AGE,
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {},
+    }
+
+    pool = env.get("DJANGO_DB_POOL", "pgbouncer")
+    if pool == "pgbouncer":
+        # トランザクションモードでは接続がトランザクションごとに入れ替わるので、
+        # サーバー側カーソル（.iterator() で使う）を使わない
+        database["DISABLE_SERVER_SIDE_CURSORS"] = True
+    elif pool == "psycopg":
+        # Django の接続プールを使う場合は接続の使い回しを無効にする（プールが管理する）
+        database["CONN_MAX_AGE"] = 0
+        database["OPTIONS"]["pool"] = {
+            "min_size": int(env.get("DJANGO_DB_POOL_MIN_SIZE", 2)),
+            "max_size": int(env.get("DJANGO_DB_POOL_MAX_SIZE", 10)),
+            "timeout": int(env.get("DJANGO_DB_POOL_TIMEOUT", 10)),
+        }
+    elif pool != "none":
+        raise ValueError(f"DJANGO_DB_POOL は pgbouncer / psycopg / none のいずれかを指定してください: {pool}")
+    return database
@@ -1,3 +1,19 @@
+import os
+
 from .base import *  # noqa
+from .caches import shared_cache
+from .databases import postgres_database, sqlite_database
 
 DEBUG = False
+
+# DB（接続の使い回し・SQLite の WAL など。config/settings/databases.py）
+if os.environ.get("DJANGO_DB_ENGINE") == "postgres":
+    DATABASES = {"default": postgres_database()}
+    # レプリカ（読み取り専用、apps/common/db_router.py）
+    if os.environ.get("POSTGRES_REPLICA_HOST"):
+        DATABASES["replica"] = postgres_database(host=os.environ["POSTGRES_REPLICA_HOST"])
+else:
+    DATABASES = {"default": sqlite_database(BASE_DIR / "db.sqlite3")}
+
+# キャッシュ（全ワーカープロセスで共有する。config/settings/caches.py）
+CACHES = {"default": shared_cache()}
@@ -0,0 +1,14 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    """
+    テスト用のランナー
+    まとめて反映するバッファのバックグラウンドのスレッドを使わない
+    （別の接続でテストのトランザクションの外に書き込み、テストの間で値が残るため）
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        settings.BACKGROUND_FLUSH = False
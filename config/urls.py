@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include
 from django.views.generic import TemplateView
@@ -17,5 +18,8 @@ urlpatterns = [
 
     path("admin/", admin.site.urls),
     path("healthz/", healthz),
-    path("api/", include("apps.condition_manager.urls")),
+    # ASGI で動かす場合は非同期版のAPIを使う
+    path("api/", include(
+        "apps.condition_manager.async_urls" if settings.ASYNC_API else "apps.condition_manager.urls"
+    )),
 ]